@@ -0,0 +1,166 @@
+"""
+Times the assembler of project 6 on a single program, end to end and per
+phase, in every assembler mode. Every measurement runs in a fresh process so
+that its peak RSS is its own.
+"""
+import concurrent.futures
+import importlib.util
+import io
+import multiprocessing
+import os
+import platform
+import resource
+import tempfile
+import time
+import typing
+import benchmark  # makes the assembler modules importable
+import AssemblyCache
+import Main
+from Parser import Parser
+
+
+def available_modes() -> typing.List[str]:
+    """
+    Returns:
+        typing.List[str]: the assembler modes that can run here.
+    """
+    return [mode for mode in Main.MODES
+            if mode != "bulk" or importlib.util.find_spec("numpy") is not None]
+
+
+def _assemble_in_memory(mode: str, source: str) -> str:
+    input_file, output_file = io.StringIO(source), io.StringIO()
+    if mode == "bulk":
+        import BulkEncoder  # imports numpy, which is only used in this mode
+        BulkEncoder.assemble_file_bulk(input_file, output_file)
+    elif mode == "single-pass":
+        Main.assemble_file_single_pass(input_file, output_file)
+    else:
+        Main.assemble_file(input_file, output_file, mode == "streaming")
+    return output_file.getvalue()
+
+
+def measure(path: str, mode: str) -> typing.Dict[str, typing.Any]:
+    """Measures a single mode on a single program. Meant to run in a process
+    of its own (see run_isolated).
+
+    Args:
+        path (str): path of the .asm file.
+        mode (str): the assembler mode, one of Main.MODES.
+
+    Returns:
+        typing.Dict[str, typing.Any]: the end to end time, the time of every
+        phase, the instruction counts and the peak RSS of the process.
+    """
+    start = time.perf_counter()
+    Main.assemble_path(path, mode)
+    end_to_end = time.perf_counter() - start
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # before the phases
+
+    phases = {}
+    start = time.perf_counter()
+    with open(path, 'r') as input_file:
+        source = input_file.read()
+    phases["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    counts = {"A_COMMAND": 0, "C_COMMAND": 0, "L_COMMAND": 0}
+    parser = Parser(io.StringIO(source))
+    while parser.has_more_commands():
+        parser.advance()
+        command = parser.command_type()
+        if command in counts:
+            counts[command] += 1
+    phases["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    output = _assemble_in_memory(mode, source)
+    phases["assemble"] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        with open(os.path.join(directory, "output.hack"), 'w') as output_file:
+            output_file.write(output)
+        phases["write"] = time.perf_counter() - start
+
+    instructions = counts["A_COMMAND"] + counts["C_COMMAND"]
+    return {
+        "seconds": end_to_end,
+        "instructions_per_second": instructions / end_to_end if end_to_end else 0.0,
+        "phases": phases,
+        "counts": {"a": counts["A_COMMAND"], "c": counts["C_COMMAND"],
+                   "labels": counts["L_COMMAND"]},
+        "peak_rss_kb": peak_rss_kb,
+    }
+
+
+def run_isolated(path: str, mode: str) -> typing.Dict[str, typing.Any]:
+    """Runs measure in a freshly spawned process.
+
+    Args:
+        path (str): path of the .asm file.
+        mode (str): the assembler mode.
+
+    Returns:
+        typing.Dict[str, typing.Any]: the result of measure.
+    """
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(measure, path, mode).result()
+
+
+def run_benchmark(
+        path: str, modes: typing.Sequence[str],
+        repeat: int = 3) -> typing.Dict[str, typing.Any]:
+    """Benchmarks every mode on a program, keeping the best of repeat runs.
+
+    Args:
+        path (str): path of the .asm file.
+        modes (typing.Sequence[str]): the assembler modes to measure.
+        repeat (int): the number of runs of every mode.
+
+    Returns:
+        typing.Dict[str, typing.Any]: the report, ready to be saved as JSON.
+    """
+    results = {}
+    for mode in modes:
+        runs = [run_isolated(path, mode) for i in range(repeat)]
+        best = min(runs, key=lambda run: run["seconds"])
+        best["phases"] = {
+            phase: min(run["phases"][phase] for run in runs)
+            for phase in best["phases"]}
+        best["peak_rss_kb"] = max(run["peak_rss_kb"] for run in runs)
+        results[mode] = best
+    return {
+        "assembler_version": AssemblyCache.assembler_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "program": {"path": os.path.abspath(path),
+                    "bytes": os.path.getsize(path)},
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(
+        previous: typing.Dict[str, typing.Any],
+        current: typing.Dict[str, typing.Any]) -> typing.List[str]:
+    """
+    Args:
+        previous (typing.Dict[str, typing.Any]): an older report.
+        current (typing.Dict[str, typing.Any]): a newer report.
+
+    Returns:
+        typing.List[str]: one line per mode found in both reports, with the
+        relative change of its time and peak RSS.
+    """
+    lines = []
+    for mode, result in current["results"].items():
+        if mode not in previous["results"]:
+            continue
+        old = previous["results"][mode]
+        lines.append("%-12s time %+6.1f%%  peak RSS %+6.1f%%" % (
+            mode, 100.0 * (result["seconds"] / old["seconds"] - 1),
+            100.0 * (result["peak_rss_kb"] / old["peak_rss_kb"] - 1)))
+    return lines
@@ -0,0 +1,222 @@
+"""
+Generates synthetic Hack assembly programs that look like the output of the
+VM translator of project 8: stack pushes and pops, arithmetic (including the
+shift extension), comparisons with their FIRST_POSn/TRUEn/ENDn labels, loops,
+and calls with "Foo.bar$retN" return labels. The generator is deterministic
+for a given seed, so benchmark runs of different versions can be compared.
+"""
+import random
+import typing
+
+MAX_ROM_ADDRESS = 0x7FFF  # labels above it can not be referenced
+
+_BINARY_OPERATIONS = ["M=M+D", "M=M-D", "M=M&D", "M=M|D"]
+_UNARY_OPERATIONS = ["M=-M", "M=!M"]
+_SHIFT_OPERATIONS = ["M=M<<", "M=M>>"]
+_COMPARISONS = ["JEQ", "JGT", "JLT"]
+_SEGMENTS = ["LCL", "ARG", "THIS", "THAT"]
+
+
+class ProgramGenerator:
+    """Builds a single synthetic program."""
+
+    def __init__(
+            self, instructions: int = 100000, label_density: float = 0.05,
+            variables: int = 64, shift_ratio: float = 0.1,
+            classes: int = 8, seed: int = 0) -> None:
+        """
+        Args:
+            instructions (int): approximate number of instructions to emit.
+            label_density (float): fraction of VM commands that define or
+                use labels (control flow, comparisons and calls).
+            variables (int): number of distinct static variables.
+            shift_ratio (float): fraction of arithmetic commands that are
+                shifts.
+            classes (int): number of classes the functions are spread over.
+            seed (int): seed of the random generator.
+        """
+        self.instructions = instructions
+        self.label_density = label_density
+        self.variables = max(1, variables)
+        self.shift_ratio = shift_ratio
+        self.classes = max(1, classes)
+        self.random = random.Random(seed)
+        self.lines = []
+        self.rom_address = 0
+        self.labels = {}  # label -> ROM address
+        self.references = []  # (index in lines, label) of every label use
+        self.label_counter = 0
+        self.function = "Sys.init"
+
+    def _emit(self, *instructions: str) -> None:
+        for instruction in instructions:
+            if instruction.startswith("("):
+                self.labels[instruction[1:-1]] = self.rom_address
+            else:
+                self.rom_address += 1
+            self.lines.append(instruction)
+
+    def _reference(self, label: str) -> None:
+        self.references.append((len(self.lines), label))
+        self._emit("@" + label)
+
+    def _push_d(self) -> None:
+        self._emit("@SP", "A=M", "M=D", "@SP", "M=M+1")
+
+    def _pop_d(self) -> None:
+        self._emit("@SP", "M=M-1", "A=M", "D=M")
+
+    def _push(self) -> None:
+        kind = self.random.random()
+        if kind < 0.4:
+            self._emit("@" + str(self.random.randrange(100)), "D=A")
+        elif kind < 0.8:
+            self._emit("@" + str(self.random.randrange(8)), "D=A",
+                       "@" + self.random.choice(_SEGMENTS), "A=M+D", "D=M")
+        else:
+            self._emit("@" + self._static(), "D=M")
+        self._push_d()
+
+    def _pop(self) -> None:
+        if self.random.random() < 0.3:
+            self._pop_d()
+            self._emit("@" + self._static(), "M=D")
+            return
+        self._emit("@" + str(self.random.randrange(8)), "D=A",
+                   "@" + self.random.choice(_SEGMENTS), "A=M", "D=A+D",
+                   "@R13", "M=D")
+        self._pop_d()
+        self._emit("@R13", "A=M", "M=D")
+
+    def _static(self) -> str:
+        index = self.random.randrange(self.variables)
+        return "Class" + str(index % self.classes) + "." + str(index)
+
+    def _arithmetic(self) -> None:
+        if self.random.random() < self.shift_ratio:
+            self._emit("@SP", "M=M-1", "A=M", self.random.choice(_SHIFT_OPERATIONS))
+        elif self.random.random() < 0.2:
+            self._emit("@SP", "M=M-1", "A=M", self.random.choice(_UNARY_OPERATIONS))
+        else:
+            self._pop_d()
+            self._emit("@SP", "M=M-1", "A=M", self.random.choice(_BINARY_OPERATIONS))
+        self._emit("@SP", "M=M+1")
+
+    def _comparison(self) -> None:
+        self.label_counter += 1
+        n = str(self.label_counter)
+        self._pop_d()
+        self._emit("@R13", "M=D")
+        self._reference("FIRST_POS" + n)
+        self._emit("D;JGT")
+        self._pop_d()
+        self._reference("SECOND_POS" + n)
+        self._emit("D;JGT", "@R13", "D=D-M")
+        self._reference("COMPARE" + n)
+        self._emit("0;JMP", "(FIRST_POS" + n + ")")
+        self._pop_d()
+        self._reference("SECOND_NEG" + n)
+        self._emit("D;JLT", "@R13", "D=D-M")
+        self._reference("COMPARE" + n)
+        self._emit("0;JMP", "(SECOND_POS" + n + ")", "D=1")
+        self._reference("COMPARE" + n)
+        self._emit("0;JMP", "(SECOND_NEG" + n + ")", "D=-1")
+        self._reference("COMPARE" + n)
+        self._emit("0;JMP", "(COMPARE" + n + ")")
+        self._reference("TRUE" + n)
+        self._emit("D;" + self.random.choice(_COMPARISONS), "D=0")
+        self._reference("END" + n)
+        self._emit("0;JMP", "(TRUE" + n + ")", "D=-1")
+        self._reference("END" + n)
+        self._emit("0;JMP", "(END" + n + ")")
+        self._push_d()
+
+    def _loop(self) -> None:
+        self.label_counter += 1
+        label = self.function + "$LOOP" + str(self.label_counter)
+        self._emit("(" + label + ")")
+        for i in range(self.random.randrange(1, 4)):
+            self._push()
+            self._arithmetic()
+        self._pop_d()
+        self._reference(label)
+        self._emit("D;JNE")
+
+    def _call(self, function: str) -> None:
+        self.label_counter += 1
+        return_address = function + "$ret" + str(self.label_counter)
+        self._reference(return_address)
+        self._emit("D=A")
+        self._push_d()
+        for segment in _SEGMENTS:
+            self._emit("@" + segment, "D=M")
+            self._push_d()
+        self._emit("@5", "D=A", "@" + str(self.random.randrange(4)), "D=D+A",
+                   "@SP", "D=M-D", "@ARG", "M=D", "@SP", "D=M", "@LCL", "M=D")
+        self._reference(function)
+        self._emit("0;JMP", "(" + return_address + ")")
+
+    def _function(self, name: str) -> None:
+        self.function = name
+        self._emit("(" + name + ")")
+
+    def generate(self) -> str:
+        """
+        Returns:
+            str: the text of the program.
+        """
+        functions = ["Class" + str(self.random.randrange(self.classes)) + ".f" + str(i)
+                     for i in range(max(1, self.instructions // 400))]
+        self._emit("@256", "D=A", "@SP", "M=D")
+        self._call("Sys.init")
+        self._function("Sys.init")
+        next_function = 0
+        while self.rom_address < self.instructions:
+            if next_function < len(functions) and self.rom_address >= \
+                    (2 * next_function + 1) * self.instructions // (2 * len(functions)):
+                self._function(functions[next_function])
+                next_function += 1
+            kind = self.random.random()
+            if kind < self.label_density:
+                choice = self.random.random()
+                if choice < 0.4:
+                    self._comparison()
+                elif choice < 0.7:
+                    self._loop()
+                else:
+                    self._call(self.random.choice(functions))
+            elif kind < 0.55:
+                self._push()
+            elif kind < 0.8:
+                self._pop()
+            else:
+                self._arithmetic()
+
+        # references to labels past the ROM limit can not be encoded, they
+        # are kept as plain A-instructions so the program stays assemblable
+        for index, label in self.references:
+            address = self.labels.get(label, 0)
+            if address > MAX_ROM_ADDRESS:
+                self.lines[index] = "@" + str(address & MAX_ROM_ADDRESS)
+        return "".join(
+            line + "\n" if line.startswith("(") else "    " + line + "\n"
+            for line in self.lines)
+
+
+def generate_program(**parameters: typing.Any) -> str:
+    """
+    Args:
+        parameters: the parameters of ProgramGenerator.
+
+    Returns:
+        str: the text of a generated program.
+    """
+    return ProgramGenerator(**parameters).generate()
+
+
+if "__main__" == __name__:
+    # Prints a generated program: python3 -m benchmark.ProgramGenerator [N] [seed]
+    import sys
+    sys.stdout.write(generate_program(
+        instructions=int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        seed=int(sys.argv[2]) if len(sys.argv) > 2 else 0))
@@ -0,0 +1,243 @@
+"""
+Checks every superinstruction of the VM translator of project 8 against the
+translations of its commands one after the other: random programs full of
+the sequence of commands of the superinstruction, with operands that cover
+the different forms of its template (small and large indices, every segment,
+constants of both signs, branches that are taken and that are not), are
+translated with and without it, assembled and run on the CPU emulator. The
+variables and the heap must end up identical, and the local variables,
+arguments, temp and pointer entries are copied to variables at the end so
+they are compared as well.
+
+    python3 -m benchmark.SuperinstructionCheck [--programs N] [--seed S] [--cache-top] [name ...]
+
+Every entry of the catalogue of the translator must have a generator here.
+tests/test_superinstructions.py runs the check, together with explicit edge
+cases of every entry.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import typing
+from benchmark import TranslatorBenchmark
+
+SEGMENTS = [("local", 11), ("argument", 4), ("static", 4), ("this", 11), ("that", 11), ("temp", 8)]
+THIS, THAT = 3000, 3100  # the initial pointers, in the heap
+COMMANDS = 20  # the number of sequences in every program
+
+
+def _constant(value: int) -> str:
+    """
+    Args:
+        value (int): a 16-bit value.
+
+    Returns:
+        str: VM commands that push it.
+    """
+    if value <= 0x7FFF:
+        return "push constant %d\n" % value
+    return "push constant %d\nnot\n" % (~value & 0x7FFF)
+
+
+def _value(generator: random.Random) -> int:
+    return generator.choice([0, 1, 2, 0x7FFF, 0x8000, 0xFFFF, generator.randrange(0x10000)])
+
+
+def _entry(generator: random.Random) -> typing.Tuple[str, int]:
+    return generator.choice([(segment, generator.randrange(size)) for segment, size in SEGMENTS])
+
+
+def _increment(generator: random.Random, number: int) -> str:
+    operation = generator.choice(["add", "sub"])
+    if generator.random() < 0.1:  # pointers only move a little, to stay in the heap
+        segment, index, constant = "pointer", generator.randrange(2), generator.randrange(3)
+    else:
+        (segment, index), constant = _entry(generator), generator.choice([0, 1, 1, 2, 7, 100, 0x7FFF])
+    return "push %s %d\npush constant %d\n%s\npop %s %d\n" % (segment, index, constant, operation, segment, index)
+
+
+def _array_write(generator: random.Random, number: int) -> str:
+    return "push constant %d\npush constant %d\nadd\n" % (THAT, generator.randrange(20)) \
+        + "push %s %d\n" % _entry(generator) \
+        + "pop temp 0\npop pointer 1\npush temp 0\npop that 0\n"
+
+
+def _array_read(generator: random.Random, number: int) -> str:
+    return "push constant %d\npush constant %d\nadd\n" % (THIS, generator.randrange(20)) \
+        + "pop pointer 1\npush that 0\npop %s %d\n" % _entry(generator)
+
+
+def _not_if(generator: random.Random, number: int) -> str:
+    segment, index = _entry(generator)
+    return _constant(generator.choice([0, 0xFFFF, _value(generator)])) \
+        + "not\nif-goto TAKEN%d\n" % number \
+        + "push constant 1\npop %s %d\ngoto JOIN%d\n" % (segment, index, number) \
+        + "label TAKEN%d\npush constant 2\npop %s %d\n" % (number, segment, index) \
+        + "label JOIN%d\n" % number
+
+
+def _move(generator: random.Random, number: int) -> str:
+    if generator.random() < 0.1:  # pointers only get addresses in the heap
+        return "push constant %d\npop pointer %d\n" % (generator.choice([THIS, THAT]), generator.randrange(2))
+    if generator.random() < 0.2:
+        source = "constant %d" % generator.randrange(0x8000)
+    else:
+        source = "%s %d" % generator.choice([_entry(generator), ("pointer", 0), ("pointer", 1)])
+    return "push %s\npop %s %d\n" % ((source,) + _entry(generator))
+
+
+GENERATORS = {  # superinstruction -> function that returns VM commands that use it
+    "increment": _increment,
+    "array-write": _array_write,
+    "array-read": _array_read,
+    "not-if": _not_if,
+    "move": _move,
+}
+
+
+def wrap_program(commands: str, generator: random.Random) -> str:
+    """
+    Args:
+        commands (str): VM commands, which run in a function with 11 local
+            variables and 4 arguments, with THIS and THAT in the heap.
+        generator (random.Random): the source of the initial values of the
+            segments.
+
+    Returns:
+        str: a Sys.vm file that runs the commands, and copies every segment
+        entry they can change to a variable at the end.
+    """
+    arguments = [_value(generator) for index in range(4)]
+    code = "function Sys.init 0\n" + "".join(_constant(value) for value in arguments) \
+        + "call Sys.run 4\npop temp 0\nlabel HALT\ngoto HALT\n" \
+        + "function Sys.run 11\n" \
+        + "push constant %d\npop pointer 0\npush constant %d\npop pointer 1\n" % (THIS, THAT)
+    for segment, size in SEGMENTS:
+        if segment != "argument":
+            code += "".join(_constant(_value(generator)) + "pop %s %d\n" % (segment, index) for index in range(size))
+    code += commands
+    variable = 4  # static 0-3 are a segment of their own
+    for segment, size in SEGMENTS + [("pointer", 2)]:
+        if segment not in ("static", "this", "that"):  # this and that are in the heap
+            for index in range(size):
+                code += "push %s %d\npop static %d\n" % (segment, index, variable)
+                variable += 1
+    return code + "push constant 0\nreturn\n"
+
+
+def generate_program(name: str, generator: random.Random) -> str:
+    """
+    Args:
+        name (str): a superinstruction.
+        generator (random.Random): the source of randomness.
+
+    Returns:
+        str: a Sys.vm file that uses the superinstruction (see wrap_program).
+    """
+    return wrap_program("".join(GENERATORS[name](generator, number) for number in range(COMMANDS)), generator)
+
+
+def superinstructions() -> typing.List[str]:
+    """
+    Returns:
+        typing.List[str]: the catalogue of the translator, which is read in a
+        process of its own, like the translator runs.
+    """
+    return subprocess.run(
+        [sys.executable, "-c", "from CodeWriter import SUPERINSTRUCTIONS; print(' '.join(SUPERINSTRUCTIONS))"],
+        cwd=TranslatorBenchmark.TRANSLATOR_DIRECTORY, check=True, stdout=subprocess.PIPE,
+        universal_newlines=True).stdout.split()
+
+
+def compare(program: str, name: str, options: typing.Sequence[str] = (),
+            max_cycles: int = 10 ** 6) -> typing.Tuple[typing.Dict[str, typing.Any], typing.Dict[str, typing.Any]]:
+    """Runs a program with and without a superinstruction.
+
+    Args:
+        program (str): a Sys.vm file.
+        name (str): the superinstruction.
+        options (typing.Sequence[str]): other command line options of the
+            translator, used in both runs.
+        max_cycles (int): the maximal number of cycles to run the program.
+
+    Returns:
+        typing.Tuple[typing.Dict[str, typing.Any], typing.Dict[str, typing.Any]]:
+        the results of run_program (see TranslatorBenchmark.py) without and
+        with the superinstruction, with its assembly code as "source".
+
+    Raises:
+        RuntimeError: if the program behaves differently with it, or does
+            not run to its end.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        directory = os.path.join(temporary_directory, "Sys")
+        os.makedirs(directory)
+        with open(os.path.join(directory, "Sys.vm"), 'w') as program_file:
+            program_file.write(program)
+        for variant, variant_options in (("naive", list(options)),
+                                         (name, list(options) + ["--superinstructions", name])):
+            source = TranslatorBenchmark.translate(directory, variant_options)
+            try:
+                result = TranslatorBenchmark.run_program(source, max_cycles)
+            except IndexError:  # the emulator has no RAM there
+                raise RuntimeError("%s: wrote outside of the RAM" % variant)
+            if not result["halted"]:
+                raise RuntimeError("%s: did not halt in %d cycles" % (variant, max_cycles))
+            result["source"] = source
+            results.append(result)
+    if not TranslatorBenchmark._same_ram(results[0]["ram"], results[1]["ram"]):
+        raise RuntimeError("%s: the RAM differs from the one of the naive translation" % name)
+    return results[0], results[1]
+
+
+def check(name: str, programs: int, seed: int, options: typing.Sequence[str] = ()) -> str:
+    """Runs random programs with and without a superinstruction.
+
+    Args:
+        name (str): the superinstruction.
+        programs (int): the number of programs.
+        seed (int): the seed of the first program, the others follow it.
+        options (typing.Sequence[str]): other command line options of the
+            translator, used in both runs.
+
+    Returns:
+        str: a line with the total ROM size and cycle count of the programs
+        without and with the superinstruction.
+
+    Raises:
+        RuntimeError: if a program behaves differently with it.
+    """
+    naive_words = naive_cycles = words = cycles = 0
+    for program_seed in range(seed, seed + programs):
+        try:
+            naive, result = compare(generate_program(name, random.Random(program_seed)), name, options)
+        except RuntimeError as error:
+            raise RuntimeError("seed %d: %s" % (program_seed, error))
+        naive_words += naive["rom_words"]
+        naive_cycles += naive["cycles"]
+        words += result["rom_words"]
+        cycles += result["cycles"]
+    return "%-12s %d programs equivalent  ROM %+6.1f%%  cycles %+6.1f%%" % (
+        name, programs, 100.0 * (words / naive_words - 1), 100.0 * (cycles / naive_cycles - 1))
+
+
+if "__main__" == __name__:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m benchmark.SuperinstructionCheck")
+    arg_parser.add_argument("names", nargs="*", help="superinstructions to check (default: all of them)")
+    arg_parser.add_argument("--programs", type=int, default=20)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--cache-top", action="store_true", help="translate with --cache-top as well")
+    args = arg_parser.parse_args()
+    catalogue = superinstructions()
+    try:
+        for name in args.names or catalogue:
+            if name not in catalogue or name not in GENERATORS:
+                raise RuntimeError("%s: %s" % (name, "not a superinstruction" if name not in catalogue
+                                               else "no generator to check it with"))
+            print(check(name, args.programs, args.seed, ["--cache-top"] if args.cache_top else []))
+    except (RuntimeError, subprocess.CalledProcessError) as error:
+        sys.exit(str(error))
@@ -0,0 +1,145 @@
+"""
+Compares the options of the VM translator of project 8 on a VM program: every
+variant is translated, assembled with the assembler of project 6 and run on
+the CPU emulator, and its ROM size and cycle count are reported. The static
+variables (by name, since an option may change the order in which the
+assembler allocates them) and the heap of every variant must end up identical
+to the ones of the first variant, so an option that changes the behaviour of
+the program is caught.
+
+    python3 -m benchmark.TranslatorBenchmark [--max-cycles N] [directory]
+
+The translator runs in a process of its own, since its modules have the same
+names as the ones of the assembler.
+"""
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import typing
+import benchmark  # makes the assembler modules importable
+from CPUEmulator import CPUEmulator
+from SourceMap import SourceMap
+import Main
+
+TRANSLATOR_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "project08")
+DEFAULT_PROGRAM = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "programs", "Calls")
+VARIANTS = {  # variant -> command line options of the translator
+    "inline": [],
+    "shared calls": ["--shared-calls"],
+    "shared compares": ["--shared-comparisons"],
+    "optimized": ["--optimize"],
+    "cached top": ["--cache-top"],
+    "reachable only": ["--remove-unreachable"],
+    "inlined": ["--inline"],
+    "superinstructed": ["--superinstructions"],
+}
+HEAP = slice(2048, 16384)
+
+
+def translate(directory: str, options: typing.Sequence[str]) -> str:
+    """Translates a directory of .vm files, without touching it.
+
+    Args:
+        directory (str): the directory.
+        options (typing.Sequence[str]): command line options of the
+            translator.
+
+    Returns:
+        str: the assembly code of the program.
+    """
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        program_directory = os.path.join(
+            temporary_directory, os.path.basename(os.path.abspath(directory)))
+        shutil.copytree(directory, program_directory)
+        subprocess.run(
+            [sys.executable, "Main.py", program_directory] + list(options),
+            cwd=TRANSLATOR_DIRECTORY, check=True, stdout=subprocess.DEVNULL)
+        output_path = os.path.join(
+            program_directory, os.path.basename(program_directory) + ".asm")
+        with open(output_path, 'r') as output_file:
+            return output_file.read()
+
+
+def run_program(source: str, max_cycles: int) -> typing.Dict[str, typing.Any]:
+    """Assembles a program and runs it until it halts.
+
+    Args:
+        source (str): the assembly code of the program.
+        max_cycles (int): the maximal number of cycles to run.
+
+    Returns:
+        typing.Dict[str, typing.Any]: the number of ROM words, the number of
+        cycles, whether the program halted and the observed RAM: the value
+        of every variable and the heap.
+    """
+    output_file = io.StringIO()
+    source_map = SourceMap()
+    Main.assemble_file(io.StringIO(source), output_file, source_map=source_map)
+    emulator = CPUEmulator(CPUEmulator.read_rom(io.StringIO(output_file.getvalue())))
+    emulator.run(max_cycles)
+    return {
+        "rom_words": len(emulator.rom),
+        "cycles": emulator.cycles,
+        "halted": emulator.halted,
+        "ram": ({variable: emulator.ram[address] for address, variable in source_map.variables},
+                emulator.ram[HEAP]),
+    }
+
+
+def _same_ram(ram: tuple, other_ram: tuple) -> bool:
+    variables, other_variables = ram[0], other_ram[0]
+    # a variable an option removed was never used, so it is still 0
+    return ram[1] == other_ram[1] and all(
+        variables.get(variable, 0) == other_variables.get(variable, 0)
+        for variable in variables.keys() | other_variables.keys())
+
+
+def compare_variants(
+        directory: str, variants: typing.Dict[str, typing.Sequence[str]] = VARIANTS,
+        max_cycles: int = 10 ** 7) -> typing.List[str]:
+    """
+    Args:
+        directory (str): a directory of .vm files with a Sys.init function.
+        variants (typing.Dict[str, typing.Sequence[str]]): the variants to
+            compare, the first of them being the baseline.
+        max_cycles (int): the maximal number of cycles to run every variant.
+
+    Returns:
+        typing.List[str]: one line per variant, with its ROM size and cycle
+        count and their change relative to the baseline.
+    """
+    lines = []
+    baseline = None
+    for variant, options in variants.items():
+        result = run_program(translate(directory, options), max_cycles)
+        if not result["halted"]:
+            raise RuntimeError("%s: did not halt in %d cycles" % (variant, max_cycles))
+        if baseline is None:
+            baseline = result
+        elif not _same_ram(result["ram"], baseline["ram"]):
+            raise RuntimeError("%s: the RAM differs from the one of %s" % (
+                variant, next(iter(variants))))
+        lines.append("%-16s ROM %6d words (%+6.1f%%)  %9d cycles (%+6.1f%%)" % (
+            variant, result["rom_words"],
+            100.0 * (result["rom_words"] / baseline["rom_words"] - 1),
+            result["cycles"], 100.0 * (result["cycles"] / baseline["cycles"] - 1)))
+    return lines
+
+
+if "__main__" == __name__:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m benchmark.TranslatorBenchmark")
+    arg_parser.add_argument(
+        "directory", nargs="?", default=DEFAULT_PROGRAM,
+        help="a directory of .vm files with a Sys.init function")
+    arg_parser.add_argument("--max-cycles", type=int, default=10 ** 7)
+    args = arg_parser.parse_args()
+    try:
+        print("\n".join(compare_variants(args.directory, max_cycles=args.max_cycles)))
+    except (RuntimeError, subprocess.CalledProcessError) as error:
+        sys.exit(str(error))
@@ -0,0 +1,17 @@
+"""
+Benchmarks for the Hack assembler of project 6, and for the options of the
+VM translator of project 8 (see TranslatorBenchmark.py), with a check of its
+superinstructions against the commands they replace
+(see SuperinstructionCheck.py).
+
+The assembler is a set of flat modules that are run from their own
+directory, so importing this package makes them importable as well.
+Run "python3 -m benchmark --help" from the repository root for usage.
+"""
+import os
+import sys
+
+ASSEMBLER_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "project06")
+if ASSEMBLER_DIRECTORY not in sys.path:
+    sys.path.insert(0, ASSEMBLER_DIRECTORY)
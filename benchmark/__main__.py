@@ -0,0 +1,73 @@
+"""
+Command line interface of the assembler benchmarks:
+
+    python3 -m benchmark [--instructions N] [--output report.json]
+                         [--compare previous.json] [program.asm]
+
+Without a program, a synthetic one is generated with the given parameters.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from benchmark.AssemblerBenchmark import available_modes, compare, run_benchmark
+from benchmark.ProgramGenerator import ProgramGenerator
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(prog="python3 -m benchmark")
+    arg_parser.add_argument(
+        "program", nargs="?",
+        help="an .asm file to benchmark instead of a generated program")
+    arg_parser.add_argument("--instructions", type=int, default=100000)
+    arg_parser.add_argument("--label-density", type=float, default=0.05)
+    arg_parser.add_argument("--variables", type=int, default=64)
+    arg_parser.add_argument("--shift-ratio", type=float, default=0.1)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument(
+        "--modes", nargs="+", default=available_modes(),
+        choices=available_modes(), help="assembler modes to measure")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--output", help="write the JSON report here")
+    arg_parser.add_argument(
+        "--compare", metavar="REPORT",
+        help="print the change relative to an older JSON report")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        program_parameters = None
+        path = args.program
+        if path is None:
+            program_parameters = {
+                "instructions": args.instructions,
+                "label_density": args.label_density,
+                "variables": args.variables,
+                "shift_ratio": args.shift_ratio,
+                "seed": args.seed}
+            path = os.path.join(directory, "Generated.asm")
+            with open(path, 'w') as program_file:
+                program_file.write(ProgramGenerator(**program_parameters).generate())
+        report = run_benchmark(path, args.modes, args.repeat)
+    if program_parameters is not None:
+        report["program"]["generator"] = program_parameters
+
+    for mode, result in report["results"].items():
+        print("%-12s %8.3f s %12.0f instructions/s %8d KB peak RSS" % (
+            mode, result["seconds"], result["instructions_per_second"],
+            result["peak_rss_kb"]))
+        print(" " * 13 + "  ".join(
+            "%s %.3f s" % phase for phase in result["phases"].items()))
+    if args.compare:
+        with open(args.compare, 'r') as previous_file:
+            print("\n".join(compare(json.load(previous_file), report)))
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,139 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import glob
+import hashlib
+import os
+import shutil
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_assembler_version = None
+
+
+def assembler_version() -> str:
+    """
+    Returns:
+        str: a hash of the assembler's source code, so that changing the
+        assembler invalidates everything it has cached before.
+    """
+    global _assembler_version
+    if _assembler_version is None:
+        version = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for source_path in sorted(glob.glob(os.path.join(directory, "*.py"))):
+            with open(source_path, 'rb') as source_file:
+                version.update(source_file.read())
+        _assembler_version = version.hexdigest()
+    return _assembler_version
+
+
+class AssemblyCache:
+    """An on-disk cache of assembler outputs (.hack files or .hackb images),
+    keyed by a hash of the input's content, the output format and the
+    assembler version. The total size of the cache is bounded: when it grows
+    past its limit, the least recently used entries are evicted. Entries are
+    written atomically, so processes may share the cache.
+    """
+
+    DEFAULT_DIRECTORY = os.environ.get(
+        "HACK_ASSEMBLER_CACHE",
+        os.path.join(os.path.expanduser("~"), ".cache", "hack-assembler"))
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024  # bytes
+
+    def __init__(
+            self, directory: str = DEFAULT_DIRECTORY,
+            max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """Opens (and creates, if needed) the cache directory.
+
+        Args:
+            directory (str): the directory holding the cache entries.
+            max_size (int): the maximal total size of the entries, in bytes.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, input_path: str, extension: str, options: str = "") -> str:
+        """
+        Args:
+            input_path (str): path of the .asm file.
+            extension (str): extension of the output, ".hack" or ".hackb".
+            options (str): the assembler options that change the output.
+
+        Returns:
+            str: the cache key of the output of the given file.
+        """
+        digest = hashlib.sha256()
+        digest.update((assembler_version() + extension + options + "\n").encode())
+        with open(input_path, 'rb') as input_file:
+            for chunk in iter(lambda: input_file.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest() + extension
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """Copies a cached output, if there is one, and marks it as used.
+
+        Args:
+            key (str): the cache key of the output.
+            output_path (str): where to copy the cached output to.
+
+        Returns:
+            bool: True on a cache hit, False otherwise.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            shutil.copyfile(entry_path, output_path)
+            os.utime(entry_path)  # the modification time orders the LRU
+        except FileNotFoundError:  # a miss, or evicted by another process
+            return False
+        return True
+
+    def store(self, key: str, output_path: str) -> None:
+        """Adds an output to the cache, evicting old entries if needed.
+
+        Args:
+            key (str): the cache key of the output.
+            output_path (str): the output to store.
+        """
+        entry_path = self._entry_path(key)
+        temp_path = entry_path + "." + str(os.getpid()) + ".tmp"
+        try:
+            shutil.copyfile(output_path, temp_path)
+            os.replace(temp_path, entry_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in
+        its size limit.
+        """
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp") or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+        entries.sort()
+        for mtime, size, entry_path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
@@ -0,0 +1,145 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import json
+import typing
+import HackISA
+from SymbolTable import SymbolTable
+
+ROM_SIZE = 32768
+FIRST_VARIABLE_ADDRESS = 16
+
+
+class AssemblyStats:
+    """Statistics of the assembly of a single file, filled in by the
+    assembler when it is given an AssemblyStats object. Instructions are
+    counted from the encoded output (once per output chunk), so collecting
+    statistics does not slow down the per-instruction loops.
+    """
+
+    def __init__(self) -> None:
+        self.times = {"pass 1": 0.0, "pass 2": 0.0, "I/O": 0.0}  # seconds
+        self.a_instructions = 0
+        self.c_instructions = 0
+        self.shift_instructions = 0  # counted in c_instructions as well
+        self.labels = 0
+        self.symbols = 0
+        self.symbol_table_bytes = 0
+        self.variables = 0
+        self.cached = False
+        self.optimizations = {}  # optimization pass -> instructions removed per rule
+        self.cycles_saved = {}  # optimization pass -> cycles saved by one run of every rewritten jump
+
+    def count_lines(self, lines: typing.Sequence[str]) -> None:
+        """Counts encoded instructions in .hack text form.
+
+        Args:
+            lines (typing.Sequence[str]): binary lines.
+        """
+        for line in lines:
+            if line[0] == "0":
+                self.a_instructions += 1
+            else:
+                self.c_instructions += 1
+                if line[:3] == "101":
+                    self.shift_instructions += 1
+
+    def count_words(self, words: typing.Iterable[int]) -> None:
+        """Counts encoded instructions.
+
+        Args:
+            words (typing.Iterable[int]): instruction words.
+        """
+        for word in words:
+            if word & 0x8000:
+                self.c_instructions += 1
+                if word >> 13 == HackISA.SHIFT_PREFIX:
+                    self.shift_instructions += 1
+            else:
+                self.a_instructions += 1
+
+    def set_symbols(self, symbol_table: SymbolTable, next_ram_address: int) -> None:
+        """
+        Args:
+            symbol_table (SymbolTable): the final symbol table.
+            next_ram_address (int): the address the next variable would get.
+        """
+        self.symbols = len(symbol_table)
+        self.symbol_table_bytes = symbol_table.memory_usage()["total"]
+        self.variables = next_ram_address - FIRST_VARIABLE_ADDRESS
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns:
+            typing.Dict[str, typing.Any]: the statistics, as plain values.
+        """
+        rom_size = self.a_instructions + self.c_instructions
+        return {
+            "cached": self.cached,
+            "times": self.times,
+            "optimizations": self.optimizations,
+            "cycles_saved": self.cycles_saved,
+            "a_instructions": self.a_instructions,
+            "c_instructions": self.c_instructions,
+            "shift_instructions": self.shift_instructions,
+            "labels": self.labels,
+            "symbols": self.symbols,
+            "symbol_table_bytes": self.symbol_table_bytes,
+            "variables": self.variables,
+            "highest_ram_address": FIRST_VARIABLE_ADDRESS + self.variables - 1
+            if self.variables else None,
+            "rom_size": rom_size,
+            "rom_usage": rom_size / ROM_SIZE,
+        }
+
+    def format(self, as_json: bool = False) -> str:
+        """
+        Args:
+            as_json (bool): return JSON instead of human-readable text.
+
+        Returns:
+            str: the statistics report.
+        """
+        stats = self.to_dict()
+        if as_json:
+            return json.dumps(stats)
+        if self.cached:
+            return "  reused a cached output"
+        return "\n".join([
+            "  time: " + ", ".join(
+                "%s %.3f s" % (phase, seconds) for phase, seconds in self.times.items()),
+            "  instructions: %d A, %d C (%d shift), %d labels" % (
+                stats["a_instructions"], stats["c_instructions"],
+                stats["shift_instructions"], stats["labels"]),
+            "  symbols: %d (%.1f KB), variables: %d, highest RAM address: %s" % (
+                stats["symbols"], stats["symbol_table_bytes"] / 1024,
+                stats["variables"], stats["highest_ram_address"]),
+            "  ROM: %d / %d words (%.1f%%)%s" % (
+                stats["rom_size"], ROM_SIZE, 100 * stats["rom_usage"],
+                "" if stats["rom_size"] <= ROM_SIZE else ", does not fit"),
+        ] + self.format_optimizations().splitlines())
+
+    def format_optimizations(self) -> str:
+        """
+        Returns:
+            str: one line per optimization pass, with the number of
+            instructions (ROM words) it removed and the cycles it saved, or
+            an empty string.
+        """
+        if self.cached:
+            return "  reused a cached output"
+        lines = []
+        for name, removed in self.optimizations.items():
+            line = "  %s: removed %d instructions" % (name, sum(removed.values()))
+            if removed:
+                line += " (" + ", ".join(
+                    "%s %d" % (rule, count) for rule, count in removed.items()) + ")"
+            if name in self.cycles_saved:
+                line += ", %d cycles saved per run of every rewritten jump" \
+                    % self.cycles_saved[name]
+            lines.append(line)
+        return "\n".join(lines)
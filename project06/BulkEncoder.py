@@ -0,0 +1,232 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import io
+import sys
+import time
+import typing
+from AssemblyStats import AssemblyStats
+from SymbolTable import SymbolTable
+from Parser import Parser
+import HackISA
+
+try:
+    import numpy
+except ImportError:  # numpy is only needed by the bulk engine
+    numpy = None
+
+# instruction kinds, stored in the kinds column
+A_LITERAL = 0
+A_SYMBOL = 1
+C_INSTRUCTION = 2
+
+TEXT_CHUNK_WORDS = 65536  # words converted to text at a time
+
+
+class Program:
+    """A parsed program in columnar form: one kind and one operand per
+    instruction. The operand of an A-instruction is its value or the index of
+    its symbol in symbols, and the operand of a C-instruction is the index of
+    its mnemonic in mnemonics.
+    """
+
+    def __init__(self) -> None:
+        self.kinds = bytearray()
+        self.operands = array.array("l")
+        self.symbols = []  # symbols referenced by A-instructions, by first use
+        self.mnemonics = []  # distinct C-instructions, by first use
+        self.labels = 0
+        self.symbol_table = SymbolTable()
+
+
+def parse(input_file: typing.TextIO) -> Program:
+    """Parses a program into columns, reading it once. Symbols are only
+    numbered here, they are resolved by encode once all labels are known.
+
+    Args:
+        input_file (typing.TextIO): the file to assemble.
+
+    Returns:
+        Program: the parsed program.
+    """
+    program = Program()
+    kinds, operands = program.kinds, program.operands
+    symbol_ids = {}
+    mnemonic_ids = {}
+    parser = Parser(input_file)
+    while parser.has_more_commands():
+        parser.advance()
+        command = parser.command_type()
+        if command == "A_COMMAND":
+            symbol = parser.cur_line[1:]
+            if symbol.isnumeric():
+                kinds.append(A_LITERAL)
+                operands.append(int(symbol))
+                continue
+            symbol_id = symbol_ids.get(symbol)
+            if symbol_id is None:
+                symbol_id = symbol_ids[symbol] = len(program.symbols)
+                program.symbols.append(symbol)
+            kinds.append(A_SYMBOL)
+            operands.append(symbol_id)
+        elif command == "C_COMMAND":
+            mnemonic_id = mnemonic_ids.get(parser.cur_line)
+            if mnemonic_id is None:
+                mnemonic_id = mnemonic_ids[parser.cur_line] = len(program.mnemonics)
+                program.mnemonics.append(parser.cur_line)
+            kinds.append(C_INSTRUCTION)
+            operands.append(mnemonic_id)
+        elif command == "L_COMMAND":
+            program.symbol_table.add_entry(parser.symbol(), len(kinds))
+            program.labels += 1
+    return program
+
+
+def encode(
+        program: Program,
+        stats: typing.Optional[AssemblyStats] = None) -> "numpy.ndarray":
+    """Builds all the words of a program at once.
+
+    Args:
+        program (Program): a parsed program.
+        stats (typing.Optional[AssemblyStats]): collects the instruction and
+            symbol statistics if given.
+
+    Returns:
+        numpy.ndarray: the instructions of the program, as uint16 words.
+    """
+    if numpy is None:
+        raise ImportError("the bulk engine requires numpy")
+    # resolves symbols: labels and predefined symbols are already in the
+    # table, the rest are variables allocated from RAM 16 in first-use order
+    symbol_table = program.symbol_table
+    ram_address = 16
+    for symbol in program.symbols:
+        if not symbol_table.contains(symbol):
+            symbol_table.add_entry(symbol, ram_address)
+            ram_address += 1
+    addresses = numpy.array(
+        [symbol_table.get_address(symbol) for symbol in program.symbols],
+        dtype=numpy.int64)
+
+    # dest, comp (with the prefix) and jump codes of every distinct mnemonic
+    fields = [HackISA.decode_fields(HackISA.encode_c_instruction(mnemonic))
+              for mnemonic in program.mnemonics]
+    prefix_comp = numpy.array([(prefix << 7) | comp for prefix, comp, dest, jump in fields],
+                              dtype=numpy.uint16)
+    dest = numpy.array([dest for prefix, comp, dest, jump in fields], dtype=numpy.uint16)
+    jump = numpy.array([jump for prefix, comp, dest, jump in fields], dtype=numpy.uint16)
+
+    kinds = numpy.frombuffer(program.kinds, dtype=numpy.uint8)
+    operands = numpy.frombuffer(program.operands, dtype=numpy.dtype("l"))
+    values = operands.copy()
+    symbol_mask = kinds == A_SYMBOL
+    if len(addresses):
+        values[symbol_mask] = addresses[operands[symbol_mask]]
+    a_mask = kinds != C_INSTRUCTION
+    out_of_range = a_mask & ((values < 0) | (values > HackISA.MAX_A_VALUE))
+    if out_of_range.any():
+        raise ValueError("A-instruction value out of range: "
+                         + str(values[out_of_range][0]))
+
+    words = numpy.empty(len(kinds), dtype=numpy.uint16)
+    words[a_mask] = values[a_mask]
+    c_mask = ~a_mask
+    if c_mask.any():
+        ids = operands[c_mask]
+        words[c_mask] = (prefix_comp[ids] << 6) | (dest[ids] << 3) | jump[ids]
+
+    if stats is not None:
+        stats.a_instructions += int(a_mask.sum())
+        stats.c_instructions += int(c_mask.sum())
+        stats.shift_instructions += int((words >> 13 == HackISA.SHIFT_PREFIX).sum())
+        stats.labels += program.labels
+        stats.set_symbols(symbol_table, ram_address)
+    return words
+
+
+def write_text(words: "numpy.ndarray", output_file: typing.TextIO) -> None:
+    """Writes words as .hack text, converting whole chunks at once.
+
+    Args:
+        words (numpy.ndarray): uint16 words.
+        output_file (typing.TextIO): writes all output to this file.
+    """
+    shifts = numpy.arange(15, -1, -1, dtype=numpy.uint16)
+    for start in range(0, len(words), TEXT_CHUNK_WORDS):
+        chunk = words[start:start + TEXT_CHUNK_WORDS]
+        text = numpy.empty((len(chunk), 17), dtype=numpy.uint8)
+        text[:, :16] = ((chunk[:, None] >> shifts) & 1) + ord("0")
+        text[:, 16] = ord("\n")
+        output_file.write(text.tobytes().decode("ascii"))
+
+
+def _parse_and_encode(
+        input_file: typing.TextIO,
+        stats: typing.Optional[AssemblyStats]) -> "numpy.ndarray":
+    """Runs parse (timed as pass 1) and encode (timed as pass 2)."""
+    start = time.perf_counter()
+    program = parse(input_file)
+    middle = time.perf_counter()
+    words = encode(program, stats)
+    if stats is not None:
+        stats.times["pass 1"] += middle - start
+        stats.times["pass 2"] += time.perf_counter() - middle
+    return words
+
+
+def assemble_words_bulk(
+        input_file: typing.TextIO,
+        stats: typing.Optional[AssemblyStats] = None) -> array.array:
+    """Like Main.assemble_words, using the bulk engine.
+
+    Args:
+        input_file (typing.TextIO): the file to assemble.
+        stats (typing.Optional[AssemblyStats]): collects statistics if given.
+
+    Returns:
+        array.array: the instructions of the program, as uint16 words.
+    """
+    words = array.array("H")
+    words.frombytes(_parse_and_encode(input_file, stats).tobytes())
+    return words
+
+
+def assemble_file_bulk(
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        stats: typing.Optional[AssemblyStats] = None) -> None:
+    """Like Main.assemble_file, using the bulk engine.
+
+    Args:
+        input_file (typing.TextIO): the file to assemble.
+        output_file (typing.TextIO): writes all output to this file.
+        stats (typing.Optional[AssemblyStats]): collects statistics if given.
+    """
+    words = _parse_and_encode(input_file, stats)
+    start = time.perf_counter()
+    write_text(words, output_file)
+    if stats is not None:
+        stats.times["I/O"] += time.perf_counter() - start
+
+
+if "__main__" == __name__:
+    # Compares the bulk engine with the scalar assembler on the given file.
+    if not len(sys.argv) == 2:
+        sys.exit("Invalid usage, please use: python3 BulkEncoder.py <input file>")
+    import Main
+    with open(sys.argv[1], 'r') as input_file:
+        source = input_file.read()
+    outputs = {}
+    for engine, assemble in (("scalar", Main.assemble_file),
+                             ("bulk", assemble_file_bulk)):
+        output_file = io.StringIO()
+        start = time.perf_counter()
+        assemble(io.StringIO(source), output_file)
+        print(engine + ":", "%.3f" % (time.perf_counter() - start), "s")
+        outputs[engine] = output_file.getvalue()
+    print("identical:", outputs["scalar"] == outputs["bulk"])
@@ -0,0 +1,163 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import sys
+import typing
+import HackISA
+
+RAM_SIZE = 32768
+
+
+class CPUEmulator:
+    """Executes Hack machine code, including the shift extension of CpuMul.
+    Every instruction takes one cycle. Execution stops when the program
+    enters the usual "(END) @END 0;JMP" halting loop, runs past the end of
+    the ROM or reaches the cycle limit.
+    """
+
+    _comp_functions = {}  # (prefix, comp code) -> function of (x=D, y=A/M)
+
+    def __init__(self, rom: typing.Sequence[int]) -> None:
+        """Loads a program into the ROM and resets the computer.
+
+        Args:
+            rom (typing.Sequence[int]): the instructions of the program.
+        """
+        self.rom = list(rom)
+        self.program = [self._decode(word) for word in self.rom]
+        self.ram = [0] * RAM_SIZE
+        self.a = 0
+        self.d = 0
+        self.pc = 0
+        self.cycles = 0
+        self.halted = False
+
+    @staticmethod
+    def read_rom(input_file: typing.TextIO) -> typing.List[int]:
+        """
+        Args:
+            input_file (typing.TextIO): a .hack file.
+
+        Returns:
+            typing.List[int]: the instructions in the file.
+        """
+        return [int(line, 2) for line in input_file.read().split()]
+
+    @staticmethod
+    def _comp_function(prefix: int, comp_code: int) -> typing.Callable:
+        """
+        Args:
+            prefix (int): bits 15..13 of the instruction.
+            comp_code (int): the a and c1..c6 bits of the instruction.
+
+        Returns:
+            typing.Callable: computes the 16-bit ALU output from x (D) and
+            y (A or M), as wired in ALU.hdl and ExtendAlu.hdl.
+        """
+        key = (prefix, comp_code)
+        function = CPUEmulator._comp_functions.get(key)
+        if function is not None:
+            return function
+        if prefix == HackISA.SHIFT_PREFIX:
+            shift_x = comp_code & 0b010000
+            if comp_code & 0b100000:  # left shift
+                def function(x, y):
+                    return ((x if shift_x else y) << 1) & 0xFFFF
+            else:  # arithmetic right shift
+                def function(x, y):
+                    value = x if shift_x else y
+                    return (value >> 1) | (value & 0x8000)
+        else:
+            zx, nx, zy, ny, f, no = [(comp_code >> bit) & 1 for bit in range(5, -1, -1)]
+
+            def function(x, y):
+                if zx:
+                    x = 0
+                if nx:
+                    x ^= 0xFFFF
+                if zy:
+                    y = 0
+                if ny:
+                    y ^= 0xFFFF
+                out = (x + y) & 0xFFFF if f else x & y
+                return out ^ 0xFFFF if no else out
+        CPUEmulator._comp_functions[key] = function
+        return function
+
+    @staticmethod
+    def _decode(word: int) -> typing.Optional[tuple]:
+        """
+        Args:
+            word (int): a 16-bit instruction.
+
+        Returns:
+            typing.Optional[tuple]: None for an A-instruction, otherwise the
+            comp function, whether it reads M, and the dest and jump codes.
+        """
+        if not word & 0x8000:
+            return None
+        prefix, comp_code, dest_code, jump_code = HackISA.decode_fields(word)
+        return (CPUEmulator._comp_function(prefix, comp_code),
+                bool(comp_code & 0b1000000), dest_code, jump_code)
+
+    def run(self, max_cycles: int = 10 ** 8) -> int:
+        """Runs the program until it halts or max_cycles cycles have passed.
+
+        Args:
+            max_cycles (int): the maximal number of cycles to run.
+
+        Returns:
+            int: the total number of cycles executed so far.
+        """
+        rom, program, ram = self.rom, self.program, self.ram
+        a, d, pc = self.a, self.d, self.pc
+        rom_size = len(rom)
+        remaining = max_cycles
+        while remaining and pc < rom_size:
+            remaining -= 1
+            decoded = program[pc]
+            if decoded is None:
+                a = rom[pc]
+                pc += 1
+                continue
+            function, reads_m, dest_code, jump_code = decoded
+            out = function(d, ram[a] if reads_m else a)
+            if dest_code & 0b001:
+                ram[a] = out
+            target = a
+            if dest_code & 0b100:
+                a = out
+            if dest_code & 0b010:
+                d = out
+            if jump_code and ((jump_code & 0b100 and out & 0x8000) or
+                              (jump_code & 0b010 and out == 0) or
+                              (jump_code & 0b001 and out and not out & 0x8000)):
+                if target == pc - 1 and rom[target] == target:  # (END) @END 0;JMP
+                    self.halted = True
+                    pc = target
+                    break
+                pc = target
+            else:
+                pc += 1
+        self.cycles += max_cycles - remaining
+        self.a, self.d, self.pc = a, d, pc
+        self.halted = self.halted or pc >= rom_size
+        return self.cycles
+
+
+if "__main__" == __name__:
+    # Runs the given .hack file and prints the cycle count and registers.
+    if not len(sys.argv) in (2, 3):
+        sys.exit("Invalid usage, please use: python3 CPUEmulator.py <input file> [max cycles]")
+    with open(sys.argv[1], 'r') as input_file:
+        emulator = CPUEmulator(CPUEmulator.read_rom(input_file))
+    if len(sys.argv) == 3:
+        emulator.run(int(sys.argv[2]))
+    else:
+        emulator.run()
+    print("cycles:", emulator.cycles, "halted:", emulator.halted)
+    print("R0-R15:", emulator.ram[:16])
@@ -7,9 +7,12 @@ Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
 
 
+import HackISA
+
+
 class Code:
     """Translates Hack assembly language mnemonics into binary codes."""
-    
+
     @staticmethod
     def dest(mnemonic: str) -> str:
         """
@@ -19,22 +22,7 @@ class Code:
         Returns:
             str: 3-bit long binary code of the given mnemonic.
         """
-        if mnemonic== "":
-            return "000"
-        elif mnemonic == "M":
-            return "001"
-        elif mnemonic == "D":
-            return "010"
-        elif mnemonic == "DM" or mnemonic == "MD":  # left both options due to discrepancy between lecture/instructions
-            return "011"
-        elif mnemonic == "A":
-            return "100"
-        elif mnemonic == "AM":
-            return "101"
-        elif mnemonic == "AD":
-            return "110"
-        elif mnemonic == "ADM" or mnemonic == "AMD":  # added AMD just in case
-            return "111"
+        return format(HackISA.DEST[mnemonic], "03b")
 
     @staticmethod
     def comp(mnemonic: str) -> str:
@@ -43,77 +31,11 @@ class Code:
             mnemonic (str): a comp mnemonic string.
 
         Returns:
-            str: the binary code of the given mnemonic.
+            str: the binary code of the given mnemonic (a and c1..c6).
         """
-        if mnemonic == "0":
-            return "0101010"
-        elif mnemonic == "1":
-            return "0111111"
-        elif mnemonic == "-1":
-            return "0111010"
-        elif mnemonic == "D":
-            return "0001100"
-        elif mnemonic == "A":
-            return "0110000"
-        elif mnemonic == "M":
-            return "1110000"
-        elif mnemonic == "!D":
-            return "0001101"
-        elif mnemonic == "!A":
-            return "0110001"
-        elif mnemonic == "!M":
-            return "1110001"
-        elif mnemonic == "-D":
-            return "0001111"
-        elif mnemonic == "-A":
-            return "0110011"
-        elif mnemonic == "-M":
-            return "1110011"
-        elif mnemonic == "D+1":
-            return "0011111"
-        elif mnemonic == "A+1":
-            return "0110111"
-        elif mnemonic == "M+1":
-            return "1110111"
-        elif mnemonic == "D-1":
-            return "0001110"
-        elif mnemonic == "A-1":
-            return "0110010"
-        elif mnemonic == "M-1":
-            return "1110010"
-        elif mnemonic == "D+A":
-            return "0000010"
-        elif mnemonic == "D+M":
-            return "1000010"
-        elif mnemonic == "D-A":
-            return "0010011"
-        elif mnemonic == "D-M":
-            return "1010011"
-        elif mnemonic == "A-D":
-            return "0000111"
-        elif mnemonic == "M-D":
-            return "1000111"
-        elif mnemonic == "D&A":
-            return "0000000"
-        elif mnemonic == "D&M":
-            return "1000000"
-        elif mnemonic == "D|A":
-            return "0010101"
-        elif mnemonic == "D|M":
-            return "1010101"
-        elif mnemonic == "A<<":
-            return "0100000"
-        elif mnemonic == "D<<":
-            return "0110000"
-        elif mnemonic == "M<<":
-            return "1100000"
-        elif mnemonic == "A>>":
-            return "0000000"
-        elif mnemonic == "D>>":
-            return "0010000"
-        elif mnemonic == "M>>":
-            return "1000000"
-
+        if HackISA.is_shift(mnemonic):
+            return format(HackISA.SHIFT_COMP[mnemonic], "07b")
+        return format(HackISA.COMP[mnemonic], "07b")
 
     @staticmethod
     def jump(mnemonic: str) -> str:
@@ -124,19 +46,15 @@ class Code:
         Returns:
             str: 3-bit long binary code of the given mnemonic.
         """
-        if mnemonic == "":
-            return "000"
-        elif mnemonic == "JGT":
-            return "001"
-        elif mnemonic == "JEQ":
-            return "010"
-        elif mnemonic == "JGE":
-            return "011"
-        elif mnemonic == "JLT":
-            return "100"
-        elif mnemonic == "JNE":
-            return "101"
-        elif mnemonic == "JLE":
-            return "110"
-        elif mnemonic == "JMP":
-            return "111"
+        return format(HackISA.JUMP[mnemonic], "03b")
+
+    @staticmethod
+    def c_instruction(instruction: str) -> str:
+        """
+        Args:
+            instruction (str): a whole C-instruction (regular or shift).
+
+        Returns:
+            str: 16-bit long binary code of the given instruction.
+        """
+        return HackISA.encode_c_instruction_text(instruction)
@@ -0,0 +1,32 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import sys
+import typing
+import HackISA
+
+
+def disassemble_file(
+        input_file: typing.TextIO, output_file: typing.TextIO) -> None:
+    """Translates a .hack file back into (symbol-less) Hack assembly.
+
+    Args:
+        input_file (typing.TextIO): the .hack file to disassemble.
+        output_file (typing.TextIO): writes all output to this file.
+    """
+    for line in input_file:
+        line = line.strip()
+        if line:
+            output_file.write(HackISA.decode(int(line, 2)) + "\n")
+
+
+if "__main__" == __name__:
+    # Disassembles the given .hack file and prints the result.
+    if not len(sys.argv) == 2:
+        sys.exit("Invalid usage, please use: python3 Disassembler.py <input file>")
+    with open(sys.argv[1], 'r') as input_file:
+        disassemble_file(input_file, sys.stdout)
@@ -0,0 +1,208 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+
+# Definition of the Hack instruction set, including the shift extension of
+# project 5 (CpuMul.hdl). This is the only place where the encoding is written
+# down: the assembler, the disassembler and the emulator all use these tables.
+#
+# | Instruction   | 15 | 14 | 13 | 12 | 11..6  | 5..3 | 2..0 |
+# |---------------|:--:|:--:|:--:|:--:|:------:|:----:|:----:|
+# | A-instruction |  0 |         value (15 bits)             |
+# | C-instruction |  1 |  1 |  1 |  a | c1..c6 | dest | jump |
+# | shift         |  1 |  0 |  1 |  a | c1..c6 | dest | jump |
+
+REGULAR_PREFIX = 0b111
+SHIFT_PREFIX = 0b101
+MAX_A_VALUE = 0x7FFF
+
+DEST = {"": 0b000, "M": 0b001, "D": 0b010, "MD": 0b011, "DM": 0b011,
+        "A": 0b100, "AM": 0b101, "AD": 0b110, "AMD": 0b111, "ADM": 0b111}
+
+JUMP = {"": 0b000, "JGT": 0b001, "JEQ": 0b010, "JGE": 0b011,
+        "JLT": 0b100, "JNE": 0b101, "JLE": 0b110, "JMP": 0b111}
+
+# a bit followed by c1..c6, the first mnemonic of every code is its canonical
+# form, the others are aliases (the VM translator emits e.g. "M=M+D")
+COMP = {"0": 0b0101010, "1": 0b0111111, "-1": 0b0111010,
+        "D": 0b0001100, "A": 0b0110000, "M": 0b1110000,
+        "!D": 0b0001101, "!A": 0b0110001, "!M": 0b1110001,
+        "-D": 0b0001111, "-A": 0b0110011, "-M": 0b1110011,
+        "D+1": 0b0011111, "A+1": 0b0110111, "M+1": 0b1110111,
+        "D-1": 0b0001110, "A-1": 0b0110010, "M-1": 0b1110010,
+        "D+A": 0b0000010, "D+M": 0b1000010, "A+D": 0b0000010, "M+D": 0b1000010,
+        "D-A": 0b0010011, "D-M": 0b1010011, "A-D": 0b0000111, "M-D": 0b1000111,
+        "D&A": 0b0000000, "D&M": 0b1000000, "A&D": 0b0000000, "M&D": 0b1000000,
+        "D|A": 0b0010101, "D|M": 0b1010101, "A|D": 0b0010101, "M|D": 0b1010101}
+
+# shift operations, encoded with SHIFT_PREFIX (see CpuMul.hdl)
+SHIFT_COMP = {"A<<": 0b0100000, "D<<": 0b0110000, "M<<": 0b1100000,
+              "A>>": 0b0000000, "D>>": 0b0010000, "M>>": 0b1000000}
+
+
+def _reverse(table: typing.Dict[str, int]) -> typing.Dict[int, str]:
+    """
+    Args:
+        table (typing.Dict[str, int]): a mnemonic to code table.
+
+    Returns:
+        typing.Dict[int, str]: a code to canonical mnemonic table.
+    """
+    reverse = {}
+    for mnemonic, code in table.items():
+        reverse.setdefault(code, mnemonic)
+    return reverse
+
+
+DEST_MNEMONICS = [mnemonic for code, mnemonic in sorted(_reverse(DEST).items())]
+JUMP_MNEMONICS = [mnemonic for code, mnemonic in sorted(_reverse(JUMP).items())]
+COMP_MNEMONICS = _reverse(COMP)
+SHIFT_COMP_MNEMONICS = _reverse(SHIFT_COMP)
+
+_c_instruction_cache = {}  # whole C-instruction mnemonic -> encoded word and its 16-bit binary text
+_decode_cache = {}  # encoded word -> instruction mnemonic
+
+
+def split_c_instruction(instruction: str) -> typing.Tuple[str, str, str]:
+    """
+    Args:
+        instruction (str): a C-instruction of the form dest=comp;jump, where
+            dest and jump may be omitted, without whitespace.
+
+    Returns:
+        typing.Tuple[str, str, str]: the dest, comp and jump mnemonics.
+    """
+    dest, equals, rest = instruction.partition("=")
+    if not equals:  # no dest
+        dest, rest = "", dest
+    comp, semicolon, jump = rest.partition(";")
+    return dest, comp, jump
+
+
+def is_shift(comp: str) -> bool:
+    """
+    Args:
+        comp (str): a comp mnemonic.
+
+    Returns:
+        bool: True if the comp mnemonic is one of the shift extension.
+    """
+    return comp in SHIFT_COMP
+
+
+def _cache_c_instruction(instruction: str) -> typing.Tuple[int, str]:
+    """Encodes a C-instruction (regular or shift) and caches its encoding.
+
+    Args:
+        instruction (str): a C-instruction without whitespace, e.g. "AM=M-1".
+
+    Returns:
+        typing.Tuple[int, str]: the 16-bit word of the instruction and its
+        binary text.
+    """
+    dest, comp, jump = split_c_instruction(instruction)
+    try:
+        if comp in SHIFT_COMP:
+            word = (SHIFT_PREFIX << 13) | (SHIFT_COMP[comp] << 6)
+        else:
+            word = (REGULAR_PREFIX << 13) | (COMP[comp] << 6)
+        word |= (DEST[dest] << 3) | JUMP[jump]
+    except KeyError:
+        raise ValueError("invalid C-instruction: " + instruction) from None
+    encoding = _c_instruction_cache[instruction] = (word, format(word, "016b"))
+    return encoding
+
+
+def encode_c_instruction(instruction: str) -> int:
+    """Encodes a C-instruction (regular or shift). Encodings are cached, so
+    every repeated mnemonic costs a single dictionary lookup.
+
+    Args:
+        instruction (str): a C-instruction without whitespace, e.g. "AM=M-1".
+
+    Returns:
+        int: the 16-bit word of the instruction.
+    """
+    encoding = _c_instruction_cache.get(instruction)
+    if encoding is None:
+        encoding = _cache_c_instruction(instruction)
+    return encoding[0]
+
+
+def encode_c_instruction_text(instruction: str) -> str:
+    """Encodes a C-instruction (regular or shift) as text, from the same
+    cache as encode_c_instruction.
+
+    Args:
+        instruction (str): a C-instruction without whitespace, e.g. "AM=M-1".
+
+    Returns:
+        str: the 16-bit binary text of the instruction.
+    """
+    encoding = _c_instruction_cache.get(instruction)
+    if encoding is None:
+        encoding = _cache_c_instruction(instruction)
+    return encoding[1]
+
+
+def encode_a_instruction(value: int) -> int:
+    """
+    Args:
+        value (int): the value loaded into A, between 0 and 32767.
+
+    Returns:
+        int: the 16-bit word of the instruction.
+    """
+    if not 0 <= value <= MAX_A_VALUE:
+        raise ValueError("A-instruction value out of range: " + str(value))
+    return value
+
+
+def decode_fields(word: int) -> typing.Tuple[int, int, int, int]:
+    """Splits a C-instruction into its fields.
+
+    Args:
+        word (int): a 16-bit C-instruction.
+
+    Returns:
+        typing.Tuple[int, int, int, int]: the prefix (bits 15..13), the comp
+        code (a and c1..c6), the dest code and the jump code.
+    """
+    return word >> 13, (word >> 6) & 0b1111111, (word >> 3) & 0b111, word & 0b111
+
+
+def decode(word: int) -> str:
+    """Decodes a single instruction back into assembly.
+
+    Args:
+        word (int): a 16-bit instruction.
+
+    Returns:
+        str: the canonical mnemonic of the instruction, e.g. "@17" or "D;JGT".
+    """
+    instruction = _decode_cache.get(word)
+    if instruction is None:
+        if not word & 0x8000:
+            instruction = "@" + str(word)
+        else:
+            prefix, comp_code, dest_code, jump_code = decode_fields(word)
+            if prefix == REGULAR_PREFIX:
+                comp = COMP_MNEMONICS.get(comp_code)
+            elif prefix == SHIFT_PREFIX:
+                comp = SHIFT_COMP_MNEMONICS.get(comp_code)
+            else:
+                comp = None
+            if comp is None:
+                raise ValueError("invalid instruction: " + format(word, "016b"))
+            instruction = comp
+            if dest_code:
+                instruction = DEST_MNEMONICS[dest_code] + "=" + instruction
+            if jump_code:
+                instruction += ";" + JUMP_MNEMONICS[jump_code]
+        _decode_cache[word] = instruction
+    return instruction
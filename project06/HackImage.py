@@ -0,0 +1,153 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import mmap
+import os
+import struct
+import sys
+import typing
+import zlib
+
+# A packed ROM image (.hackb) is a 16 byte header followed by the program:
+# | Offset | Size | Field                                  |
+# |--------|------|----------------------------------------|
+# |      0 |    4 | magic, b"HACK"                         |
+# |      4 |    2 | format version                         |
+# |      6 |    2 | reserved, 0                            |
+# |      8 |    4 | number of words                        |
+# |     12 |    4 | CRC-32 of the words                    |
+# |     16 |  2*n | the words, as little-endian uint16     |
+# All header fields are little-endian as well.
+MAGIC = b"HACK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+TEXT_EXTENSION = ".hack"
+IMAGE_EXTENSION = ".hackb"
+
+
+def _to_little_endian(words: array.array) -> array.array:
+    """
+    Args:
+        words (array.array): an array('H') in the native byte order.
+
+    Returns:
+        array.array: the same words in little-endian byte order.
+    """
+    if sys.byteorder == "big":
+        words = array.array("H", words)
+        words.byteswap()
+    return words
+
+
+def write_image(
+        words: typing.Sequence[int], output_file: typing.BinaryIO) -> None:
+    """Writes a packed ROM image.
+
+    Args:
+        words (typing.Sequence[int]): the instructions of the program.
+        output_file (typing.BinaryIO): writes the image to this file.
+    """
+    if not isinstance(words, array.array) or words.typecode != "H":
+        words = array.array("H", words)
+    payload = _to_little_endian(words).tobytes()
+    output_file.write(HEADER.pack(
+        MAGIC, VERSION, 0, len(words), zlib.crc32(payload)))
+    output_file.write(payload)
+
+
+class HackImage:
+    """A packed ROM image mapped into memory. The words are exposed as a
+    read-only memoryview of uint16 over the mapping, so loading an image
+    does not copy or parse it. Use as a context manager, or call close().
+    """
+
+    def __init__(self, path: str, verify: bool = True) -> None:
+        """Maps the image and validates its header.
+
+        Args:
+            path (str): path of the .hackb file.
+            verify (bool): if this is True, the checksum is verified too.
+        """
+        with open(path, "rb") as image_file:
+            size = os.fstat(image_file.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(path + ": not a packed Hack image")
+            self._mmap = mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, reserved, count, checksum = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(path + ": not a packed Hack image")
+        if size != HEADER.size + 2 * count:
+            self.close()
+            raise ValueError(path + ": truncated packed Hack image")
+        self._payload = memoryview(self._mmap)[HEADER.size:]
+        if verify and zlib.crc32(self._payload) != checksum:
+            self.close()
+            raise ValueError(path + ": checksum mismatch")
+        if sys.byteorder == "little":
+            self.words = self._payload.cast("H")
+        else:  # the mapping can not be used as is, fall back to a copy
+            self.words = array.array("H", self._payload.tobytes())
+            self.words.byteswap()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __enter__(self) -> "HackImage":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Releases the memory mapping. The words can not be used afterwards.
+        """
+        for view in ("words", "_payload"):
+            if isinstance(getattr(self, view, None), memoryview):
+                getattr(self, view).release()
+        self._mmap.close()
+
+
+def hack_to_image(
+        input_file: typing.TextIO, output_file: typing.BinaryIO) -> None:
+    """Converts a text .hack file into a packed image.
+
+    Args:
+        input_file (typing.TextIO): the .hack file.
+        output_file (typing.BinaryIO): writes the image to this file.
+    """
+    write_image(array.array(
+        "H", (int(line, 2) for line in input_file.read().split())), output_file)
+
+
+def image_to_hack(path: str, output_file: typing.TextIO) -> None:
+    """Converts a packed image into a text .hack file.
+
+    Args:
+        path (str): path of the .hackb file.
+        output_file (typing.TextIO): writes the text to this file.
+    """
+    with HackImage(path) as image:
+        output_file.writelines(format(word, "016b") + "\n" for word in image.words)
+
+
+if "__main__" == __name__:
+    # Converts a .hack file into a .hackb image next to it, or vice versa.
+    if not len(sys.argv) == 2:
+        sys.exit("Invalid usage, please use: python3 HackImage.py <.hack or .hackb file>")
+    input_path = os.path.abspath(sys.argv[1])
+    filename, extension = os.path.splitext(input_path)
+    if extension.lower() == TEXT_EXTENSION:
+        with open(input_path, 'r') as input_file, \
+                open(filename + IMAGE_EXTENSION, 'wb') as output_file:
+            hack_to_image(input_file, output_file)
+    elif extension.lower() == IMAGE_EXTENSION:
+        with open(filename + TEXT_EXTENSION, 'w') as output_file:
+            image_to_hack(input_path, output_file)
+    else:
+        sys.exit("Invalid input, expected a .hack or a .hackb file")
@@ -0,0 +1,228 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import collections
+import typing
+import HackISA
+
+# Control flow optimization of Hack assembly, applied before symbols are
+# resolved, on the same instructions and labels as Peephole.optimize. The
+# program is split into basic blocks at labels and after jumps, and a jump
+# is a C-instruction with a jump field whose target is the label loaded by
+# the A-instruction right before it. The rewrites:
+#
+# - jump threading: a jump to a block that starts with "@L2 0;JMP" jumps to
+#   L2 at once, saving 2 cycles every time it is taken. A holds L2 either way.
+# - jump to next: "@L 0;JMP (L)" (or a conditional jump) is removed, saving
+#   2 ROM words and 2 cycles every time it runs.
+# - unreachable: instructions after an unconditional jump and before the
+#   next label are removed, and so are blocks that no path from the start of
+#   the program reaches. Labels are kept, as they take no ROM.
+#
+# Jumps change the A register, so the first two rewrites are only done when
+# the instruction that may now run with a different A loads A itself, and
+# never to a jump that also writes to M or A, since it uses the old A. Any
+# label that is loaded for another purpose than a jump (e.g. a return
+# address that is pushed) is assumed to be jumped to indirectly, so its
+# block is always reachable. As with Peephole.py, jumps are assumed to
+# target labels and not numeric addresses, and variables that are only used
+# by unreachable code are not allocated.
+
+
+def _is_label(line: str) -> bool:
+    return line.startswith("(")
+
+
+def _is_a_instruction(line: str) -> bool:
+    return line.startswith("@")
+
+
+def _jump_of(line: str) -> str:
+    """
+    Returns:
+        str: the jump mnemonic of a C-instruction, empty for anything else.
+    """
+    if _is_label(line) or _is_a_instruction(line):
+        return ""
+    return HackISA.split_c_instruction(line)[2]
+
+
+def _loads_a_next(lines: typing.List[str], index: int) -> bool:
+    """
+    Returns:
+        bool: True if the first instruction at or after index (skipping
+        labels) is an A-instruction, so the value of A before it is unused.
+    """
+    while index < len(lines) and _is_label(lines[index]):
+        index += 1
+    return index < len(lines) and _is_a_instruction(lines[index])
+
+
+def _jump_target(lines: typing.List[str], index: int,
+                 labels: typing.Dict[str, int]) -> typing.Optional[str]:
+    """
+    Returns:
+        typing.Optional[str]: the label the instruction at index jumps to, if
+        it is a jump whose target is a label loaded just before it.
+    """
+    if index > 0 and _jump_of(lines[index]) and _is_a_instruction(lines[index - 1]) \
+            and lines[index - 1][1:] in labels:
+        return lines[index - 1][1:]
+    return None
+
+
+def _first_instruction(lines: typing.List[str], label_index: int) -> int:
+    index = label_index + 1
+    while index < len(lines) and _is_label(lines[index]):
+        index += 1
+    return index
+
+
+def _thread_jumps(lines: typing.List[str], labels: typing.Dict[str, int]) -> int:
+    """Retargets jumps to blocks that jump on at once.
+
+    Returns:
+        int: the number of cycles saved by one run of every rewritten jump.
+    """
+    cycles = 0
+    for index in range(1, len(lines)):
+        target = _jump_target(lines, index, labels)
+        if target is None or "=" in lines[index]:  # a dest uses the address in A
+            continue
+        if _jump_of(lines[index]) != "JMP" and not _loads_a_next(lines, index + 1):
+            continue  # A differs when the jump is not taken
+        hops = 0
+        seen = {target}
+        while True:
+            first = _first_instruction(lines, labels[target])
+            if first + 1 >= len(lines) or not _is_a_instruction(lines[first]) \
+                    or lines[first][1:] not in labels \
+                    or _jump_of(lines[first + 1]) != "JMP" or "=" in lines[first + 1]:
+                break
+            target = lines[first][1:]
+            if target in seen:  # a loop of jumps, left as it is
+                hops = 0
+                break
+            seen.add(target)
+            hops += 1
+        if hops:
+            lines[index - 1] = "@" + target
+            cycles += 2 * hops
+    return cycles
+
+
+def _remove_jumps_to_next(lines: typing.List[str], labels: typing.Dict[str, int],
+                          removed: typing.Counter[str]) -> typing.Tuple[typing.List[str], int]:
+    """
+    Returns:
+        typing.Tuple[typing.List[str], int]: the instructions without jumps
+        to the instruction right after them, and the number of cycles saved
+        by one run of every removed jump.
+    """
+    output = []
+    cycles = 0
+    index = 0
+    while index < len(lines):
+        target = _jump_target(lines, index + 1, labels) if index + 1 < len(lines) else None
+        if target is not None and "=" not in lines[index + 1]:
+            following = index + 2
+            while following < len(lines) and _is_label(lines[following]) \
+                    and lines[following] != "(" + target + ")":
+                following += 1
+            if following < len(lines) and lines[following] == "(" + target + ")" \
+                    and _loads_a_next(lines, following):
+                removed["jump to next"] += 2
+                cycles += 2
+                index += 2
+                continue
+        output.append(lines[index])
+        index += 1
+    return output, cycles
+
+
+def _remove_unreachable(lines: typing.List[str], labels: typing.Dict[str, int],
+                        removed: typing.Counter[str]) -> typing.List[str]:
+    """
+    Returns:
+        typing.List[str]: the instructions that some path from the start of
+        the program reaches, and all labels.
+    """
+    if not lines:
+        return lines
+    # blocks start at index 0, at every label and after every jump
+    starts = [0]
+    for index, line in enumerate(lines):
+        if (_is_label(line) or (index > 0 and _jump_of(lines[index - 1]))) \
+                and starts[-1] != index:
+            starts.append(index)
+    block_of = {}  # label -> block number
+    for block, start in enumerate(starts):
+        if start < len(lines) and _is_label(lines[start]):
+            index = start
+            while index < len(lines) and _is_label(lines[index]):
+                block_of[lines[index][1:-1]] = block
+                index += 1
+    starts.append(len(lines))
+
+    # labels loaded for another purpose than a jump may be jumped to later
+    roots = [0]
+    for index, line in enumerate(lines):
+        if _is_a_instruction(line) and line[1:] in block_of and \
+                (index + 1 >= len(lines) or not _jump_of(lines[index + 1])):
+            roots.append(block_of[line[1:]])
+
+    reachable = set()
+    pending = roots
+    while pending:
+        block = pending.pop()
+        if block in reachable or block >= len(starts) - 1:
+            continue
+        reachable.add(block)
+        last = starts[block + 1] - 1
+        target = _jump_target(lines, last, labels)
+        if target is not None:
+            pending.append(block_of[target])
+        if _jump_of(lines[last]) != "JMP":
+            pending.append(block + 1)
+
+    output = []
+    for block in range(len(starts) - 1):
+        for line in lines[starts[block]:starts[block + 1]]:
+            if block in reachable or _is_label(line):
+                output.append(line)
+            else:
+                removed["unreachable"] += 1
+    return output
+
+
+def optimize(lines: typing.List[str]) -> typing.Tuple[typing.List[str], typing.Counter[str], int]:
+    """Threads jumps and removes useless jumps and unreachable code, until
+    nothing changes.
+
+    Args:
+        lines (typing.List[str]): instructions and labels, as returned by
+            Peephole.read_instructions.
+
+    Returns:
+        typing.Tuple[typing.List[str], typing.Counter[str], int]: the
+        optimized instructions and labels, the number of instructions every
+        rewrite removed, and the number of cycles saved by running every
+        rewritten jump once.
+    """
+    removed = collections.Counter()
+    cycles = 0
+    lines = list(lines)
+    while True:
+        size = len(lines)
+        labels = {line[1:-1]: index for index, line in enumerate(lines) if _is_label(line)}
+        cycles += _thread_jumps(lines, labels)
+        lines, next_cycles = _remove_jumps_to_next(lines, labels, removed)
+        cycles += next_cycles
+        labels = {line[1:-1]: index for index, line in enumerate(lines) if _is_label(line)}
+        lines = _remove_unreachable(lines, labels, removed)
+        if len(lines) == size:
+            return lines, +removed, cycles
@@ -0,0 +1,113 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import array
+import os
+import sys
+import typing
+from SymbolTable import SymbolTable
+from AssemblyCache import AssemblyCache
+import HackISA
+import HackImage
+import ObjectFile
+import Main
+
+
+def link(modules: typing.Sequence[ObjectFile.ObjectModule]) -> array.array:
+    """Links object modules into a program, placing them in ROM in the
+    given order. The result is identical to assembling the concatenation of
+    their sources: labels are placed first, and the remaining symbols are
+    either predefined or variables, allocated from RAM 16 upward in the
+    order they are first used.
+
+    Args:
+        modules (typing.Sequence[ObjectFile.ObjectModule]): the modules.
+
+    Returns:
+        array.array: the instructions of the program, as uint16 words.
+    """
+    symbol_table = SymbolTable()
+    bases = []
+    base = 0
+    for module in modules:
+        bases.append(base)
+        for label, offset in module.labels.items():
+            symbol_table.add_entry(label, base + offset)
+        base += len(module.words)
+
+    words = array.array("H")
+    ram_address = 16
+    for module, base in zip(modules, bases):
+        module_words = array.array("H", module.words)
+        for symbol, uses in module.references.items():
+            if not symbol_table.contains(symbol):
+                symbol_table.add_entry(symbol, ram_address)
+                ram_address += 1
+            word = HackISA.encode_a_instruction(symbol_table.get_address(symbol))
+            for index in uses:
+                module_words[index] = word
+        words.extend(module_words)
+    return words
+
+
+def load_module(
+        input_path: str,
+        cache: typing.Optional[AssemblyCache] = None) -> ObjectFile.ObjectModule:
+    """Loads an object module, assembling it first if given an .asm file.
+
+    Args:
+        input_path (str): path of an .asm or a .hacko file.
+        cache (typing.Optional[AssemblyCache]): the cache of outputs to use
+            when assembling, so unchanged files are not assembled again.
+
+    Returns:
+        ObjectFile.ObjectModule: the module.
+    """
+    filename, extension = os.path.splitext(input_path)
+    if extension.lower() == ".asm":
+        Main.assemble_path(input_path, output_format="hacko", cache=cache)
+        input_path = filename + ObjectFile.EXTENSION
+    with open(input_path, 'rb') as input_file:
+        return ObjectFile.read_module(input_file)
+
+
+if "__main__" == __name__:
+    # Links modules into a single program: python3 Linker.py -o <output>
+    # <.asm or .hacko files or directories>. Directories contribute their
+    # .asm files in alphabetical order, and .asm files are assembled into
+    # object modules next to them first (reusing cached modules).
+    arg_parser = argparse.ArgumentParser(prog="Linker")
+    arg_parser.add_argument(
+        "inputs", nargs="+", help=".asm or .hacko files, or directories")
+    arg_parser.add_argument(
+        "--output", "-o", required=True,
+        help="the linked program, a .hack file or a .hackb image")
+    arg_parser.add_argument(
+        "--no-cache", action="store_true",
+        help="always assemble, without reusing or storing cached modules")
+    args = arg_parser.parse_args()
+    cache = None if args.no_cache else AssemblyCache()
+    input_paths = []
+    for input_path in args.inputs:
+        if os.path.isdir(input_path):
+            input_paths.extend(
+                os.path.join(input_path, filename)
+                for filename in sorted(os.listdir(input_path))
+                if os.path.splitext(filename)[1].lower() == ".asm")
+        else:
+            input_paths.append(input_path)
+    try:
+        words = link([load_module(input_path, cache) for input_path in input_paths])
+    except (OSError, ValueError) as error:
+        sys.exit("Failed to link: " + str(error))
+    if os.path.splitext(args.output)[1].lower() == HackImage.IMAGE_EXTENSION:
+        with open(args.output, 'wb') as output_file:
+            HackImage.write_image(words, output_file)
+    else:
+        with open(args.output, 'w') as output_file:
+            output_file.writelines(format(word, "016b") + "\n" for word in words)
@@ -5,76 +5,501 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import argparse
+import array
+import concurrent.futures
+import importlib.util
+import io
+import itertools
+import json
 import os
 import sys
+import time
 import typing
 from SymbolTable import SymbolTable
 from Parser import Parser
 from Code import Code
+import HackISA
+import HackImage
+import JumpThreading
+import ObjectFile
+import Peephole
+import SourceMap
+from AssemblyCache import AssemblyCache
+from AssemblyStats import AssemblyStats
+
+OUTPUT_CHUNK_LINES = 4096  # lines of output collected before every write
+MODES = ["two-pass", "single-pass", "streaming", "bulk"]
+
+
+def _a_instruction(address: int) -> str:
+    """
+    Args:
+        address (int): the value loaded by the A-instruction.
+
+    Returns:
+        str: the binary line (including the newline) of the A-instruction.
+    """
+    return format(HackISA.encode_a_instruction(address), "016b") + "\n"
+
+
+def _c_instruction(parser: Parser) -> str:
+    """
+    Args:
+        parser (Parser): a parser whose current command is a C-instruction.
+
+    Returns:
+        str: the binary line (including the newline) of the C-instruction,
+        the shift extension is detected by the instruction table.
+    """
+    return Code.c_instruction(parser.cur_line) + "\n"
 
 
 def assemble_file(
-        input_file: typing.TextIO, output_file: typing.TextIO) -> None:
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        streaming: bool = False,
+        stats: typing.Optional[AssemblyStats] = None,
+        source_map: typing.Optional[SourceMap.SourceMap] = None) -> None:
     """Assembles a single file.
 
     Args:
         input_file (typing.TextIO): the file to assemble.
         output_file (typing.TextIO): writes all output to this file.
+        streaming (bool): if this is True, the input is read line by line in
+            both passes, so only the symbol table is kept in memory and
+            memory use stays flat regardless of the size of the file.
+        stats (typing.Optional[AssemblyStats]): collects statistics if given.
+            When streaming, reading the input is timed as part of the passes.
+        source_map (typing.Optional[SourceMap.SourceMap]): if given, the source line of
+            every instruction and the address of every symbol are added to it.
     """
     symbol_table = SymbolTable()
     rom_address = 0
     ram_address = 16
+    labels = 0
 
     # first pass: add labels to symbol table
-    parser = Parser(input_file)
-    while parser.has_more_commands():
-        parser.advance()
-        if parser.command_type() == "L_COMMAND":
-            symbol_table.add_entry(parser.symbol(), rom_address)
-        else:
-            rom_address += 1
+    start = time.perf_counter()
+    parser = Parser(input_file, streaming)
+    read_time = time.perf_counter() - start
+    if source_map is None:
+        while parser.has_more_commands():
+            parser.advance()
+            if parser.command_type() == "L_COMMAND":
+                symbol_table.add_entry(parser.symbol(), rom_address)
+                labels += 1
+            else:
+                rom_address += 1
+    else:  # the same loop, kept apart so that the map costs nothing otherwise
+        while parser.has_more_commands():
+            parser.advance()
+            command = parser.command_type()
+            if command == "L_COMMAND":
+                symbol_table.add_entry(parser.symbol(), rom_address)
+                source_map.labels.append((rom_address, parser.symbol()))
+                labels += 1
+            else:
+                if command is not None:  # skipped lines are not assembled
+                    source_map.lines.append(parser.cur_line_num + 1)
+                rom_address += 1
+    pass_1_time = time.perf_counter() - start - read_time
 
     # second pass: translate commands to binary and write to output file
+    start = time.perf_counter()
     input_file.seek(0)  # reset file pointer to beginning of file
-    parser = Parser(input_file)
+    parser = Parser(input_file, streaming)
+    io_time = time.perf_counter() - start
+    output_lines = []  # written in chunks of OUTPUT_CHUNK_LINES lines
     while parser.has_more_commands():
         parser.advance()
         if parser.command_type() == "A_COMMAND":  # starts with @
             symbol = parser.symbol()  # either an integer or a variable name
             if symbol.isnumeric():
-                output_file.write("0" + bin(int(symbol))[2:].zfill(15) + "\n")  ## TODO check
-                continue
-            elif not symbol_table.contains(symbol):
-                symbol_table.add_entry(symbol, ram_address)
-                ram_address += 1
-            output_file.write("0" + bin(symbol_table.get_address(symbol))[2:].zfill(15) + "\n")  ## TODO check
+                output_lines.append(_a_instruction(int(symbol)))
+            else:
+                if not symbol_table.contains(symbol):
+                    symbol_table.add_entry(symbol, ram_address)
+                    if source_map is not None:
+                        source_map.variables.append((ram_address, symbol))
+                    ram_address += 1
+                output_lines.append(_a_instruction(symbol_table.get_address(symbol)))
         elif parser.command_type() == "C_COMMAND" or parser.cur_line == "0;JMP":
-            if ">>" in parser.cur_line or "<<" in parser.cur_line:  # shift command
-                output_file.write("101" + Code.comp(parser.comp()) + Code.dest(parser.dest()) + Code.jump(parser.jump()) + "\n")
-            else:  # regualr commands
-                output_file.write("111" + Code.comp(parser.comp()) + Code.dest(parser.dest()) + Code.jump(parser.jump()) + "\n")
+            output_lines.append(_c_instruction(parser))
+        else:
+            continue
+        if len(output_lines) == OUTPUT_CHUNK_LINES:
+            io_time += _write_chunk(output_file, output_lines, stats)
+    io_time += _write_chunk(output_file, output_lines, stats)
+
+    if stats is not None:
+        stats.times["pass 1"] += pass_1_time
+        stats.times["pass 2"] += time.perf_counter() - start - io_time
+        stats.times["I/O"] += read_time + io_time
+        stats.labels += labels
+        stats.set_symbols(symbol_table, ram_address)
+
+
+def _write_chunk(
+        output_file: typing.TextIO, output_lines: typing.List[str],
+        stats: typing.Optional[AssemblyStats]) -> float:
+    """Writes a chunk of output lines and empties the list.
+
+    Returns:
+        float: the time spent writing, in seconds.
+    """
+    if stats is not None:
+        stats.count_lines(output_lines)
+    start = time.perf_counter()
+    output_file.write("".join(output_lines))
+    output_lines.clear()
+    return time.perf_counter() - start
+
+
+def assemble_words(
+        input_file: typing.TextIO,
+        stats: typing.Optional[AssemblyStats] = None) -> array.array:
+    """Assembles a single file while reading it only once.
+    Every command is encoded as soon as it is parsed. A-instructions that
+    refer to a label which was not defined yet are left as placeholders and
+    are patched after the whole file was read, at which point the remaining
+    symbols are either labels defined later on, predefined symbols or
+    variables (allocated from RAM 16 upward in first-use order).
+
+    Args:
+        input_file (typing.TextIO): the file to assemble.
+        stats (typing.Optional[AssemblyStats]): collects statistics if given,
+            the backpatching is timed as pass 2.
+
+    Returns:
+        array.array: the instructions of the program, as uint16 words.
+    """
+    symbol_table = SymbolTable()
+    defined_labels = set()  # labels seen so far, they can be resolved at once
+    words = array.array("H")
+    unresolved = []  # (index in words, symbol) pairs to backpatch
+    labels = 0
+
+    start = time.perf_counter()
+    parser = Parser(input_file)
+    io_time = time.perf_counter() - start
+    while parser.has_more_commands():
+        parser.advance()
+        command = parser.command_type()
+        if command == "L_COMMAND":
+            symbol_table.add_entry(parser.symbol(), len(words))
+            defined_labels.add(parser.symbol())
+            labels += 1
+        elif command == "A_COMMAND":
+            symbol = parser.symbol()
+            if symbol.isnumeric():
+                words.append(HackISA.encode_a_instruction(int(symbol)))
+            elif symbol in defined_labels:
+                words.append(symbol_table.get_address(symbol))
+            else:  # forward label reference, predefined symbol or variable
+                unresolved.append((len(words), symbol))
+                words.append(0)
+        elif command == "C_COMMAND":
+            words.append(HackISA.encode_c_instruction(parser.cur_line))
+    pass_time = time.perf_counter() - start
+
+    # predefined symbols are resolved only now, since a label may override them
+    start = time.perf_counter()
+    ram_address = 16
+    for index, symbol in unresolved:
+        if not symbol_table.contains(symbol):
+            symbol_table.add_entry(symbol, ram_address)
+            ram_address += 1
+        words[index] = HackISA.encode_a_instruction(symbol_table.get_address(symbol))
+
+    if stats is not None:
+        stats.times["pass 1"] += pass_time - io_time
+        stats.times["pass 2"] += time.perf_counter() - start
+        stats.times["I/O"] += io_time
+        stats.labels += labels
+        stats.set_symbols(symbol_table, ram_address)
+        stats.count_words(words)
+    return words
+
+
+def assemble_file_single_pass(
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        stats: typing.Optional[AssemblyStats] = None) -> None:
+    """Assembles a single file while reading it only once (see
+    assemble_words). The output is identical to the one of assemble_file.
+
+    Args:
+        input_file (typing.TextIO): the file to assemble.
+        output_file (typing.TextIO): writes all output to this file.
+        stats (typing.Optional[AssemblyStats]): collects statistics if given.
+    """
+    words = assemble_words(input_file, stats)
+    start = time.perf_counter()
+    output_file.writelines(format(word, "016b") + "\n" for word in words)
+    if stats is not None:
+        stats.times["I/O"] += time.perf_counter() - start
+
+
+def _optimize(
+        input_file: typing.TextIO,
+        stats: typing.Optional[AssemblyStats]) -> typing.TextIO:
+    """Optimizes a program: first its control flow (see JumpThreading.py),
+    then with the peephole rules (see Peephole.py).
+
+    Args:
+        input_file (typing.TextIO): the program.
+        stats (typing.Optional[AssemblyStats]): collects what every
+            optimization saved if given.
+
+    Returns:
+        typing.TextIO: the optimized program, ready to be assembled.
+    """
+    start = time.perf_counter()
+    lines = Peephole.read_instructions(input_file)
+    lines, jump_removed, cycles = JumpThreading.optimize(lines)
+    lines, peephole_removed = Peephole.optimize(lines)
+    if stats is not None:
+        stats.times["optimize"] = time.perf_counter() - start
+        stats.optimizations["jump threading"] = dict(jump_removed)
+        stats.cycles_saved["jump threading"] = cycles
+        stats.optimizations["peephole"] = dict(peephole_removed)
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def assemble_path(
+        input_path: str, mode: str = "two-pass",
+        output_format: str = "hack",
+        cache: typing.Optional[AssemblyCache] = None,
+        stats: typing.Optional[AssemblyStats] = None,
+        optimize: bool = False,
+        source_map: bool = False) -> None:
+    """Assembles a single .asm file into a .hack file (or a .hackb image, or
+    a .hacko object module) with the same name. The output is first written
+    to a temporary file which replaces the target only once assembly
+    succeeded, so a failure never leaves a partial output file behind. If a
+    cache is given and it holds the output of an identical input, that
+    output is reused instead.
+
+    Args:
+        input_path (str): path of the .asm file.
+        mode (str): the assembler to use, one of MODES. All of them produce
+            the same output, "streaming" only differs from "two-pass" for
+            text output.
+        output_format (str): "hack", "hackb" or "hacko". Object modules are
+            always built the same way, regardless of mode.
+        cache (typing.Optional[AssemblyCache]): the cache of outputs to use.
+        stats (typing.Optional[AssemblyStats]): collects statistics if given.
+        optimize (bool): if this is True, the program is optimized before it
+            is assembled (see _optimize).
+        source_map (bool): if this is True, a .hackmap source map is written
+            next to the output as well (see SourceMap.py). Only text output
+            of the two-pass modes, without optimization, can be mapped, and
+            the cache is not used.
+    """
+    if source_map and (mode not in ("two-pass", "streaming")
+                       or output_format != "hack" or optimize):
+        raise ValueError("a source map needs text output of the two-pass "
+                         "assembler, without optimization")
+    filename, extension = os.path.splitext(input_path)
+    if output_format == "hackb":
+        output_extension = HackImage.IMAGE_EXTENSION
+    elif output_format == "hacko":
+        output_extension = ObjectFile.EXTENSION
+    else:
+        output_extension = ".hack"
+    output_path = filename + output_extension
+    temp_path = output_path + "." + str(os.getpid()) + ".tmp"
+    map_path = filename + SourceMap.EXTENSION
+    map_temp_path = map_path + "." + str(os.getpid()) + ".tmp"
+    if source_map:
+        cache = None  # the cache only holds the output itself
+    try:
+        if cache is not None:
+            cache_key = cache.key(input_path, output_extension,
+                                  "optimize" if optimize else "")
+            if cache.fetch(cache_key, temp_path):
+                os.replace(temp_path, output_path)
+                if stats is not None:
+                    stats.cached = True
+                return
+        with open(input_path, 'r') as input_file, \
+                open(temp_path, 'w' if output_format == "hack" else 'wb') as output_file:
+            if mode == "bulk":
+                import BulkEncoder  # imports numpy, which is only used in this mode
+            if optimize:
+                input_file = _optimize(input_file, stats)
+            if output_format == "hacko":
+                module = ObjectFile.assemble_module(input_file)
+                ObjectFile.write_module(module, output_file)
+                if stats is not None:
+                    stats.labels += len(module.labels)
+                    stats.count_words(module.words)
+            elif output_format == "hackb":
+                if mode == "bulk":
+                    words = BulkEncoder.assemble_words_bulk(input_file, stats)
+                else:
+                    words = assemble_words(input_file, stats)
+                start = time.perf_counter()
+                HackImage.write_image(words, output_file)
+                if stats is not None:
+                    stats.times["I/O"] += time.perf_counter() - start
+            elif mode == "bulk":
+                BulkEncoder.assemble_file_bulk(input_file, output_file, stats)
+            elif mode == "single-pass":
+                assemble_file_single_pass(input_file, output_file, stats)
+            elif source_map:
+                program_map = SourceMap.SourceMap()
+                assemble_file(input_file, output_file, mode == "streaming",
+                              stats, program_map)
+                with open(map_temp_path, 'wb') as map_file:
+                    program_map.write(map_file)
+            else:
+                assemble_file(input_file, output_file, mode == "streaming", stats)
+        if source_map:
+            os.replace(map_temp_path, map_path)
+        os.replace(temp_path, output_path)
+        if cache is not None:
+            cache.store(cache_key, output_path)
+    finally:
+        for path in (temp_path, map_temp_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _assemble_path_or_error(
+        input_path: str, mode: str, output_format: str,
+        cache: typing.Optional[AssemblyCache],
+        collect_stats: bool, optimize: bool,
+        source_map: bool) -> typing.Tuple[typing.Optional[str],
+                                             typing.Optional[AssemblyStats]]:
+    """Calls assemble_path, turning a failure into an error message so that
+    it does not stop the assembly of the other files.
+
+    Returns:
+        typing.Tuple[typing.Optional[str], typing.Optional[AssemblyStats]]:
+        None on success or an error message otherwise, and the statistics
+        if collect_stats is True.
+    """
+    stats = AssemblyStats() if collect_stats else None
+    try:
+        assemble_path(input_path, mode, output_format, cache, stats, optimize,
+                      source_map)
+    except Exception as error:
+        return os.path.basename(input_path) + ": " + type(error).__name__ + ": " + str(error), None
+    return None, stats
 
 
 if "__main__" == __name__:
-    # Parses the input path and calls assemble_file on each input file.
-    # This opens both the input and the output files!
-    # Both are closed automatically when the code finishes running.
-    # If the output file does not exist, it is created automatically in the
-    # correct path, using the correct filename.
-    if not len(sys.argv) == 2:
-        sys.exit("Invalid usage, please use: Assembler <input path>")
-    argument_path = os.path.abspath(sys.argv[1])
+    # Parses the input path and calls assemble_path on each input file.
+    # The output file is created automatically in the correct path, using
+    # the correct filename. With --jobs, the files of a directory are
+    # assembled by a pool of processes, and the output is the same.
+    arg_parser = argparse.ArgumentParser(prog="Assembler")
+    arg_parser.add_argument("input_path", help="an .asm file or a directory")
+    mode_group = arg_parser.add_mutually_exclusive_group()
+    mode_group.add_argument(
+        "--single-pass", action="store_true",
+        help="read every file once, backpatching forward label references")
+    mode_group.add_argument(
+        "--streaming", action="store_true",
+        help="read the input line by line, using constant memory")
+    mode_group.add_argument(
+        "--bulk", action="store_true",
+        help="encode the whole program at once with numpy")
+    arg_parser.add_argument(
+        "--format", choices=["hack", "hackb", "hacko"], default="hack",
+        help="write text .hack files (default), packed .hackb ROM images, or "
+             ".hacko object modules to link with Linker.py")
+    arg_parser.add_argument(
+        "--jobs", "-j", type=int, default=1, metavar="N",
+        help="assemble the files of a directory with N processes "
+             "(0 means one per CPU)")
+    arg_parser.add_argument(
+        "--no-cache", action="store_true",
+        help="always assemble, without reusing or storing cached outputs")
+    arg_parser.add_argument(
+        "--cache-dir", default=AssemblyCache.DEFAULT_DIRECTORY,
+        help="directory of the output cache (default: %(default)s)")
+    arg_parser.add_argument(
+        "--cache-size", type=int, metavar="MB",
+        default=AssemblyCache.DEFAULT_MAX_SIZE // (1024 * 1024),
+        help="size limit of the output cache (default: %(default)s)")
+    arg_parser.add_argument(
+        "--optimize", "-O", action="store_true",
+        help="remove redundant instructions before assembling")
+    arg_parser.add_argument(
+        "--source-map", action="store_true",
+        help="also write a .hackmap file mapping every ROM address to its "
+             "source line and label")
+    arg_parser.add_argument(
+        "--stats", action="store_true",
+        help="print timing and size statistics of every file (the output "
+             "cache is not used, since it does not hold them)")
+    arg_parser.add_argument(
+        "--stats-format", choices=["text", "json"], default="text",
+        help="format of the statistics (default: %(default)s)")
+    args = arg_parser.parse_args()
+    if args.bulk and importlib.util.find_spec("numpy") is None:
+        arg_parser.error("--bulk requires numpy")
+    if args.optimize and args.format == "hacko":
+        arg_parser.error("--optimize needs the whole program, it can not be "
+                         "used on object modules")
+    if args.source_map and (args.single_pass or args.bulk or args.optimize
+                            or args.format != "hack"):
+        arg_parser.error("--source-map needs text output of the two-pass "
+                         "assembler, without --optimize")
+    if args.optimize and args.streaming:
+        arg_parser.error("--optimize reads the whole program, it can not be streamed")
+    mode = "two-pass"
+    for flag in ("single_pass", "streaming", "bulk"):
+        if getattr(args, flag):
+            mode = flag.replace("_", "-")
+    cache = None
+    if not args.no_cache and not args.stats:  # a cached output has no statistics
+        cache = AssemblyCache(
+            args.cache_dir, args.cache_size * 1024 * 1024)
+    argument_path = os.path.abspath(args.input_path)
     if os.path.isdir(argument_path):
         files_to_assemble = [
             os.path.join(argument_path, filename)
             for filename in os.listdir(argument_path)]
     else:
         files_to_assemble = [argument_path]
-    for input_path in files_to_assemble:
-        filename, extension = os.path.splitext(input_path)
-        if extension.lower() != ".asm":
-            continue
-        output_path = filename + ".hack"
-        with open(input_path, 'r') as input_file, \
-                open(output_path, 'w') as output_file:
-            assemble_file(input_file, output_file)
+    files_to_assemble = [
+        input_path for input_path in files_to_assemble
+        if os.path.splitext(input_path)[1].lower() == ".asm"]
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    if jobs > 1 and len(files_to_assemble) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(
+                _assemble_path_or_error, files_to_assemble,
+                itertools.repeat(mode),
+                itertools.repeat(args.format),
+                itertools.repeat(cache),
+                itertools.repeat(args.stats or args.optimize),
+                itertools.repeat(args.optimize),
+                itertools.repeat(args.source_map)))
+    else:
+        results = [
+            _assemble_path_or_error(
+                input_path, mode, args.format, cache,
+                args.stats or args.optimize, args.optimize, args.source_map)
+            for input_path in files_to_assemble]
+    if args.stats and args.stats_format == "json":
+        print(json.dumps({
+            os.path.basename(input_path): stats.to_dict()
+            for input_path, (error, stats) in zip(files_to_assemble, results)
+            if stats is not None}, indent=2))
+    elif args.stats:
+        for input_path, (error, stats) in zip(files_to_assemble, results):
+            if stats is not None:
+                print(os.path.basename(input_path) + ":")
+                print(stats.format())
+    elif args.optimize:
+        for input_path, (error, stats) in zip(files_to_assemble, results):
+            if stats is not None:
+                print(os.path.basename(input_path) + ":")
+                print(stats.format_optimizations())
+    errors = [error for error, stats in results if error is not None]
+    if errors:
+        sys.exit("Failed to assemble " + str(len(errors)) + " of "
+                 + str(len(files_to_assemble)) + " files:\n" + "\n".join(errors))
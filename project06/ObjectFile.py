@@ -0,0 +1,146 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import struct
+import sys
+import typing
+from Parser import Parser
+import HackISA
+
+# A relocatable object module (.hacko) is the assembled code of one .asm
+# file, with every symbolic A-instruction left as a 0 placeholder:
+# | Field      | Format                                                      |
+# |------------|-------------------------------------------------------------|
+# | header     | magic b"HOBJ", version, reserved, and the number of words,  |
+# |            | labels and referenced symbols ("<4sHHIII")                  |
+# | words      | little-endian uint16 per instruction                        |
+# | labels     | per label: offset in the module, name length ("<IH"), name  |
+# | references | per symbol: name length, number of uses ("<HI"), name, and  |
+# |            | the index of every word that uses it (uint32)               |
+# Names are UTF-8 and all fields are little-endian. Since Hack has a single
+# namespace, a module can not tell a variable from a label of another
+# module, so every symbol (including its own labels) is resolved by the
+# linker, see Linker.py.
+MAGIC = b"HOBJ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+LABEL = struct.Struct("<IH")
+REFERENCE = struct.Struct("<HI")
+EXTENSION = ".hacko"
+
+
+class ObjectModule:
+    """The code, labels and symbol references of a single module."""
+
+    def __init__(self) -> None:
+        self.words = array.array("H")
+        self.labels = {}  # label -> offset of the instruction after it
+        self.references = {}  # symbol -> array('I') of word indices, by first use
+
+
+def assemble_module(input_file: typing.TextIO) -> ObjectModule:
+    """Assembles a single file into an object module.
+
+    Args:
+        input_file (typing.TextIO): the file to assemble.
+
+    Returns:
+        ObjectModule: the module.
+    """
+    module = ObjectModule()
+    words, references = module.words, module.references
+    parser = Parser(input_file)
+    while parser.has_more_commands():
+        parser.advance()
+        command = parser.command_type()
+        if command == "L_COMMAND":
+            module.labels[parser.symbol()] = len(words)
+        elif command == "A_COMMAND":
+            symbol = parser.symbol()
+            if symbol.isnumeric():
+                words.append(HackISA.encode_a_instruction(int(symbol)))
+                continue
+            uses = references.get(symbol)
+            if uses is None:
+                uses = references[symbol] = array.array("I")
+            uses.append(len(words))
+            words.append(0)
+        elif command == "C_COMMAND":
+            words.append(HackISA.encode_c_instruction(parser.cur_line))
+    return module
+
+
+def _little_endian(values: array.array) -> bytes:
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _native(typecode: str, data: bytes) -> array.array:
+    values = array.array(typecode, data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def write_module(module: ObjectModule, output_file: typing.BinaryIO) -> None:
+    """
+    Args:
+        module (ObjectModule): the module to write.
+        output_file (typing.BinaryIO): writes the module to this file.
+    """
+    output_file.write(HEADER.pack(MAGIC, VERSION, 0, len(module.words),
+                                  len(module.labels), len(module.references)))
+    output_file.write(_little_endian(module.words))
+    for label, offset in module.labels.items():
+        name = label.encode()
+        output_file.write(LABEL.pack(offset, len(name)) + name)
+    for symbol, uses in module.references.items():
+        name = symbol.encode()
+        output_file.write(REFERENCE.pack(len(name), len(uses)) + name)
+        output_file.write(_little_endian(uses))
+
+
+def read_module(input_file: typing.BinaryIO) -> ObjectModule:
+    """
+    Args:
+        input_file (typing.BinaryIO): a .hacko file.
+
+    Returns:
+        ObjectModule: the module in the file.
+    """
+    data = input_file.read()
+    if len(data) < HEADER.size:
+        raise ValueError("not a Hack object module")
+    magic, version, reserved, word_count, label_count, symbol_count = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a Hack object module")
+    module = ObjectModule()
+    position = HEADER.size
+    try:
+        module.words = _native("H", data[position:position + 2 * word_count])
+        position += 2 * word_count
+        for i in range(label_count):
+            offset, length = LABEL.unpack_from(data, position)
+            position += LABEL.size
+            module.labels[data[position:position + length].decode()] = offset
+            position += length
+        for i in range(symbol_count):
+            length, count = REFERENCE.unpack_from(data, position)
+            position += REFERENCE.size
+            symbol = data[position:position + length].decode()
+            position += length
+            module.references[symbol] = _native("I", data[position:position + 4 * count])
+            position += 4 * count
+    except struct.error:
+        raise ValueError("truncated Hack object module") from None
+    if len(module.words) != word_count or position != len(data):
+        raise ValueError("truncated Hack object module")
+    return module
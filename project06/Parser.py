@@ -15,14 +15,22 @@ class Parser:
     and symbols). In addition, removes all white space and comments.
     """
 
-    def __init__(self, input_file: typing.TextIO) -> None:
+    def __init__(self, input_file: typing.TextIO, streaming: bool = False) -> None:
         """Opens the input file and gets ready to parse it.
 
         Args:
             input_file (typing.TextIO): input file.
+            streaming (bool): if this is True, lines are read lazily one at a
+                time instead of all at once, so the memory used does not
+                depend on the size of the file.
         """
-        self.lines = input_file.read().splitlines()  # saves every line as an element in a list
-        self.num_lines = len(self.lines)
+        self.streaming = streaming
+        if streaming:
+            self.lines = iter(input_file)  # lines are read only when needed
+            self.next_line = next(self.lines, None)
+        else:
+            self.lines = input_file.read().splitlines()  # saves every line as an element in a list
+            self.num_lines = len(self.lines)
         self.cur_line_num = -1
         self.cur_line = ""
 
@@ -32,6 +40,8 @@ class Parser:
         Returns:
             bool: True if there are more commands, False otherwise.
         """
+        if self.streaming:
+            return self.next_line is not None
         return self.cur_line_num + 1 <= self.num_lines - 1  # True if the next potential line is within the list limits
 
     def advance(self) -> None:
@@ -40,7 +50,11 @@ class Parser:
         """
         while self.has_more_commands():
             self.cur_line_num += 1
-            self.cur_line = self.lines[self.cur_line_num]
+            if self.streaming:
+                self.cur_line = self.next_line.rstrip("\r\n")
+                self.next_line = next(self.lines, None)
+            else:
+                self.cur_line = self.lines[self.cur_line_num]
 
             self.cur_line = self.cur_line.replace(" ", "")  # removes whitespaces from the beginning and end of the line
             self.cur_line = self.cur_line.split("//", 1)[0]  # removes everything from "//" onwards
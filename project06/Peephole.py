@@ -0,0 +1,134 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import collections
+import typing
+from SymbolTable import SymbolTable
+from Parser import Parser
+import HackISA
+
+# Peephole optimization of Hack assembly, applied before symbols are
+# resolved. Every rewrite looks at a few consecutive instructions and never
+# at a label, so the code between two labels is only reachable from its
+# start, and the only thing tracked is which symbol A holds (A is unknown
+# after a label and after a C-instruction that writes A). Jumps do not reset
+# A: an instruction after a jump is reached by falling through it, and A is
+# not changed by a jump that is not taken. The catalogue:
+#
+# | Rule           | Before                      | After      | Condition                   |
+# |----------------|-----------------------------|------------|-----------------------------|
+# | redundant load | @X (A already holds X)      |            |                             |
+# | dead load      | @X @Y                       | @Y         | X is not a variable         |
+# | cancel         | M=M+1 M=M-1 (or reversed)   |            | A is known, not KBD         |
+# | fuse store     | M=c A=M (or D=M)            | AM=c (MD=c)| A is known, not KBD         |
+# | constant       | @0 D=A @Y                   | D=0 @Y     | dest is D, c is A, -A       |
+#
+# Dropping "@X" in a dead load never changes the first use of a variable,
+# so variables keep their RAM addresses. Rewrites change ROM addresses,
+# which is only safe as long as jumps target labels and not numbers, as in
+# the output of the VM translator.
+
+_IO_SYMBOLS = ("KBD", "24576")  # reading the keyboard twice may differ
+_CONSTANTS = {("0", "A"): "0", ("1", "A"): "1",
+              ("0", "-A"): "0", ("1", "-A"): "-1"}
+
+
+def read_instructions(input_file: typing.TextIO) -> typing.List[str]:
+    """Reads the instructions and labels of a program, the way the assembler
+    does: without whitespace and comments, skipping lines it skips.
+
+    Args:
+        input_file (typing.TextIO): the program.
+
+    Returns:
+        typing.List[str]: the instructions and labels, in order.
+    """
+    lines = []
+    parser = Parser(input_file)
+    while parser.has_more_commands():
+        parser.advance()
+        if parser.command_type() is not None:
+            lines.append(parser.cur_line)
+    return lines
+
+
+def _is_variable(symbol: str, labels: typing.Set[str],
+                 symbol_table: SymbolTable) -> bool:
+    return not (symbol.isnumeric() or symbol in labels
+                or symbol_table.contains(symbol))
+
+
+def optimize(lines: typing.List[str]) -> typing.Tuple[typing.List[str], typing.Counter[str]]:
+    """Applies the peephole rules until none of them matches.
+
+    Args:
+        lines (typing.List[str]): instructions and labels, as returned by
+            read_instructions.
+
+    Returns:
+        typing.Tuple[typing.List[str], typing.Counter[str]]: the optimized
+        instructions and labels, and the number of instructions every rule
+        removed.
+    """
+    labels = {line[1:-1] for line in lines if line.startswith("(")}
+    symbol_table = SymbolTable()
+    removed = collections.Counter()
+    output = []
+    known_a = []  # the symbol A holds after every output line, or None
+
+    def a_before(index: int) -> typing.Optional[str]:
+        return known_a[index - 1] if index > 0 else None
+
+    for line in lines:
+        if line.startswith("("):
+            output.append(line)
+            known_a.append(None)
+        elif line.startswith("@"):
+            symbol = line[1:]
+            if len(output) >= 2 and output[-2][1:] in ("0", "1") \
+                    and output[-2].startswith("@") and not output[-1].startswith(("(", "@")):
+                dest, comp, jump = HackISA.split_c_instruction(output[-1])
+                constant = _CONSTANTS.get((output[-2][1:], comp))
+                if constant is not None and dest == "D" and not jump:  # M is at the address in A
+                    previous_a = a_before(len(output) - 2)
+                    del output[-2:], known_a[-2:]
+                    output.append(dest + "=" + constant)
+                    known_a.append(previous_a)
+                    removed["constant"] += 1
+            while output and output[-1].startswith("@") and \
+                    not _is_variable(output[-1][1:], labels, symbol_table):
+                output.pop()
+                known_a.pop()
+                removed["dead load"] += 1
+            if output and known_a[-1] == symbol:
+                removed["redundant load"] += 1
+                continue
+            output.append(line)
+            known_a.append(symbol)
+        else:
+            a = known_a[-1] if output else None
+            dest, comp, jump = HackISA.split_c_instruction(line)
+            previous = output[-1] if output else "("
+            if a is not None and a not in _IO_SYMBOLS and not jump \
+                    and not previous.startswith(("(", "@")):
+                previous_dest, previous_comp, previous_jump = \
+                    HackISA.split_c_instruction(previous)
+                if previous_dest == "M" and not previous_jump:
+                    if {previous_comp, comp} == {"M+1", "M-1"} and dest == "M":
+                        output.pop()
+                        known_a.pop()
+                        removed["cancel"] += 2
+                        continue
+                    if comp == "M" and dest in ("A", "D"):
+                        output[-1] = ("AM=" if dest == "A" else "MD=") + previous_comp
+                        known_a[-1] = None if dest == "A" else a
+                        removed["fuse store"] += 1
+                        continue
+            output.append(line)
+            known_a.append(None if "A" in dest else a)
+    return output, removed
+
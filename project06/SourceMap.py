@@ -0,0 +1,147 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import bisect
+import struct
+import sys
+import typing
+
+# A source map (.hackmap) maps every ROM address to the line of the .asm
+# file it was assembled from, and lists the resolved labels and variables:
+# | Field   | Format                                                         |
+# |---------|----------------------------------------------------------------|
+# | header  | magic b"HMAP", version, reserved, and the number of            |
+# |         | instructions, bytes of line deltas and symbols ("<4sHHIII")    |
+# | lines   | per instruction, its line number minus the one of the previous |
+# |         | instruction, as an unsigned LEB128 varint (a byte, usually)    |
+# | symbols | per symbol: kind (0 label, 1 variable), address and name       |
+# |         | length ("<BIH"), followed by the UTF-8 name                    |
+# The label of an address is the nearest label at or before it, so it does
+# not need to be stored per address.
+MAGIC = b"HMAP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+SYMBOL = struct.Struct("<BIH")
+EXTENSION = ".hackmap"
+LABEL = 0
+VARIABLE = 1
+
+
+class SourceMap:
+    """Where every instruction of an assembled program came from."""
+
+    def __init__(self) -> None:
+        self.lines = array.array("I")  # the source line number of every ROM address
+        self.labels = []  # (address, label) pairs, in source order
+        self.variables = []  # (address, variable) pairs, in allocation order
+        self._sorted_labels = None  # built on the first lookup
+        self._label_addresses = None
+
+    def line_of(self, address: int) -> int:
+        """
+        Args:
+            address (int): a ROM address.
+
+        Returns:
+            int: the (1-based) line of the source of the instruction.
+        """
+        return self.lines[address]
+
+    def label_of(self, address: int) -> typing.Optional[str]:
+        """
+        Args:
+            address (int): a ROM address.
+
+        Returns:
+            typing.Optional[str]: the nearest label at or before the address,
+            or None if there is none. Of several labels of the same address,
+            the last one in the source is returned.
+        """
+        if self._sorted_labels is None:
+            self._sorted_labels = sorted(self.labels, key=lambda label: label[0])
+            self._label_addresses = [label_address for label_address, label in self._sorted_labels]
+        index = bisect.bisect_right(self._label_addresses, address)
+        return self._sorted_labels[index - 1][1] if index else None
+
+    def write(self, output_file: typing.BinaryIO) -> None:
+        """
+        Args:
+            output_file (typing.BinaryIO): writes the map to this file.
+        """
+        deltas = bytearray()
+        previous = 0
+        for line in self.lines:
+            delta = line - previous
+            previous = line
+            while delta >= 0x80:
+                deltas.append(delta & 0x7F | 0x80)
+                delta >>= 7
+            deltas.append(delta)
+        output_file.write(HEADER.pack(MAGIC, VERSION, 0, len(self.lines), len(deltas),
+                                      len(self.labels) + len(self.variables)))
+        output_file.write(deltas)
+        for kind, symbols in ((LABEL, self.labels), (VARIABLE, self.variables)):
+            for address, symbol in symbols:
+                name = symbol.encode()
+                output_file.write(SYMBOL.pack(kind, address, len(name)) + name)
+
+    @staticmethod
+    def read(input_file: typing.BinaryIO) -> "SourceMap":
+        """
+        Args:
+            input_file (typing.BinaryIO): a .hackmap file.
+
+        Returns:
+            SourceMap: the map in the file.
+        """
+        data = input_file.read()
+        if len(data) < HEADER.size:
+            raise ValueError("not a Hack source map")
+        magic, version, reserved, count, delta_size, symbol_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a Hack source map")
+        source_map = SourceMap()
+        line = delta = shift = 0
+        for byte in data[HEADER.size:HEADER.size + delta_size]:
+            delta |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+                continue
+            line += delta
+            source_map.lines.append(line)
+            delta = shift = 0
+        position = HEADER.size + delta_size
+        try:
+            for i in range(symbol_count):
+                kind, address, length = SYMBOL.unpack_from(data, position)
+                position += SYMBOL.size
+                symbol = data[position:position + length].decode()
+                position += length
+                (source_map.labels if kind == LABEL else source_map.variables).append(
+                    (address, symbol))
+        except struct.error:
+            raise ValueError("truncated Hack source map") from None
+        if len(source_map.lines) != count:
+            raise ValueError("truncated Hack source map")
+        return source_map
+
+
+if "__main__" == __name__:
+    # Prints where the given ROM addresses came from, or the whole map:
+    # python3 SourceMap.py <.hackmap file> [address...]
+    if len(sys.argv) < 2:
+        sys.exit("Invalid usage, please use: python3 SourceMap.py <.hackmap file> [address...]")
+    with open(sys.argv[1], 'rb') as map_file:
+        source_map = SourceMap.read(map_file)
+    addresses = [int(address) for address in sys.argv[2:]] or range(len(source_map.lines))
+    for address in addresses:
+        print(address, "line", source_map.line_of(address), source_map.label_of(address) or "")
+    if not sys.argv[2:]:
+        for kind, symbols in (("label", source_map.labels), ("variable", source_map.variables)):
+            for address, symbol in symbols:
+                print(kind, symbol, address)
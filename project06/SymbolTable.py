@@ -5,12 +5,32 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import array
+import typing
+
+# the predefined symbols and their pre-allocated RAM addresses, according to
+# section 6.2.3 of the book
+PREDEFINED_SYMBOLS = {
+    'R0': 0, 'R1': 1, 'R2': 2, 'R3': 3, 'R4': 4, 'R5': 5, 'R6': 6, 'R7': 7, 'R8': 8, 'R9': 9,
+    'R10': 10, 'R11': 11, 'R12': 12, 'R13': 13, 'R14': 14, 'R15': 15, 'SCREEN': 16384, 'KBD': 24576,
+    'SP': 0, 'LCL': 1, 'ARG': 2, 'THIS': 3, 'THAT': 4}
+
+_EMPTY = -1  # marks a free slot
+_HASH_MASK = 0xFFFFFFFF  # the low 32 bits of the hash of every name are kept
+_INITIAL_SLOTS = 1024  # a power of 2
 
 
 class SymbolTable:
     """
-    A symbol table that keeps a correspondence between symbolic labels and 
+    A symbol table that keeps a correspondence between symbolic labels and
     numeric addresses.
+
+    Predefined symbols are looked up in a dictionary shared by all tables.
+    Every other symbol is stored once, as UTF-8 bytes appended to a single
+    buffer of names, and its address is kept in an array, so a table of a
+    million labels takes tens of megabytes instead of the hundreds a
+    dictionary of strings to integers would. Symbols are found through an
+    open addressing hash table of indices into these arrays.
     """
 
     def __init__(self) -> None:
@@ -18,9 +38,51 @@ class SymbolTable:
         and their pre-allocated RAM addresses, according to section 6.2.3 of the
         book.
         """
-        self.table = {'R0': 0, 'R1': 1, 'R2': 2, 'R3': 3, 'R4': 4, 'R5': 5, 'R6': 6, 'R7': 7,  'R8': 8, 'R9': 9,
-                        'R10': 10, 'R11': 11, 'R12': 12, 'R13': 13, 'R14': 14, 'R15': 15, 'SCREEN': 16384, 'KBD': 24576,
-                        'SP': 0, 'LCL': 1, 'ARG': 2, 'THIS': 3, 'THAT': 4, 'LOOP': 4, 'STOP': 18, 'i': 16, 'sum': 17}
+        self.predefined = PREDEFINED_SYMBOLS  # copied once a label overrides one
+        self.names = bytearray()  # the names of all symbols, back to back
+        self.name_ends = array.array("I")  # the end of every name in names
+        self.hashes = array.array("I")  # the hash of every name
+        self.addresses = array.array("I")  # the address of every symbol
+        self.slots = array.array("i", [_EMPTY]) * _INITIAL_SLOTS  # symbol indices
+        self.last_symbol = None  # the last symbol found, see get_address
+        self.last_index = _EMPTY
+
+    def _find(self, symbol: str, symbol_hash: int) -> typing.Tuple[int, int]:
+        """
+        Args:
+            symbol (str): a symbol that is not predefined.
+            symbol_hash (int): the low 32 bits of hash(symbol).
+
+        Returns:
+            typing.Tuple[int, int]: the slot of the symbol and its index, or
+            the free slot it would take and _EMPTY.
+        """
+        slots, hashes, name_ends = self.slots, self.hashes, self.name_ends
+        mask = len(slots) - 1
+        encoded = None
+        slot = symbol_hash & mask
+        while True:
+            index = slots[slot]
+            if index == _EMPTY:
+                return slot, _EMPTY
+            if hashes[index] == symbol_hash:
+                if encoded is None:
+                    encoded = symbol.encode()
+                start = name_ends[index - 1] if index else 0
+                if self.names[start:name_ends[index]] == encoded:
+                    return slot, index
+            slot = (slot + 1) & mask  # linear probing
+
+    def _grow(self) -> None:
+        """Doubles the number of slots, keeping at most half of them used."""
+        slots = array.array("i", [_EMPTY]) * (2 * len(self.slots))
+        mask = len(slots) - 1
+        for index, symbol_hash in enumerate(self.hashes):
+            slot = symbol_hash & mask
+            while slots[slot] != _EMPTY:
+                slot = (slot + 1) & mask
+            slots[slot] = index
+        self.slots = slots
 
     def add_entry(self, symbol: str, address: int) -> None:
         """Adds the pair (symbol, address) to the table.
@@ -29,7 +91,24 @@ class SymbolTable:
             symbol (str): the symbol to add.
             address (int): the address corresponding to the symbol.
         """
-        self.table[symbol] = address
+        self.last_symbol = None
+        if symbol in self.predefined:
+            if self.predefined is PREDEFINED_SYMBOLS:
+                self.predefined = dict(PREDEFINED_SYMBOLS)
+            self.predefined[symbol] = address
+            return
+        symbol_hash = hash(symbol) & _HASH_MASK
+        slot, index = self._find(symbol, symbol_hash)
+        if index != _EMPTY:
+            self.addresses[index] = address
+            return
+        self.slots[slot] = len(self.addresses)
+        self.names += symbol.encode()
+        self.name_ends.append(len(self.names))
+        self.hashes.append(symbol_hash)
+        self.addresses.append(address)
+        if 2 * len(self.addresses) > len(self.slots):
+            self._grow()
 
     def contains(self, symbol: str) -> bool:
         """Does the symbol table contain the given symbol?
@@ -40,7 +119,11 @@ class SymbolTable:
         Returns:
             bool: True if the symbol is contained, False otherwise.
         """
-        return symbol in self.table
+        if symbol in self.predefined:
+            return True
+        self.last_symbol = symbol
+        self.last_index = self._find(symbol, hash(symbol) & _HASH_MASK)[1]
+        return self.last_index != _EMPTY
 
     def get_address(self, symbol: str) -> int:
         """Returns the address associated with the symbol.
@@ -51,4 +134,36 @@ class SymbolTable:
         Returns:
             int: the address associated with the symbol.
         """
-        return self.table[symbol]
+        address = self.predefined.get(symbol)
+        if address is not None:
+            return address
+        if symbol is self.last_symbol:  # the assembler calls contains first
+            index = self.last_index
+        else:
+            index = self._find(symbol, hash(symbol) & _HASH_MASK)[1]
+        if index == _EMPTY:
+            raise KeyError(symbol)
+        return self.addresses[index]
+
+    def memory_usage(self) -> typing.Dict[str, int]:
+        """
+        Returns:
+            typing.Dict[str, int]: the number of bytes used by the names of
+            the symbols, by the arrays of addresses, hashes and name ends, by
+            the hash table slots, and in total.
+        """
+        usage = {
+            "names": len(self.names),
+            "arrays": sum(len(column) * column.itemsize for column in
+                          (self.name_ends, self.hashes, self.addresses)),
+            "slots": len(self.slots) * self.slots.itemsize,
+        }
+        usage["total"] = sum(usage.values())
+        return usage
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: the number of symbols in the table.
+        """
+        return len(self.predefined) + len(self.addresses)
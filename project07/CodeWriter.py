@@ -7,6 +7,87 @@ Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
 import typing
 
+# The assembly code of every VM command is built once, as a template that
+# only has to be formatted with the arguments of the command. The code
+# writer collects the formatted templates and writes them in large chunks.
+_FLUSH_CHUNKS = 4096  # the number of templates collected before writing them (at a command)
+_PUSH_D = "@SP\nA=M\nM=D\n@SP\nM=M+1\n"  # pushes the value in D onto the stack
+_POP_D = "@SP\nM=M-1\nA=M\nD=M\n"  # pops the top of the stack into D
+
+# pop first value, pop second value, perform operation (+, -, &, |), push result
+_BINARY = "@SP\nM=M-1\nA=M\nD=M\n@SP\nM=M-1\nA=M\nM=M{}D\n@SP\nM=M+1\n"
+# pop value, perform operation (-, !, <<, >>), push result
+_UNARY = "@SP\nM=M-1\nA=M\n{}\n@SP\nM=M+1\n"
+_ARITHMETIC = {
+    "add": _BINARY.format("+"), "sub": _BINARY.format("-"),
+    "and": _BINARY.format("&"), "or": _BINARY.format("|"),
+    "neg": _UNARY.format("M=-M"), "not": _UNARY.format("M=!M"),
+    "shiftleft": _UNARY.format("M=M<<"), "shiftright": _UNARY.format("M=M>>"),
+}
+_COMPARISONS = {"eq": "JEQ", "gt": "JGT", "lt": "JLT"}
+
+# A subtraction could overflow if the values are large and one of the values
+# is negative and the other is positive, so in the case of different signs,
+# the comparison checks who is the negative and who is the positive and
+# returns the appropriate result (instead of subtracting one from the other):
+# 1. pop the first value and store it in R13, and jump if it is positive
+# 2. pop the second value, and jump if it is positive
+# 3. both are negative/0: D = second - first
+# 4. (FIRST_POS) pop the second value and jump if it is negative, otherwise
+#    both are positive/0: D = second - first
+# 5. (SECOND_POS) first is negative and second is positive: D = 1
+# 6. (SECOND_NEG) first is positive and second is negative: D = -1
+# 7. (COMPARE) D = -1 if D satisfies the jump condition, 0 otherwise, and
+#    (END) push D
+_COMPARISON = (
+    _POP_D + "@R13\nM=D\n@FIRST_POS{suffix}\nD;JGT\n"
+    + _POP_D + "@SECOND_POS{suffix}\nD;JGT\n"
+    "@R13\nD=D-M\n@COMPARE{suffix}\n0;JMP\n"
+    "(FIRST_POS{suffix})\n" + _POP_D + "@SECOND_NEG{suffix}\nD;JLT\n"
+    "@R13\nD=D-M\n@COMPARE{suffix}\n0;JMP\n"
+    "(SECOND_POS{suffix})\nD=1\n@COMPARE{suffix}\n0;JMP\n"
+    "(SECOND_NEG{suffix})\nD=-1\n@COMPARE{suffix}\n0;JMP\n"
+    "(COMPARE{suffix})\n@TRUE{suffix}\nD;{operation}\n"
+    "D=0\n@END{suffix}\n0;JMP\n"
+    "(TRUE{suffix})\nD=-1\n@END{suffix}\n0;JMP\n"
+    "(END{suffix})\n" + _PUSH_D)
+
+# local, argument, this, that: RAM[base + index], temp 0-7 = RAM 5-12,
+# pointer 0 = RAM 3 and pointer 1 = RAM 4
+_SEGMENT_BASES = {"local": "LCL", "argument": "ARG", "this": "THIS", "that": "THAT"}
+_FIXED_SEGMENTS = {"pointer": "3", "temp": "5"}
+_PUSH = {"constant": "@{index}\nD=A\n" + _PUSH_D,
+         "static": "@{filename}.{index}\nD=M\n" + _PUSH_D}
+_POP = {"static": _POP_D + "@{filename}.{index}\nM=D\n"}
+for _segment, _base in _SEGMENT_BASES.items():
+    _PUSH[_segment] = "@{index}\nD=A\n@" + _base + "\nA=M+D\nD=M\n" + _PUSH_D
+    _POP[_segment] = "@{index}\nD=A\n@" + _base + "\nA=M\nD=A+D\n@R13\nM=D\n" \
+                     + _POP_D + "@R13\nA=M\nM=D\n"
+for _segment, _base in _FIXED_SEGMENTS.items():
+    _PUSH[_segment] = "@{index}\nD=A\n@" + _base + "\nA=A+D\nD=M\n" + _PUSH_D
+    _POP[_segment] = "@{index}\nD=A\n@" + _base + "\nD=A+D\n@R13\nM=D\n" \
+                     + _POP_D + "@R13\nA=M\nM=D\n"
+
+
+def _split_template(template: str, field: str, **fields: typing.Any) -> typing.List[str]:
+    """
+    Args:
+        template (str): a template.
+        field (str): the field of the template that is left unformatted.
+        **fields (typing.Any): the values of the other fields.
+
+    Returns:
+        typing.List[str]: the parts of the formatted template between the
+        occurrences of the field, so that value.join(parts) is the template
+        formatted with the field set to value.
+    """
+    return template.format(**{field: "\0"}, **fields).split("\0")
+
+
+_COMPARISON_PARTS = {operation: _split_template(_COMPARISON, "suffix", operation=operation)
+                     for operation in _COMPARISONS.values()}
+
+
 class CodeWriter:
     """Translates VM commands into Hack assembly code."""
 
@@ -17,11 +98,20 @@ class CodeWriter:
             output_stream (typing.TextIO): output stream.
         """
         self.output_stream = output_stream
+        self.buffer = []  # formatted templates that were not written yet, see flush
+        self._write = self.buffer.append  # adds assembly code to the buffer
+        self.push_code = {}  # (segment, index) -> formatted template
+        self.pop_code = {}
         self.filename = ""
         self.label_counter = 0
-        self.ram0_to_ram4 = {"local": "LCL", "argument": "ARG", "this": "THIS", "that": "THAT"}
-        self.memory_segments = {"local": "LCL", "argument": "ARG", "this": "THIS", "that": "THAT",
-                                "pointer": 3, "temp": 5}
+
+    def flush(self) -> None:  # function added by me
+        """Writes all the buffered assembly code to the output stream. Called
+        once enough of it was collected, and must be called once the
+        translation is done.
+        """
+        self.output_stream.write("".join(self.buffer))
+        self.buffer.clear()
 
     def set_file_name(self, filename: str) -> None:
         """Informs the code writer that the translation of a new VM file is
@@ -42,23 +132,9 @@ class CodeWriter:
         # For example, using code similar to:
         # input_filename, input_extension = os.path.splitext(os.path.basename(input_file.name))
         self.filename = filename
-
-    def _binary_operation(self, operation: str) -> None:  # function added by me
-        """Writes assembly code for binary operations.
-
-        Args:
-            operation (str): binary operation.
-        """
-        self.output_stream.write("@SP\n") # pop first value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-        self.output_stream.write("@SP\n") # pop second value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("M=M" + operation + "D\n")  # perform operation (+, -, &, |)
-        self.output_stream.write("@SP\n") # push result
-        self.output_stream.write("M=M+1\n")
+        # the code of static variables depends on the filename
+        self.push_code = {key: code for key, code in self.push_code.items() if key[0] != "static"}
+        self.pop_code = {key: code for key, code in self.pop_code.items() if key[0] != "static"}
 
     def _comparison_operation(self, operation: str) -> None:  # function added by me
         """Writes assembly code for comparison operations.
@@ -67,91 +143,7 @@ class CodeWriter:
             operation (str): comparison operation.
         """
         self.label_counter += 1
-        # could cause overflow if the values are large and one of the values is negative and the other is positive,
-        # so in the case of different signs, the function checks who is the negative and who is the positive
-        # and returns the appropriate result (instead of subtracting one from the other)
-        self.output_stream.write("@SP\n")  # pop first value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-        self.output_stream.write("@R13\n")  # store first value in R13
-        self.output_stream.write("M=D\n")
-
-        self.output_stream.write("@FIRST_POS" + str(self.label_counter) + "\n")  # check if first value is positive
-        self.output_stream.write("D;JGT\n")
-
-        self.output_stream.write("@SP\n")  # pop second value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-
-        self.output_stream.write("@SECOND_POS" + str(self.label_counter) + "\n")  # check if second value is positive
-        self.output_stream.write("D;JGT\n")
-
-        self.output_stream.write("@R13\n")  # load first value from R13
-        self.output_stream.write("D=D-M\n")  # perform operation to check if first value is greater than second value
-        self.output_stream.write("@COMPARE" + str(self.label_counter) + "\n")  # (reached only if both negative/0)
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(FIRST_POS" + str(self.label_counter) + ")\n")  # if first value is positive
-        self.output_stream.write("@SP\n")  # pop second value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-
-        self.output_stream.write("@SECOND_NEG" + str(self.label_counter) + "\n")  # check if second value is negative
-        self.output_stream.write("D;JLT\n")
-
-        self.output_stream.write("@R13\n")
-        self.output_stream.write("D=D-M\n")  # perform operation to check if first value is greater than second value
-        self.output_stream.write("@COMPARE" + str(self.label_counter) + "\n")  # (reached only if both positive/0)
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(SECOND_POS" + str(self.label_counter) + ")\n")
-        self.output_stream.write("D=1\n")      # reached if first value is negative and second value is positive
-        self.output_stream.write("@COMPARE" + str(self.label_counter) + "\n")
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(SECOND_NEG" + str(self.label_counter) + ")\n")
-        self.output_stream.write("D=-1\n")     # reached if first value is positive and second value is negative
-        self.output_stream.write("@COMPARE" + str(self.label_counter) + "\n")
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(COMPARE" + str(self.label_counter) + ")\n")
-        self.output_stream.write("@TRUE" + str(self.label_counter) + "\n")  # jump if operation result is true
-        self.output_stream.write("D;" + operation + "\n")
-
-        self.output_stream.write("D=0\n")
-        self.output_stream.write("@END" + str(self.label_counter) + "\n")  # if operation result is false
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(TRUE" + str(self.label_counter) + ")\n")
-        self.output_stream.write("D=-1\n")
-        self.output_stream.write("@END" + str(self.label_counter) + "\n")
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(END" + str(self.label_counter) + ")\n")
-        self.output_stream.write("@SP\n") # push result, D=0 if false and D=-1 if true
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("M=D\n")
-        self.output_stream.write("@SP\n")
-        self.output_stream.write("M=M+1\n")
-
-    def _unary_operation(self, operation: str) -> None:  # function added by me
-        """Writes assembly code for unary operations.
-
-        Args:
-            operation (str): unary operation.
-        """
-        self.output_stream.write("@SP\n") # pop value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        if operation == ">>" or operation == "<<":
-            self.output_stream.write("M=M" + operation + "\n")  # perform operation (<<, >>)
-        else:
-            self.output_stream.write("M=" + operation + "M\n") # perform operation (-, !)
-        self.output_stream.write("@SP\n") # push result
-        self.output_stream.write("M=M+1\n")
+        self._write(str(self.label_counter).join(_COMPARISON_PARTS[operation]))
 
     def write_arithmetic(self, command: str) -> None:
         """Writes assembly code that is the translation of the given
@@ -162,34 +154,13 @@ class CodeWriter:
         Args:
             command (str): an arithmetic command.
         """
-        # arithmetic operations:
-        if command == "add":
-            self._binary_operation("+")
-        elif command == "sub":
-            self._binary_operation("-")
-        elif command == "neg":
-            self._unary_operation("-")
-
-        # comparison operations:
-        elif command == "eq":
-            self._comparison_operation("JEQ")
-        elif command == "gt":
-            self._comparison_operation("JGT")
-        elif command == "lt":
-            self._comparison_operation("JLT")
-
-        # logical operations:
-        elif command == "and":
-            self._binary_operation("&")
-        elif command == "or":
-            self._binary_operation("|")
-        elif command == "not":
-            self._unary_operation("!")
-
-        elif command == "shiftleft":
-            self._unary_operation("<<")
-        elif command == "shiftright":
-            self._unary_operation(">>")
+        if len(self.buffer) >= _FLUSH_CHUNKS:
+            self.flush()
+        code = _ARITHMETIC.get(command)
+        if code is not None:
+            self._write(code)
+        elif command in _COMPARISONS:
+            self._comparison_operation(_COMPARISONS[command])
 
     def write_push(self, segment: str, index: int) -> None:
         """Writes assembly code for the push command.
@@ -198,47 +169,15 @@ class CodeWriter:
             segment (str): the memory segment to operate on.
             index (int): the index in the memory segment.
         """
-        if segment == "constant":
-            self.output_stream.write("@" + str(index) + "\n")  # load constant into D
-            self.output_stream.write("D=A\n")
-            self.output_stream.write("@SP\n")  # push D onto stack
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("M=D\n")
-            self.output_stream.write("@SP\n")  # increment stack pointer
-            self.output_stream.write("M=M+1\n")
-
-        elif segment in self.ram0_to_ram4:  # local, argument, this, that
-            self.output_stream.write("@" + str(index) + "\n")  # load index into D
-            self.output_stream.write("D=A\n")
-            self.output_stream.write("@" + self.ram0_to_ram4[segment] + "\n")  # load base address into A
-            self.output_stream.write("A=M+D\n")  # add index to base address
-            self.output_stream.write("D=M\n")  # load value at address into D
-            self.output_stream.write("@SP\n")  # push D onto stack
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("M=D\n")
-            self.output_stream.write("@SP\n")  # increment stack pointer
-            self.output_stream.write("M=M+1\n")
-
-        elif segment == "temp" or segment == "pointer":  # temp 0-7 = RAM 5-12, pointer 0 = RAM 3, pointer 1 = RAM 4
-            self.output_stream.write("@" + str(index) + "\n")  # load index into D
-            self.output_stream.write("D=A\n")
-            self.output_stream.write("@" + str(self.memory_segments[segment]) + "\n")  # load base address into A
-            self.output_stream.write("A=A+D\n")  # add index to base address
-            self.output_stream.write("D=M\n")  # load value at address into D
-            self.output_stream.write("@SP\n")  # push D onto stack
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("M=D\n")
-            self.output_stream.write("@SP\n")  # increment stack pointer
-            self.output_stream.write("M=M+1\n")
-
-        elif segment == "static":
-            self.output_stream.write("@" + self.filename + "." + str(index) + "\n")
-            self.output_stream.write("D=M\n")
-            self.output_stream.write("@SP\n")
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("M=D\n")
-            self.output_stream.write("@SP\n")
-            self.output_stream.write("M=M+1\n")
+        if len(self.buffer) >= _FLUSH_CHUNKS:
+            self.flush()
+        code = self.push_code.get((segment, index))
+        if code is None:
+            template = _PUSH.get(segment)
+            if template is None:
+                return
+            code = self.push_code[segment, index] = template.format(index=index, filename=self.filename)
+        self._write(code)
 
     def write_pop(self, segment: str, index: int) -> None:
         """Writes assembly code for the pop command.
@@ -247,30 +186,12 @@ class CodeWriter:
             segment (str): the memory segment to operate on.
             index (int): the index in the memory segment.
         """
-        if segment == "static":
-            self.output_stream.write("@SP\n")
-            self.output_stream.write("M=M-1\n")
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("D=M\n")
-            self.output_stream.write("@" + self.filename + "." + str(index) + "\n")
-            self.output_stream.write("M=D\n")
-
-        else:  # local, argument, this, that, pointer, temp
-            self.output_stream.write("@" + str(index) + "\n")  # load index into D
-            self.output_stream.write("D=A\n")
-            self.output_stream.write("@" + str(self.memory_segments[segment]) + "\n")
-            if segment in self.ram0_to_ram4:
-                self.output_stream.write("A=M\n")
-            self.output_stream.write("D=A+D\n")  # add index to base address
-            self.output_stream.write("@R13\n")  # store address in R13
-            self.output_stream.write("M=D\n")
-            self.output_stream.write("@SP\n")  # pop value into D
-            self.output_stream.write("M=M-1\n")
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("D=M\n")
-            self.output_stream.write("@R13\n")  # load address from R13
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("M=D\n")
+        if len(self.buffer) >= _FLUSH_CHUNKS:
+            self.flush()
+        code = self.pop_code.get((segment, index))
+        if code is None:
+            code = self.pop_code[segment, index] = _POP[segment].format(index=index, filename=self.filename)
+        self._write(code)
 
     def write_push_pop(self, command: str, segment: str, index: int) -> None:
         """Writes assembly code that is the translation of the given
@@ -43,6 +43,7 @@ def translate_file(
             code_writer.write_return()
         elif parser.command_type() == "C_CALL":
             code_writer.write_call(parser.arg1(), parser.arg2())
+    code_writer.flush()
 
 if "__main__" == __name__:
     # Parses the input path and calls translate_file on each input file.
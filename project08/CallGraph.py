@@ -0,0 +1,118 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from Parser import Instruction, C_FUNCTION, C_CALL
+
+# Whole program analysis of the functions of a VM program, given as a list of
+# (filename, commands) pairs, where the commands are the instructions of the
+# Parser. A function is the commands from its "function" command up to the
+# next one. Commands before the first function of a file belong to no
+# function: they are always kept, and the functions they call are reachable.
+
+Program = typing.List[typing.Tuple[str, typing.List[Instruction]]]
+
+
+def call_graph(program: Program) -> typing.Dict[typing.Optional[str], typing.Set[str]]:
+    """
+    Args:
+        program (Program): the files of the program.
+
+    Returns:
+        typing.Dict[typing.Optional[str], typing.Set[str]]: the functions
+        called by every function, and by the commands outside of functions
+        (None).
+    """
+    graph = {None: set()}
+    for filename, commands in program:
+        callees = graph[None]
+        for opcode, arg1, arg2 in commands:
+            if opcode == C_FUNCTION:
+                callees = graph.setdefault(arg1, set())
+            elif opcode == C_CALL:
+                callees.add(arg1)
+    return graph
+
+
+def reachable_functions(graph: typing.Dict[typing.Optional[str], typing.Set[str]],
+                        entry: str) -> typing.Set[str]:
+    """
+    Args:
+        graph (typing.Dict[typing.Optional[str], typing.Set[str]]): a call
+            graph, as returned by call_graph.
+        entry (str): the function the program starts at.
+
+    Returns:
+        typing.Set[str]: the functions that can be called when the program
+        runs, including the ones it calls but does not define.
+    """
+    reachable = set()
+    pending = [entry] + list(graph[None])
+    while pending:
+        function = pending.pop()
+        if function not in reachable:
+            reachable.add(function)
+            pending.extend(graph.get(function, ()))
+    return reachable
+
+
+def is_recursive(graph: typing.Dict[typing.Optional[str], typing.Set[str]], function: str) -> bool:
+    """
+    Args:
+        graph (typing.Dict[typing.Optional[str], typing.Set[str]]): a call
+            graph, as returned by call_graph.
+        function (str): a function.
+
+    Returns:
+        bool: True if the function can call itself, directly or through
+        other functions.
+    """
+    visited = set()
+    pending = list(graph.get(function, ()))
+    while pending:
+        callee = pending.pop()
+        if callee == function:
+            return True
+        if callee not in visited:
+            visited.add(callee)
+            pending.extend(graph.get(callee, ()))
+    return False
+
+
+def remove_unreachable(program: Program, entry: str = "Sys.init") -> typing.Tuple[Program, typing.List[str]]:
+    """Removes the functions that are never called, directly or indirectly,
+    from the entry function. Nothing is removed if the program does not
+    define the entry function, since it does not start there.
+
+    Args:
+        program (Program): the files of the program.
+        entry (str): the function the program starts at, which is the one
+            called by the bootstrap code.
+
+    Returns:
+        typing.Tuple[Program, typing.List[str]]: the files without the
+        unreachable functions, and the removed functions in order of
+        appearance.
+    """
+    graph = call_graph(program)
+    if entry not in graph:
+        return program, []
+    reachable = reachable_functions(graph, entry)
+    removed = []
+    reduced_program = []
+    for filename, commands in program:
+        kept = []
+        keep = True  # commands outside of functions are kept
+        for command in commands:
+            if command[0] == C_FUNCTION:
+                keep = command[1] in reachable
+                if not keep:
+                    removed.append(command[1])
+            if keep:
+                kept.append(command)
+        reduced_program.append((filename, kept))
+    return reduced_program, removed
@@ -5,26 +5,372 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import io
 import typing
+from Parser import Instruction, C_ARITHMETIC, C_PUSH, C_POP, C_LABEL, C_GOTO, C_IF, \
+    C_FUNCTION, C_RETURN, C_CALL, C_MOVE
+
+# The assembly code of every VM command is built once, as a template that
+# only has to be formatted with the arguments of the command. The code
+# writer collects the formatted templates and writes them in large chunks.
+_FLUSH_CHUNKS = 4096  # the number of templates collected before writing them (at a function)
+
+_PUSH_D = "@SP\nA=M\nM=D\n@SP\nM=M+1\n"  # pushes the value in D onto the stack
+_POP_D = "@SP\nM=M-1\nA=M\nD=M\n"  # pops the top of the stack into D
+
+# pop first value, pop second value, perform operation (+, -, &, |), push result
+_BINARY = "@SP\nM=M-1\nA=M\nD=M\n@SP\nM=M-1\nA=M\nM=M{}D\n@SP\nM=M+1\n"
+# pop value, perform operation (-, !, <<, >>), push result
+_UNARY = "@SP\nM=M-1\nA=M\n{}\n@SP\nM=M+1\n"
+_ARITHMETIC = {
+    "add": _BINARY.format("+"), "sub": _BINARY.format("-"),
+    "and": _BINARY.format("&"), "or": _BINARY.format("|"),
+    "neg": _UNARY.format("M=-M"), "not": _UNARY.format("M=!M"),
+    "shiftleft": _UNARY.format("M=M<<"), "shiftright": _UNARY.format("M=M>>"),
+}
+_COMPARISONS = {"eq": "JEQ", "gt": "JGT", "lt": "JLT"}
+
+# A subtraction could overflow if the values are large and one of the values
+# is negative and the other is positive, so in the case of different signs,
+# the comparison checks who is the negative and who is the positive and
+# returns the appropriate result (instead of subtracting one from the other):
+# 1. pop the first value and store it in R13, and jump if it is positive
+# 2. pop the second value, and jump if it is positive
+# 3. both are negative/0: D = second - first
+# 4. (FIRST_POS) pop the second value and jump if it is negative, otherwise
+#    both are positive/0: D = second - first
+# 5. (SECOND_POS) first is negative and second is positive: D = 1
+# 6. (SECOND_NEG) first is positive and second is negative: D = -1
+# 7. (COMPARE) D = -1 if D satisfies the jump condition, 0 otherwise, and
+#    (END) push D
+# the comparison itself, with the first value in D, leaving the result in D
+_COMPARE_D = (
+    "@R13\nM=D\n@FIRST_POS{suffix}\nD;JGT\n"
+    + _POP_D + "@SECOND_POS{suffix}\nD;JGT\n"
+    "@R13\nD=D-M\n@COMPARE{suffix}\n0;JMP\n"
+    "(FIRST_POS{suffix})\n" + _POP_D + "@SECOND_NEG{suffix}\nD;JLT\n"
+    "@R13\nD=D-M\n@COMPARE{suffix}\n0;JMP\n"
+    "(SECOND_POS{suffix})\nD=1\n@COMPARE{suffix}\n0;JMP\n"
+    "(SECOND_NEG{suffix})\nD=-1\n@COMPARE{suffix}\n0;JMP\n"
+    "(COMPARE{suffix})\n@TRUE{suffix}\nD;{operation}\n"
+    "D=0\n@END{suffix}\n0;JMP\n"
+    "(TRUE{suffix})\nD=-1\n@END{suffix}\n0;JMP\n"
+    "(END{suffix})\n")
+_COMPARISON = _POP_D + _COMPARE_D + _PUSH_D
+# stores the return address in R15 and jumps to the shared routine
+_SHARED_COMPARISON = "@END{suffix}\nD=A\n@R15\nM=D\n@{routine}\n0;JMP\n(END{suffix})\n"
+_COMPARISON_ROUTINE = "({suffix})\n" + _COMPARISON + "@R15\nA=M\n0;JMP\n"
+
+# local, argument, this, that: RAM[base + index], temp 0-7 = RAM 5-12,
+# pointer 0 = RAM 3 and pointer 1 = RAM 4
+_SEGMENT_BASES = {"local": "LCL", "argument": "ARG", "this": "THIS", "that": "THAT"}
+_FIXED_SEGMENTS = {"pointer": "3", "temp": "5"}
+_PUSH = {"constant": "@{index}\nD=A\n" + _PUSH_D,
+         "static": "@{filename}.{index}\nD=M\n" + _PUSH_D}
+_POP = {"static": _POP_D + "@{filename}.{index}\nM=D\n"}
+for _segment, _base in _SEGMENT_BASES.items():
+    _PUSH[_segment] = "@{index}\nD=A\n@" + _base + "\nA=M+D\nD=M\n" + _PUSH_D
+    _POP[_segment] = "@{index}\nD=A\n@" + _base + "\nA=M\nD=A+D\n@R13\nM=D\n" \
+                     + _POP_D + "@R13\nA=M\nM=D\n"
+for _segment, _base in _FIXED_SEGMENTS.items():
+    _PUSH[_segment] = "@{index}\nD=A\n@" + _base + "\nA=A+D\nD=M\n" + _PUSH_D
+    _POP[_segment] = "@{index}\nD=A\n@" + _base + "\nD=A+D\n@R13\nM=D\n" \
+                     + _POP_D + "@R13\nA=M\nM=D\n"
+
+# The local variables of a function are zeroed on top of the stack. Up to
+# _MAX_UNROLLED_LOCALS are zeroed one after the other, and SP is bumped once
+# (at most 2n+4 instructions, and as many cycles), more by a loop that pushes
+# 0 n times (8 instructions, 6n+2 cycles). The label of the loop is numbered
+# like the ones of comparisons, and starts with a $ like the shared routines,
+# so it is not the label of a VM label command in a function (see write_label).
+_MAX_UNROLLED_LOCALS = 8
+_UNROLLED_LOCALS = ["", "@SP\nA=M\nM=0\n@SP\nM=M+1\n"] + [
+    "@SP\nA=M\nM=0\n" + "A=A+1\nM=0\n" * (n_vars - 1) + "D=A+1\n@SP\nM=D\n"
+    for n_vars in range(2, _MAX_UNROLLED_LOCALS + 1)]
+_LOCALS_LOOP = "@{n_vars}\nD=A\n($LOCALS.{suffix})\n@SP\nAM=M+1\nA=A-1\nM=0\nD=D-1\n" \
+               "@$LOCALS.{suffix}\nD;JGT\n"
+_MAX_INCREMENTS = 2  # an address up to base+2 is reached with A=A+1, further ones with an addition
+
+
+def _segment_address(segment: str, index: int, filename: str) -> typing.Optional[str]:
+    """
+    Args:
+        segment (str): a memory segment other than constant.
+        index (int): the index in the memory segment.
+        filename (str): the name of the current VM file.
+
+    Returns:
+        typing.Optional[str]: assembly code that puts the address of the
+        segment entry in A without changing D, or None if that takes D.
+    """
+    if segment == "static":
+        return "@" + filename + "." + str(index) + "\n"
+    if segment in _FIXED_SEGMENTS:
+        return "@" + str(int(_FIXED_SEGMENTS[segment]) + index) + "\n"
+    if index <= _MAX_INCREMENTS:
+        return "@" + _SEGMENT_BASES[segment] + "\nA=M\n" + "A=A+1\n" * index
+    return None
+
+
+def _load(segment: str, index: int, filename: str) -> str:
+    """
+    Args:
+        segment (str): a memory segment.
+        index (int): the index in the memory segment.
+        filename (str): the name of the current VM file.
+
+    Returns:
+        str: assembly code that puts the value of the segment entry in D.
+    """
+    if segment == "constant":
+        return "@" + str(index) + "\nD=A\n"
+    address = _segment_address(segment, index, filename)
+    if address is None:
+        address = "@" + str(index) + "\nD=A\n@" + _SEGMENT_BASES[segment] + "\nA=M+D\n"
+    return address + "D=M\n"
+
+
+def _store(segment: str, index: int, filename: str) -> str:
+    """
+    Args:
+        segment (str): a memory segment other than constant.
+        index (int): the index in the memory segment.
+        filename (str): the name of the current VM file.
+
+    Returns:
+        str: assembly code that puts the value in D in the segment entry.
+    """
+    address = _segment_address(segment, index, filename)
+    if address is not None:
+        return address + "M=D\n"
+    # the address takes D, so the value waits in R13 and the address in R14
+    return "@R13\nM=D\n@" + str(index) + "\nD=A\n@" + _SEGMENT_BASES[segment] + "\nD=M+D\n@R14\nM=D\n" \
+        "@R13\nD=M\n@R14\nA=M\nM=D\n"
+
+
+def _move(source_segment: str, source_index: int, segment: str, index: int, filename: str) -> str:
+    """
+    Args:
+        source_segment (str): the memory segment to push from.
+        source_index (int): the index in it.
+        segment (str): the memory segment to pop to.
+        index (int): the index in it.
+        filename (str): the name of the current VM file.
+
+    Returns:
+        str: assembly code that copies the value, the way a push followed
+        by a pop does, without going through the stack.
+    """
+    load = _load(source_segment, source_index, filename)
+    address = _segment_address(segment, index, filename)
+    if address is not None:
+        return load + address + "M=D\n"
+    # store the address in R13 first, since the value takes D
+    return "@" + str(index) + "\nD=A\n@" + _SEGMENT_BASES[segment] + "\nD=M+D\n@R13\nM=D\n" \
+        + load + "@R13\nA=M\nM=D\n"
+
+
+# With top of stack caching, the value on top of the stack may be held in D
+# instead of RAM[SP-1] (SP then points at where it belongs): a push loads D,
+# operations take their last operand from D and leave their result there, and
+# D is only pushed to RAM when it is about to be overwritten or the stack must
+# be entirely in RAM, at labels, jumps, calls and returns.
+_POP_TOP = "@SP\nAM=M-1\nD=M\n"  # pops the top of the stack into D
+# pop the first value, perform operation with D (+, -, &, |)
+_CACHED_BINARY = "@SP\nAM=M-1\nD=M{}D\n"
+_CACHED_ARITHMETIC = {
+    "add": _CACHED_BINARY.format("+"), "sub": _CACHED_BINARY.format("-"),
+    "and": _CACHED_BINARY.format("&"), "or": _CACHED_BINARY.format("|"),
+    "neg": "D=-D\n", "not": "D=!D\n", "shiftleft": "D=D<<\n", "shiftright": "D=D>>\n",
+}
+
+
+# Superinstructions: sequences of commands that compilers emit all the time,
+# translated as a whole into code that is shorter than the translations of
+# the commands one after the other. Every entry of the catalogue is the
+# number of commands, the opcode of the first one and a function that gets
+# the commands, the name of the current VM file and of the current function,
+# and returns their assembly code, or None if they do not match. The entries
+# are tried in order, so longer sequences come first. Every entry is checked
+# against the translations of its commands by tests/test_superinstructions.py
+# (see benchmark/SuperinstructionCheck.py).
+
+
+def _increment(commands: typing.Sequence[Instruction], filename: str, function: str) -> typing.Optional[str]:
+    """push S i, push constant c, add/sub, pop S i: S[i] += c, in place."""
+    (push, segment, index), (push_constant, constant_segment, constant), (arithmetic, operation, unused), \
+        (pop, pop_segment, pop_index) = commands
+    if push_constant != C_PUSH or constant_segment != "constant" or arithmetic != C_ARITHMETIC \
+            or operation not in ("add", "sub") or pop != C_POP or pop_segment != segment \
+            or pop_index != index or segment == "constant":
+        return None
+    operator = "+" if operation == "add" else "-"
+    address = _segment_address(segment, index, filename)
+    if constant == 1:
+        if address is None:
+            address = "@" + str(index) + "\nD=A\n@" + _SEGMENT_BASES[segment] + "\nA=M+D\n"
+        return address + "M=M" + operator + "1\n"
+    if address is None:  # the address would take D, which holds the constant
+        return None
+    return "@" + str(constant) + "\nD=A\n" + address + "M=M" + operator + "D\n"
+
+
+def _array_write(commands: typing.Sequence[Instruction], filename: str, function: str) -> typing.Optional[str]:
+    """pop temp 0, pop pointer 1, push temp 0, pop that 0: *(second) = top."""
+    if tuple(commands) != ((C_POP, "temp", 0), (C_POP, "pointer", 1), (C_PUSH, "temp", 0), (C_POP, "that", 0)):
+        return None
+    return "@SP\nAM=M-1\nD=M\n@5\nM=D\n@SP\nAM=M-1\nD=M\n@THAT\nM=D\n@5\nD=M\n@THAT\nA=M\nM=D\n"
+
+
+def _array_read(commands: typing.Sequence[Instruction], filename: str, function: str) -> typing.Optional[str]:
+    """pop pointer 1, push that 0: top = *top, in place."""
+    if tuple(commands) != ((C_POP, "pointer", 1), (C_PUSH, "that", 0)):
+        return None
+    return "@SP\nA=M-1\nD=M\n@THAT\nM=D\nA=D\nD=M\n@SP\nA=M-1\nM=D\n"
+
+
+def _not_if(commands: typing.Sequence[Instruction], filename: str, function: str) -> typing.Optional[str]:
+    """not, if-goto l: jump unless the popped value is -1."""
+    (arithmetic, operation, unused), (if_goto, label, unused) = commands
+    if operation != "not" or if_goto != C_IF:
+        return None
+    return "@SP\nAM=M-1\nD=M+1\n@" + function + "$" + label + "\nD;JNE\n"
+
+
+def _push_pop(commands: typing.Sequence[Instruction], filename: str, function: str) -> typing.Optional[str]:
+    """push S i, pop T j: T[j] = S[i], without going through the stack."""
+    (push, segment, index), (pop, pop_segment, pop_index) = commands
+    if pop != C_POP or segment not in _PUSH:
+        return None
+    return _move(segment, index, pop_segment, pop_index, filename)
+
+
+SUPERINSTRUCTIONS = {  # name -> (number of commands, opcode of the first command, function)
+    "increment": (4, C_PUSH, _increment),
+    "array-write": (4, C_POP, _array_write),
+    "array-read": (2, C_POP, _array_read),
+    "not-if": (2, C_ARITHMETIC, _not_if),
+    "move": (2, C_PUSH, _push_pop),
+}
+
+
+def _frame(n_args: str, n_args_register: str) -> str:
+    """
+    Args:
+        n_args (str): the symbol or number loaded to get the number of
+            arguments.
+        n_args_register (str): "A" if n_args is a number, "M" if it is a
+            symbol.
+
+    Returns:
+        str: assembly code that saves the segments of the caller and
+        repositions ARG (SP-5-n_args) and LCL (SP) for the callee, once the
+        return address was pushed.
+    """
+    return "".join("@" + segment + "\nD=M\n" + _PUSH_D for segment in ["LCL", "ARG", "THIS", "THAT"]) \
+        + "@5\nD=A\n@" + n_args + "\nD=D+" + n_args_register + "\n@SP\nD=M-D\n@ARG\nM=D\n" \
+        + "@SP\nD=M\n@LCL\nM=D\n"
+
+
+# push the return address, save the frame, go to the callee and inject the
+# return address label into the code
+_CALL = "@{return_address}\nD=A\n" + _PUSH_D + _frame("{n_args}", "A") \
+        + "@{function}\n0;JMP\n({return_address})\n"
+# R13 = callee, R14 = return address, D = number of arguments
+_SHARED_CALL = "@{function}\nD=A\n@R13\nM=D\n@{return_address}\nD=A\n@R14\nM=D\n" \
+               "@{n_args}\nD=A\n@$CALL\n0;JMP\n({return_address})\n"
+_CALL_ROUTINE = "($CALL)\n@R15\nM=D\n@R14\nD=M\n" + _PUSH_D + _frame("R15", "M") \
+                + "@R13\nA=M\n0;JMP\n"
+# R13 = frame, R14 = return address, *ARG = pop(), SP = ARG+1, restore the
+# segments of the caller and go to the return address
+_RETURN = "@LCL\nD=M\n@R13\nM=D\n@5\nA=D-A\nD=M\n@R14\nM=D\n" \
+          + _POP_D + "@ARG\nA=M\nM=D\n@ARG\nD=M+1\n@SP\nM=D\n" \
+          + "".join("@R13\nAM=M-1\nD=M\n@" + segment + "\nM=D\n" for segment in ["THAT", "THIS", "ARG", "LCL"]) \
+          + "@R14\nA=M\n0;JMP\n"
+_SHARED_RETURN = "@$RETURN\n0;JMP\n"
+_RETURN_ROUTINE = "($RETURN)\n" + _RETURN
+_BOOTSTRAP = "@256\nD=A\n@SP\nM=D\n"
+
+
+def _split_template(template: str, field: str, **fields: typing.Any) -> typing.List[str]:
+    """
+    Args:
+        template (str): a template.
+        field (str): the field of the template that is left unformatted.
+        **fields (typing.Any): the values of the other fields.
+
+    Returns:
+        typing.List[str]: the parts of the formatted template between the
+        occurrences of the field, so that value.join(parts) is the template
+        formatted with the field set to value.
+    """
+    return template.format(**{field: "\0"}, **fields).split("\0")
+
+
+_COMPARISON_PARTS = {operation: _split_template(_COMPARISON, "suffix", operation=operation)
+                     for operation in _COMPARISONS.values()}
+_SHARED_COMPARISON_PARTS = {operation: _split_template(_SHARED_COMPARISON, "suffix", routine="$" + operation[1:])
+                            for operation in _COMPARISONS.values()}
+_CACHED_COMPARISON_PARTS = {operation: _split_template(_COMPARE_D, "suffix", operation=operation)
+                            for operation in _COMPARISONS.values()}
+
 
 class CodeWriter:
     """Translates VM commands into Hack assembly code."""
 
-    def __init__(self, output_stream: typing.TextIO) -> None:
+    def __init__(self, output_stream: typing.TextIO, shared_calls: bool = False,
+                 shared_comparisons: bool = False, cache_top: bool = False,
+                 namespace_counters: bool = False, superinstructions: typing.Collection[str] = ()) -> None:
         """Initializes the CodeWriter.
 
         Args:
             output_stream (typing.TextIO): output stream.
+            shared_calls (bool): if this is True, calls and returns jump to
+                a single $CALL routine and a single $RETURN routine, which
+                are written after the bootstrap code, instead of inlining
+                the whole calling convention at every call and return.
+            shared_comparisons (bool): if this is True, eq, gt and lt jump to
+                a shared routine per comparison, which is written by
+                _write_comparison_routines, instead of inlining the
+                overflow-safe comparison at every use.
+            cache_top (bool): if this is True, the top of the stack is held
+                in D between straight-line commands, instead of being
+                stored to the stack and loaded back by the next command.
+            namespace_counters (bool): if this is True, the counters of the
+                comparison labels and return addresses restart at every
+                file and are prefixed by its name, so that the files can be
+                translated by separate code writers (see Main.py, --jobs).
+            superinstructions (typing.Collection[str]): the entries of
+                SUPERINSTRUCTIONS to use in write_commands.
         """
         self.output_stream = output_stream
+        self.buffer = []  # formatted templates that were not written yet, see flush
+        self._write = self.buffer.append  # adds assembly code to the buffer
+        self.push_code = {}  # (segment, index) -> formatted template
+        self.pop_code = {}
+        self.move_code = {}  # (source segment, source index, segment, index) -> assembly code
+        self.call_parts = {}  # (function, n_args) -> split template, see _split_template
+        self.shared_calls = shared_calls
+        self.shared_comparisons = shared_comparisons
+        self.cache_top = cache_top
+        self.superinstructions = [name for name in SUPERINSTRUCTIONS if name in superinstructions]
+        self.top_in_d = False  # whether the top of the stack is held in D, see _store_top
+        self.used_comparisons = []  # the comparison routines to write, in order of first use
         self.filename = ""
-        self.ram0_to_ram4 = {"local": "LCL", "argument": "ARG", "this": "THIS", "that": "THAT"}
-        self.memory_segments = {"local": "LCL", "argument": "ARG", "this": "THIS", "that": "THAT",
-                                "pointer": 3, "temp": 5}
-        self.label_counter = 0  # for labels in comparison operations
+        self.namespace_counters = namespace_counters
+        self.counter_prefix = ""  # the filename and a dot when namespace_counters is True
+        self.label_counter = 0  # for labels in comparison operations and locals loops
         self.address_counter = 0  # for return address in write_call
         self.current_function = ""  # updates in write_function
 
+    def flush(self) -> None:  # function added by me
+        """Writes all the buffered assembly code to the output stream. Called
+        at the start of every file and of large enough functions, and must be
+        called once the translation is done.
+        """
+        self.output_stream.write("".join(self.buffer))
+        self.buffer.clear()
+
     def set_file_name(self, filename: str) -> None:
         """Informs the code writer that the translation of a new VM file is
         started.
@@ -33,34 +379,58 @@ class CodeWriter:
             filename (str): The name of the VM file.
         """
         self.filename = filename
+        if self.namespace_counters:
+            self.counter_prefix = filename + "."
+            self.label_counter = 0
+            self.address_counter = 0
+        # the code of static variables depends on the filename
+        self.push_code = {key: code for key, code in self.push_code.items() if key[0] != "static"}
+        self.pop_code = {key: code for key, code in self.pop_code.items() if key[0] != "static"}
+        self.move_code = {key: code for key, code in self.move_code.items()
+                          if key[0] != "static" and key[2] != "static"}
+        self.flush()
         print("translating file:", filename + ".vm")
 
-    def _write_init(self) -> None:  # function added by me (according to youtube lecture API)
-        """Writes assembly code that intializes the VM code (bootstrap code).
-         Must be placed at the beginning of the generated *.asm file.
+    def _store_top(self) -> None:  # function added by me
+        """Pushes the top of the stack from D if it is held there, so that
+        the whole stack is in RAM. Called before D is overwritten and before
+        every label, jump, call and return, where the code that runs next
+        expects the whole stack in RAM.
         """
-        self.output_stream.write("@256\n")
-        self.output_stream.write("D=A\n")
-        self.output_stream.write("@SP\n")
-        self.output_stream.write("M=D\n")
-        self.write_call("Sys.init", 0)
+        if self.top_in_d:
+            self._write(_PUSH_D)
+            self.top_in_d = False
 
-    def _binary_operation(self, operation: str) -> None:  # function added by me
-        """Writes assembly code for binary operations.
+    def _load_top(self) -> None:  # function added by me
+        """Pops the top of the stack into D, unless it is already held there.
+        """
+        if not self.top_in_d:
+            self._write(_POP_TOP)
+            self.top_in_d = True
+
+    def _write_fragment(self, code: str, used_comparisons: typing.List[str]) -> None:  # function added by me
+        """Writes assembly code that another code writer translated, when the
+        files are translated separately (see Main.py, --jobs).
 
         Args:
-            operation (str): binary operation.
+            code (str): the assembly code.
+            used_comparisons (typing.List[str]): the comparison routines it
+                uses, see _write_comparison_routines.
+        """
+        self._write(code)
+        for operation in used_comparisons:
+            if operation not in self.used_comparisons:
+                self.used_comparisons.append(operation)
+
+    def _write_init(self) -> None:  # function added by me (according to youtube lecture API)
+        """Writes assembly code that intializes the VM code (bootstrap code).
+         Must be placed at the beginning of the generated *.asm file.
         """
-        self.output_stream.write("@SP\n") # pop first value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-        self.output_stream.write("@SP\n") # pop second value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("M=M" + operation + "D\n")  # perform operation (+, -, &, |)
-        self.output_stream.write("@SP\n") # push result
-        self.output_stream.write("M=M+1\n")
+        self._write(_BOOTSTRAP)
+        self.write_call("Sys.init", 0)
+        if self.shared_calls:  # Sys.init never returns, so these are only reached by jumps
+            self._write(_CALL_ROUTINE)
+            self._write(_RETURN_ROUTINE)
 
     def _comparison_operation(self, operation: str) -> None:  # function added by me
         """Writes assembly code for comparison operations.
@@ -69,91 +439,113 @@ class CodeWriter:
             operation (str): comparison operation.
         """
         self.label_counter += 1
-        # could cause overflow if the values are large and one of the values is negative and the other is positive,
-        # so in the case of different signs, the function checks who is the negative and who is the positive
-        # and returns the appropriate result (instead of subtracting one from the other)
-        self.output_stream.write("@SP\n")  # pop first value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-        self.output_stream.write("@R13\n")  # store first value in R13
-        self.output_stream.write("M=D\n")
-
-        self.output_stream.write("@FIRST_POS" + str(self.label_counter) + "\n")  # check if first value is positive
-        self.output_stream.write("D;JGT\n")
-
-        self.output_stream.write("@SP\n")  # pop second value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-
-        self.output_stream.write("@SECOND_POS" + str(self.label_counter) + "\n")  # check if second value is positive
-        self.output_stream.write("D;JGT\n")
-
-        self.output_stream.write("@R13\n")  # load first value from R13
-        self.output_stream.write("D=D-M\n")  # perform operation to check if first value is greater than second value
-        self.output_stream.write("@COMPARE" + str(self.label_counter) + "\n")  # (reached only if both negative/0)
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(FIRST_POS" + str(self.label_counter) + ")\n")  # if first value is positive
-        self.output_stream.write("@SP\n")  # pop second value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-
-        self.output_stream.write("@SECOND_NEG" + str(self.label_counter) + "\n")  # check if second value is negative
-        self.output_stream.write("D;JLT\n")
-
-        self.output_stream.write("@R13\n")
-        self.output_stream.write("D=D-M\n")  # perform operation to check if first value is greater than second value
-        self.output_stream.write("@COMPARE" + str(self.label_counter) + "\n")  # (reached only if both positive/0)
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(SECOND_POS" + str(self.label_counter) + ")\n")
-        self.output_stream.write("D=1\n")      # reached if first value is negative and second value is positive
-        self.output_stream.write("@COMPARE" + str(self.label_counter) + "\n")
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(SECOND_NEG" + str(self.label_counter) + ")\n")
-        self.output_stream.write("D=-1\n")     # reached if first value is positive and second value is negative
-        self.output_stream.write("@COMPARE" + str(self.label_counter) + "\n")
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(COMPARE" + str(self.label_counter) + ")\n")
-        self.output_stream.write("@TRUE" + str(self.label_counter) + "\n")  # jump if operation result is true
-        self.output_stream.write("D;" + operation + "\n")
-
-        self.output_stream.write("D=0\n")
-        self.output_stream.write("@END" + str(self.label_counter) + "\n")  # if operation result is false
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(TRUE" + str(self.label_counter) + ")\n")
-        self.output_stream.write("D=-1\n")
-        self.output_stream.write("@END" + str(self.label_counter) + "\n")
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(END" + str(self.label_counter) + ")\n")
-        self.output_stream.write("@SP\n") # push result, D=0 if false and D=-1 if true
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("M=D\n")
-        self.output_stream.write("@SP\n")
-        self.output_stream.write("M=M+1\n")
-
-    def _unary_operation(self, operation: str) -> None:  # function added by me
-        """Writes assembly code for unary operations.
+        suffix = self.counter_prefix + str(self.label_counter)
+        if self.shared_comparisons:
+            self._store_top()
+            if operation not in self.used_comparisons:
+                self.used_comparisons.append(operation)
+            self._write(suffix.join(_SHARED_COMPARISON_PARTS[operation]))
+        elif self.cache_top:
+            self._load_top()
+            self._write(suffix.join(_CACHED_COMPARISON_PARTS[operation]))
+        else:
+            self._write(suffix.join(_COMPARISON_PARTS[operation]))
+
+    def _write_comparison_routines(self) -> None:  # function added by me
+        """Writes the shared routines of the comparisons that were used, when
+        shared_comparisons is True. Must be placed after all the VM code. Every
+        routine expects the return address in R15.
+        """
+        for operation in self.used_comparisons:
+            self._write(_COMPARISON_ROUTINE.format(suffix="$" + operation[1:], operation=operation))
+
+    def write_commands(self, commands: typing.Iterable[Instruction]) -> None:  # function added by me
+        """Writes assembly code that is the translation of the given commands.
 
         Args:
-            operation (str): unary operation.
+            commands (typing.Iterable[Instruction]): instructions of the
+                Parser, or of VMOptimizer.
         """
-        self.output_stream.write("@SP\n") # pop value
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        if operation == ">>" or operation == "<<":
-            self.output_stream.write("M=M" + operation + "\n")  # perform operation (<<, >>)
-        else:
-            self.output_stream.write("M=" + operation + "M\n") # perform operation (-, !)
-        self.output_stream.write("@SP\n") # push result
-        self.output_stream.write("M=M+1\n")
+        if not self.superinstructions:
+            self._write_commands(commands)
+            return
+        commands = list(commands)
+        catalogue = [SUPERINSTRUCTIONS[name] for name in self.superinstructions]
+        function = self.current_function
+        start = 0  # the first command that was not written yet
+        index = 0
+        while index < len(commands):
+            opcode = commands[index][0]
+            if opcode == C_FUNCTION:
+                function = commands[index][1]
+            for length, first_opcode, match in catalogue:
+                if opcode == first_opcode and index + length <= len(commands):
+                    code = match(commands[index:index + length], self.filename, function)
+                    if code is not None:
+                        break
+            else:
+                index += 1
+                continue
+            self._write_commands(commands[start:index])
+            self._store_top()  # the code uses D and expects the whole stack in RAM
+            self._write(code)
+            index += length
+            start = index
+        self._write_commands(commands[start:])
+
+    def _write_commands(self, commands: typing.Iterable[Instruction]) -> None:  # function added by me
+        """Writes assembly code for the given commands one by one.
+
+        Args:
+            commands (typing.Iterable[Instruction]): instructions of the
+                Parser, or of VMOptimizer.
+        """
+        for opcode, arg1, arg2 in commands:
+            if opcode == C_PUSH:
+                self.write_push(arg1, arg2)
+            elif opcode == C_ARITHMETIC:
+                self.write_arithmetic(arg1)
+            elif opcode == C_POP:
+                self.write_pop(arg1, arg2)
+            elif opcode == C_MOVE:
+                self.write_move(arg1[0], arg1[1], arg2[0], arg2[1])
+            elif opcode == C_LABEL:
+                self.write_label(arg1)
+            elif opcode == C_GOTO:
+                self.write_goto(arg1)
+            elif opcode == C_IF:
+                self.write_if(arg1)
+            elif opcode == C_FUNCTION:
+                self.write_function(arg1, arg2)
+            elif opcode == C_RETURN:
+                self.write_return()
+            elif opcode == C_CALL:
+                self.write_call(arg1, arg2)
+
+    def count_cycles(self, commands: typing.List[Instruction]) -> int:  # function added by me
+        """Estimates the number of cycles it takes to run the given commands
+        once, by counting every instruction of their translation once,
+        together with the shared routines they jump to. Nothing is written.
+
+        Args:
+            commands (typing.List[Instruction]): instructions of the Parser.
+
+        Returns:
+            int: the number of instructions.
+        """
+        output_stream = io.StringIO()
+        writer = CodeWriter(output_stream, self.shared_calls, self.shared_comparisons, self.cache_top,
+                            superinstructions=self.superinstructions)
+        writer.write_commands(commands)
+        writer._store_top()
+        if self.shared_calls:
+            for opcode, arg1, arg2 in commands:
+                if opcode == C_CALL:
+                    writer._write(_CALL_ROUTINE)
+                elif opcode == C_RETURN:
+                    writer._write(_RETURN_ROUTINE)
+        writer.flush()
+        return sum(1 for line in output_stream.getvalue().splitlines() if not line.startswith("("))
 
     def write_arithmetic(self, command: str) -> None:
         """Writes assembly code that is the translation of the given
@@ -164,44 +556,15 @@ class CodeWriter:
         Args:
             command (str): an arithmetic command.
         """
-        # arithmetic operations:
-        if command == "add":
-            self._binary_operation("+")
-        elif command == "sub":
-            self._binary_operation("-")
-        elif command == "neg":
-            self._unary_operation("-")
-
-        # comparison operations:
-        elif command == "eq":
-            self._comparison_operation("JEQ")
-        elif command == "gt":
-            self._comparison_operation("JGT")
-        elif command == "lt":
-            self._comparison_operation("JLT")
-
-        # logical operations:
-        elif command == "and":
-            self._binary_operation("&")
-        elif command == "or":
-            self._binary_operation("|")
-        elif command == "not":
-            self._unary_operation("!")
-
-        elif command == "shiftleft":
-            self._unary_operation("<<")
-        elif command == "shiftright":
-            self._unary_operation(">>")
-
-    def _push_D(self) -> None:  # function added by me
-        """
-        Writes assembly code that pushes the value in D onto the stack.
-        """
-        self.output_stream.write("@SP\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("M=D\n")
-        self.output_stream.write("@SP\n")
-        self.output_stream.write("M=M+1\n")
+        if self.cache_top and command in _CACHED_ARITHMETIC:
+            self._load_top()
+            self._write(_CACHED_ARITHMETIC[command])
+            return
+        code = _ARITHMETIC.get(command)
+        if code is not None:
+            self._write(code)
+        elif command in _COMPARISONS:
+            self._comparison_operation(_COMPARISONS[command])
 
     def write_push(self, segment: str, index: int) -> None:
         """Writes assembly code for the push command.
@@ -210,31 +573,20 @@ class CodeWriter:
             segment (str): the memory segment to operate on.
             index (int): the index in the memory segment.
         """
-        if segment == "constant":
-            self.output_stream.write("@" + str(index) + "\n")  # load constant into D
-            self.output_stream.write("D=A\n")
-            self._push_D()  # push value onto stack
-
-        elif segment in self.ram0_to_ram4:  # local, argument, this, that
-            self.output_stream.write("@" + str(index) + "\n")  # load index into D
-            self.output_stream.write("D=A\n")
-            self.output_stream.write("@" + self.ram0_to_ram4[segment] + "\n")  # load base address into A
-            self.output_stream.write("A=M+D\n")  # add index to base address
-            self.output_stream.write("D=M\n")  # load value at address into D
-            self._push_D()  # push value onto stack
-
-        elif segment == "temp" or segment == "pointer":  # temp 0-7 = RAM 5-12, pointer 0 = RAM 3, pointer 1 = RAM 4
-            self.output_stream.write("@" + str(index) + "\n")  # load index into D
-            self.output_stream.write("D=A\n")
-            self.output_stream.write("@" + str(self.memory_segments[segment]) + "\n")  # load base address into A
-            self.output_stream.write("A=A+D\n")  # add index to base address
-            self.output_stream.write("D=M\n")  # load value at address into D
-            self._push_D()  # push value onto stack
-
-        elif segment == "static":
-            self.output_stream.write("@" + self.filename + "." + str(index) + "\n")
-            self.output_stream.write("D=M\n")
-            self._push_D()  # push value onto stack
+        code = self.push_code.get((segment, index))
+        if code is None:
+            template = _PUSH.get(segment)
+            if template is None:
+                return
+            if self.cache_top:
+                code = _load(segment, index, self.filename)
+            else:
+                code = template.format(index=index, filename=self.filename)
+            self.push_code[segment, index] = code
+        if self.cache_top:  # the pushed value is held in D
+            self._store_top()
+            self.top_in_d = True
+        self._write(code)
 
     def write_pop(self, segment: str, index: int) -> None:
         """Writes assembly code for the pop command.
@@ -243,30 +595,34 @@ class CodeWriter:
             segment (str): the memory segment to operate on.
             index (int): the index in the memory segment.
         """
-        if segment == "static":
-            self.output_stream.write("@SP\n")
-            self.output_stream.write("M=M-1\n")
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("D=M\n")
-            self.output_stream.write("@" + self.filename + "." + str(index) + "\n")
-            self.output_stream.write("M=D\n")
-
-        else:  # local, argument, this, that, pointer, temp
-            self.output_stream.write("@" + str(index) + "\n")  # load index into D
-            self.output_stream.write("D=A\n")
-            self.output_stream.write("@" + str(self.memory_segments[segment]) + "\n")
-            if segment in self.ram0_to_ram4:
-                self.output_stream.write("A=M\n")
-            self.output_stream.write("D=A+D\n")  # add index to base address
-            self.output_stream.write("@R13\n")  # store address in R13
-            self.output_stream.write("M=D\n")
-            self.output_stream.write("@SP\n")  # pop value into D
-            self.output_stream.write("M=M-1\n")
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("D=M\n")
-            self.output_stream.write("@R13\n")  # load address from R13
-            self.output_stream.write("A=M\n")
-            self.output_stream.write("M=D\n")
+        code = self.pop_code.get((segment, index))
+        if code is None:
+            if self.cache_top:
+                code = _store(segment, index, self.filename)
+            else:
+                code = _POP[segment].format(index=index, filename=self.filename)
+            self.pop_code[segment, index] = code
+        if self.cache_top:
+            self._load_top()
+            self.top_in_d = False
+        self._write(code)
+
+    def write_move(self, source_segment: str, source_index: int, segment: str, index: int) -> None:
+        """Writes assembly code that has the effect of a push command followed
+        by a pop command, without going through the stack (see VMOptimizer).
+
+        Args:
+            source_segment (str): the memory segment to push from.
+            source_index (int): the index in the memory segment to push from.
+            segment (str): the memory segment to pop to.
+            index (int): the index in the memory segment to pop to.
+        """
+        self._store_top()  # the value is copied through D
+        key = (source_segment, source_index, segment, index)
+        code = self.move_code.get(key)
+        if code is None:
+            code = self.move_code[key] = _move(source_segment, source_index, segment, index, self.filename)
+        self._write(code)
 
     def write_push_pop(self, command: str, segment: str, index: int) -> None:
         """Writes assembly code that is the translation of the given
@@ -294,7 +650,8 @@ class CodeWriter:
         Args:
             label (str): the label to write.
         """
-        self.output_stream.write("(" + self.current_function + "$" + label + ")\n")
+        self._store_top()
+        self._write("(" + self.current_function + "$" + label + ")\n")
 
     def write_goto(self, label: str) -> None:
         """Writes assembly code that affects the goto command.
@@ -302,8 +659,8 @@ class CodeWriter:
         Args:
             label (str): the label to go to.
         """
-        self.output_stream.write("@" + self.current_function + "$" + label + "\n")
-        self.output_stream.write("0;JMP\n")
+        self._store_top()
+        self._write("@" + self.current_function + "$" + label + "\n0;JMP\n")
 
     def write_if(self, label: str) -> None:
         """Writes assembly code that affects the if-goto command.
@@ -311,12 +668,12 @@ class CodeWriter:
         Args:
             label (str): the label to go to.
         """
-        self.output_stream.write("@SP\n")  # pop value into D
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-        self.output_stream.write("@" + self.current_function + "$" + label + "\n")
-        self.output_stream.write("D;JNE\n")  # jump if D != 0
+        # pop value into D, jump if D != 0
+        if self.top_in_d:
+            self.top_in_d = False
+            self._write("@" + self.current_function + "$" + label + "\nD;JNE\n")
+            return
+        self._write(_POP_D + "@" + self.current_function + "$" + label + "\nD;JNE\n")
 
     def write_function(self, function_name: str, n_vars: int) -> None:
         """Writes assembly code that affects the function command.
@@ -330,10 +687,17 @@ class CodeWriter:
             function_name (str): the name of the function.
             n_vars (int): the number of local variables of the function.
         """
+        self._store_top()
         self.current_function = function_name
-        self.output_stream.write("(" + function_name + ")\n")
-        for i in range(n_vars):
-            self.write_push("constant", 0)  # initializes the local variables to 0
+        if len(self.buffer) >= _FLUSH_CHUNKS:
+            self.flush()
+        # initializes the local variables to 0
+        if n_vars <= _MAX_UNROLLED_LOCALS:
+            self._write("(" + function_name + ")\n" + _UNROLLED_LOCALS[n_vars])
+        else:
+            self.label_counter += 1
+            self._write("(" + function_name + ")\n" + _LOCALS_LOOP.format(
+                n_vars=n_vars, suffix=self.counter_prefix + str(self.label_counter)))
 
     def write_call(self, function_name: str, n_args: int) -> None:
         """Writes assembly code that affects the call command.
@@ -351,76 +715,24 @@ class CodeWriter:
             function_name (str): the name of the function to call.
             n_args (int): the number of arguments of the function.
         """
+        self._store_top()
         self.address_counter += 1
-        return_address = function_name + "$ret" + str(self.address_counter)
-
-        self.output_stream.write("@" + return_address + "\n")
-        self.output_stream.write("D=A\n")
-        self._push_D()  # push return address onto stack
-
-        for seg in ["LCL", "ARG", "THIS", "THAT"]:  # saves seg of the caller
-            self.output_stream.write("@" + seg + "\n")
-            self.output_stream.write("D=M\n")
-            self._push_D()  # push seg onto stack
-
-        self.output_stream.write("@5\n")
-        self.output_stream.write("D=A\n")
-        self.output_stream.write("@" + str(n_args) + "\n")  # reposition ARG
-        self.output_stream.write("D=D+A\n")
-        self.output_stream.write("@SP\n")
-        self.output_stream.write("D=M-D\n")
-        self.output_stream.write("@ARG\n")
-        self.output_stream.write("M=D\n")
-
-        self.output_stream.write("@SP\n")
-        self.output_stream.write("D=M\n")
-        self.output_stream.write("@LCL\n")  # reposition LCL
-        self.output_stream.write("M=D\n")
-
-        self.output_stream.write("@" + function_name + "\n")  # transfer control to the callee
-        self.output_stream.write("0;JMP\n")
-
-        self.output_stream.write("(" + return_address + ")\n")  # inject return address label into the code
+        return_address = function_name + "$ret" + self.counter_prefix + str(self.address_counter)
+        parts = self.call_parts.get((function_name, n_args))
+        if parts is None:
+            parts = self.call_parts[function_name, n_args] = _split_template(
+                _SHARED_CALL if self.shared_calls else _CALL, "return_address",
+                function=function_name, n_args=n_args)
+        self._write(return_address.join(parts))
 
     def write_return(self) -> None:
         """Writes assembly code that affects the return command.
         """
-        self.output_stream.write("@LCL\n")  # put return address in a temp var
-        self.output_stream.write("D=M\n")
-        self.output_stream.write("@R13\n")
-        self.output_stream.write("M=D\n")
-
-        self.output_stream.write("@5\n")
-        self.output_stream.write("A=D-A\n")
-        self.output_stream.write("D=M\n")
-        self.output_stream.write("@R14\n")
-        self.output_stream.write("M=D\n")
-
-        self.output_stream.write("@SP\n")  # reposition return value for the caller
-        self.output_stream.write("M=M-1\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("D=M\n")
-        self.output_stream.write("@ARG\n")
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("M=D\n")
-
-        self.output_stream.write("@ARG\n")  # reposition SP for the caller
-        self.output_stream.write("D=M+1\n")
-        self.output_stream.write("@SP\n")
-        self.output_stream.write("M=D\n")
-
-        for seg in ["THAT", "THIS", "ARG", "LCL"]:
-            self.output_stream.write("@R13\n")  # restore seg for caller
-            self.output_stream.write("AM=M-1\n")
-            self.output_stream.write("D=M\n")
-            self.output_stream.write("@" + seg + "\n")
-            self.output_stream.write("M=D\n")
-
-        self.output_stream.write("@R14\n")  # go to return address
-        self.output_stream.write("A=M\n")
-        self.output_stream.write("0;JMP\n")
+        self._store_top()
+        self._write(_SHARED_RETURN if self.shared_calls else _RETURN)
 
     def close(self) -> None:  # function added by me
         """Closes the output file.
         """
+        self.flush()
         self.output_stream.close()
@@ -0,0 +1,210 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from Parser import Instruction, C_ARITHMETIC, C_PUSH, C_POP, C_LABEL, C_GOTO, C_IF, \
+    C_FUNCTION, C_RETURN, C_CALL
+import CallGraph
+
+# VM to VM inlining of small functions, applied to the whole program (see
+# CallGraph.Program) before it is translated. A call to a small enough,
+# non-recursive function is replaced by the body of the function, which runs
+# in the frame of the caller: the caller gets extra local variables, that
+# hold the arguments, the local variables of the callee and the pointers the
+# callee changes, since a call saves and restores THIS and THAT. At a call of
+# "f" with 2 arguments and 1 local variable, from a caller with 3 local
+# variables, which changes pointer 0:
+#
+#     push pointer 0, pop local 6    save THIS
+#     pop local 4, pop local 3       the arguments, the last one on top
+#     push constant 0, pop local 5   the local variable starts at 0
+#     ...                            the body: "argument i" is "local 3+i",
+#                                    "local i" is "local 5+i", label "l" is
+#                                    "f$<site>$l" and return is "goto f$<site>"
+#     label f$<site>                 only if a return jumps here
+#     push local 6, pop pointer 0    restore THIS
+#
+# The return value is left on the stack, the way a return does. Inlined
+# bodies never overlap, so all the call sites in a caller share the same
+# extra local variables. Only functions whose stack holds exactly the return
+# value at every return are inlined, and only from functions of the same
+# file if they use static variables. A call is only inlined if that is
+# estimated to save cycles. Calls in inlined bodies stay calls.
+
+_UNARY_COMMANDS = ("neg", "not", "shiftleft", "shiftright")
+
+
+class _Function:
+    """A function that can be inlined."""
+
+    def __init__(self, filename: str, n_locals: int, body: typing.List[Instruction]) -> None:
+        self.filename = filename
+        self.n_locals = n_locals
+        self.body = body  # the commands after the function command
+        self.n_arguments = 1 + max(
+            [arg2 for opcode, arg1, arg2 in body if opcode in (C_PUSH, C_POP) and arg1 == "argument"],
+            default=-1)  # the number of arguments it uses
+        self.uses_statics = any(opcode in (C_PUSH, C_POP) and arg1 == "static" for opcode, arg1, arg2 in body)
+        self.pointers = sorted({arg2 for opcode, arg1, arg2 in body if opcode == C_POP and arg1 == "pointer"})
+        self.sites = 0
+        self.cycles_saved = 0  # at all the sites together
+
+
+def _returns_one_value(body: typing.List[Instruction]) -> bool:
+    """
+    Args:
+        body (typing.List[Instruction]): the commands of a function.
+
+    Returns:
+        bool: True if every path through the function ends with a return,
+        with nothing on the stack but the return value, and the stack has
+        the same depth every time a label is reached.
+    """
+    labels = {arg1: index for index, (opcode, arg1, arg2) in enumerate(body) if opcode == C_LABEL}
+    depths = {}  # index -> stack depth before the command
+    pending = [(0, 0)]
+    while pending:
+        index, depth = pending.pop()
+        if index in depths:
+            if depths[index] != depth:
+                return False
+            continue
+        if index == len(body) or depth < 0:
+            return False
+        depths[index] = depth
+        opcode, arg1, arg2 = body[index]
+        if opcode == C_RETURN:
+            if depth != 1:
+                return False
+            continue
+        if opcode == C_GOTO or opcode == C_IF:
+            if arg1 not in labels:
+                return False
+            if opcode == C_GOTO:
+                pending.append((labels[arg1], depth))
+                continue
+            depth -= 1
+            pending.append((labels[arg1], depth))
+        elif opcode == C_PUSH:
+            depth += 1
+        elif opcode == C_POP:
+            depth -= 1
+        elif opcode == C_ARITHMETIC and arg1 not in _UNARY_COMMANDS:
+            depth -= 1
+        elif opcode == C_CALL:
+            depth += 1 - arg2
+        pending.append((index + 1, depth))
+    return True
+
+
+def _inlined(function_name: str, function: _Function, n_arguments: int, base: int,
+             site: int) -> typing.List[Instruction]:
+    """
+    Args:
+        function_name (str): the name of the function.
+        function (_Function): the function.
+        n_arguments (int): the number of arguments it is called with.
+        base (int): the first extra local variable of the caller.
+        site (int): a number that is unique to the call site.
+
+    Returns:
+        typing.List[Instruction]: the commands that replace the call.
+    """
+    end = function_name + "$" + str(site)
+    first_local = base + n_arguments
+    saves = {pointer: first_local + function.n_locals + number for number, pointer in enumerate(function.pointers)}
+    commands = []
+    for pointer, slot in saves.items():
+        commands += [(C_PUSH, "pointer", pointer), (C_POP, "local", slot)]
+    commands += [(C_POP, "local", base + argument) for argument in reversed(range(n_arguments))]
+    for local in range(function.n_locals):
+        commands += [(C_PUSH, "constant", 0), (C_POP, "local", first_local + local)]
+    returns = 0
+    for index, (opcode, arg1, arg2) in enumerate(function.body):
+        if opcode == C_PUSH or opcode == C_POP:
+            if arg1 == "argument":
+                arg1, arg2 = "local", base + arg2
+            elif arg1 == "local":
+                arg2 = first_local + arg2
+        elif opcode == C_LABEL or opcode == C_GOTO or opcode == C_IF:
+            arg1 = end + "$" + arg1
+        elif opcode == C_RETURN:
+            if index == len(function.body) - 1:
+                continue
+            opcode, arg1 = C_GOTO, end
+            returns += 1
+        commands.append((opcode, arg1, arg2))
+    if returns:
+        commands.append((C_LABEL, end, None))
+    for pointer, slot in saves.items():
+        commands += [(C_PUSH, "local", slot), (C_POP, "pointer", pointer)]
+    return commands
+
+
+def inline_functions(
+        program: CallGraph.Program, max_size: int,
+        cycles: typing.Callable[[typing.List[Instruction]], int]) -> typing.Tuple[
+            CallGraph.Program, typing.List[typing.Tuple[str, int, int]]]:
+    """Inlines the calls to the non-recursive functions of at most max_size
+    commands, from other functions, where that saves cycles.
+
+    Args:
+        program (CallGraph.Program): the files of the program.
+        max_size (int): the maximal number of commands of an inlined
+            function, without the function command.
+        cycles (typing.Callable[[typing.List[Instruction]], int]): estimates
+            the number of cycles it takes to run commands once.
+
+    Returns:
+        typing.Tuple[CallGraph.Program, typing.List[typing.Tuple[str, int, int]]]:
+        the files with the calls inlined, and for every inlined function, in
+        order of appearance, its name, the number of call sites it was
+        inlined at and the estimated number of cycles saved per call.
+    """
+    graph = CallGraph.call_graph(program)
+    functions = {}
+    for filename, commands in program:
+        starts = [index for index, command in enumerate(commands) if command[0] == C_FUNCTION] + [len(commands)]
+        for start, end in zip(starts, starts[1:]):
+            opcode, function_name, n_locals = commands[start]
+            body = commands[start + 1:end]
+            if len(body) <= max_size and _returns_one_value(body) and not CallGraph.is_recursive(graph, function_name):
+                functions[function_name] = _Function(filename, n_locals, body)
+
+    site = 0
+    inlined_program = []
+    for filename, commands in program:
+        output = []
+        caller = None  # the index of the function command of the caller in output
+        extra_locals = 0
+        for command in commands:
+            opcode, arg1, arg2 = command
+            if opcode == C_FUNCTION:
+                if caller is not None and extra_locals:
+                    output[caller] = (C_FUNCTION, output[caller][1], output[caller][2] + extra_locals)
+                caller, extra_locals = len(output), 0
+            function = functions.get(arg1) if opcode == C_CALL and caller is not None else None
+            if function is None or function.n_arguments > arg2 or (
+                    function.uses_statics and function.filename != filename):
+                output.append(command)
+                continue
+            inlined = _inlined(arg1, function, arg2, output[caller][2], site + 1)
+            cycles_saved = cycles([command, (C_FUNCTION, arg1, function.n_locals)] + function.body) - cycles(inlined)
+            if cycles_saved <= 0:  # moving the arguments can cost more than the call
+                output.append(command)
+                continue
+            site += 1
+            output += inlined
+            extra_locals = max(extra_locals, arg2 + function.n_locals + len(function.pointers))
+            function.sites += 1
+            function.cycles_saved += cycles_saved
+        if caller is not None and extra_locals:
+            output[caller] = (C_FUNCTION, output[caller][1], output[caller][2] + extra_locals)
+        inlined_program.append((filename, output))
+    report = [(function_name, function.sites, function.cycles_saved // function.sites)
+              for function_name, function in functions.items() if function.sites]
+    return inlined_program, report
@@ -5,15 +5,21 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import argparse
+import contextlib
+import io
+import multiprocessing
 import os
 import sys
 import typing
-from Parser import Parser
-from CodeWriter import CodeWriter
+from CodeWriter import CodeWriter, SUPERINSTRUCTIONS
+import CallGraph
+import Inliner
+import VMOptimizer
 
 def translate_file(
         input_file: typing.TextIO, output_file: typing.TextIO,
-        bootstrap: bool) -> None:
+        bootstrap: bool, optimize: bool = False) -> None:
     """Translates a single file.
 
     Args:
@@ -21,43 +27,117 @@ def translate_file(
         output_file (typing.TextIO): writes all output to this file.
         bootstrap (bool): if this is True, the current file is the
             first file we are translating.
+        optimize (bool): if this is True, the commands are optimized by
+            VMOptimizer first, and what it changed is printed.
     """
-    parser = Parser(input_file)
     input_filename, input_extension = os.path.splitext(os.path.basename(input_file.name))  # gets the filename without the extension/path
+    translate_commands(input_filename, VMOptimizer.read_commands(input_file), bootstrap, optimize)
+
+
+def translate_commands(
+        input_filename: str, commands: typing.List[VMOptimizer.Command],
+        bootstrap: bool, optimize: bool = False) -> None:
+    """Translates the commands of a single file.
+
+    Args:
+        input_filename (str): the name of the file, without the extension.
+        commands (typing.List[VMOptimizer.Command]): its commands, as
+            returned by VMOptimizer.read_commands.
+        bootstrap (bool): if this is True, the current file is the
+            first file we are translating.
+        optimize (bool): if this is True, the commands are optimized by
+            VMOptimizer first, and what it changed is printed.
+    """
     code_writer.set_file_name(input_filename)
     if bootstrap:
         code_writer._write_init()  # runs only for the first file
 
-    while parser.has_more_commands():
-        parser.advance()
-        command = parser.command_type()
-        if command == "C_ARITHMETIC":
-            code_writer.write_arithmetic(parser.arg1())
-        elif command == "C_PUSH" or parser.command_type() == "C_POP":
-            code_writer.write_push_pop(parser.command_type(), parser.arg1(), parser.arg2())
-        elif command == "C_LABEL":
-            code_writer.write_label(parser.arg1())
-        elif command == "C_GOTO":
-            code_writer.write_goto(parser.arg1())
-        elif command == "C_IF":
-            code_writer.write_if(parser.arg1())
-        elif command == "C_FUNCTION":
-            code_writer.write_function(parser.arg1(), parser.arg2())
-        elif command == "C_RETURN":
-            code_writer.write_return()
-        elif command == "C_CALL":
-            code_writer.write_call(parser.arg1(), parser.arg2())
+    if optimize:
+        original_count = len(commands)
+        commands, changes = VMOptimizer.optimize(commands)
+        print("optimized %s: %d -> %d commands%s" % (
+            input_filename + ".vm", original_count, len(commands),
+            "".join(", %s %d" % change for change in sorted(changes.items()))))
+
+    code_writer.write_commands(commands)
+
+
+def translate_fragment(
+        input_path: str, commands: typing.Optional[typing.List[VMOptimizer.Command]],
+        writer_options: typing.Dict[str, typing.Any],
+        optimize: bool) -> typing.Tuple[str, typing.List[str], str]:
+    """Translates a single file on its own, with its own code writer, so that
+    files can be translated in separate processes (see --jobs).
+
+    Args:
+        input_path (str): the path of the file.
+        commands (typing.Optional[typing.List[VMOptimizer.Command]]): its
+            commands, or None to read them from the file.
+        writer_options (typing.Dict[str, typing.Any]): keyword arguments of the
+            code writer.
+        optimize (bool): if this is True, the commands are optimized by
+            VMOptimizer first.
+
+    Returns:
+        typing.Tuple[str, typing.List[str], str]: the assembly code, the
+        comparison routines it uses and what was printed while translating.
+    """
+    global code_writer
+    input_filename, input_extension = os.path.splitext(os.path.basename(input_path))
+    if commands is None:
+        with open(input_path, 'r') as input_file:
+            commands = VMOptimizer.read_commands(input_file)
+    fragment = io.StringIO()
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        code_writer = CodeWriter(fragment, namespace_counters=True, **writer_options)
+        translate_commands(input_filename, commands, False, optimize)
+        code_writer._store_top()  # the next fragment expects the whole stack in RAM
+        code_writer.flush()
+    return fragment.getvalue(), code_writer.used_comparisons, messages.getvalue()
 
 
 if "__main__" == __name__:
-    # Parses the input path and calls translate_file on each input file.
+    # Parses the input path, reads every input file and calls
+    # translate_commands on its commands.
     # This opens both the input and the output files!
     # Both are closed automatically when the code finishes running.
     # If the output file does not exist, it is created automatically in the
     # correct path, using the correct filename.
-    if not len(sys.argv) == 2:
-        sys.exit("Invalid usage, please use: VMtranslator <input path>")
-    argument_path = os.path.abspath(sys.argv[1])
+    arg_parser = argparse.ArgumentParser(prog="VMtranslator")
+    arg_parser.add_argument("input_path", help="a .vm file or a directory of .vm files")
+    arg_parser.add_argument(
+        "--shared-calls", action="store_true",
+        help="call and return through single shared routines, for a smaller ROM")
+    arg_parser.add_argument(
+        "--shared-comparisons", action="store_true",
+        help="compare through shared eq/gt/lt routines, for a smaller ROM")
+    arg_parser.add_argument(
+        "--optimize", "-O", action="store_true",
+        help="fold constants and fuse push/pop pairs before translating")
+    arg_parser.add_argument(
+        "--cache-top", action="store_true",
+        help="hold the top of the stack in D between commands, for fewer cycles")
+    arg_parser.add_argument(
+        "--remove-unreachable", action="store_true",
+        help="translate only the functions that can be reached from Sys.init")
+    arg_parser.add_argument(
+        "--inline", nargs="?", const=10, type=int, metavar="SIZE",
+        help="inline the calls to non-recursive functions of up to SIZE commands (default: 10)")
+    arg_parser.add_argument(
+        "--superinstructions", nargs="?", const=",".join(SUPERINSTRUCTIONS), default="", metavar="NAMES",
+        help="translate common sequences of commands with single templates: a comma-separated list "
+             "of %s (default: all of them)" % ", ".join(SUPERINSTRUCTIONS))
+    arg_parser.add_argument(
+        "--jobs", "-j", type=int, metavar="N",
+        help="translate every file on its own, in N processes (0: one per CPU), "
+             "with the same output for every N")
+    args = arg_parser.parse_args()
+    superinstructions = [name for name in args.superinstructions.split(",") if name]
+    for name in superinstructions:
+        if name not in SUPERINSTRUCTIONS:
+            arg_parser.error("unknown superinstruction: " + name)
+    argument_path = os.path.abspath(args.input_path)
     if os.path.isdir(argument_path):
         files_to_translate = [
             os.path.join(argument_path, filename)
@@ -68,13 +148,45 @@ if "__main__" == __name__:
         files_to_translate = [argument_path]
         output_path, extension = os.path.splitext(argument_path)
     output_path += ".asm"
+    input_paths = [input_path for input_path in files_to_translate
+                   if os.path.splitext(input_path)[1].lower() == ".vm"]
+    if args.jobs is not None:
+        input_paths.sort()  # the order of os.listdir is arbitrary
     bootstrap = True
+    writer_options = {"shared_calls": args.shared_calls, "shared_comparisons": args.shared_comparisons,
+                      "cache_top": args.cache_top, "superinstructions": superinstructions}
     with open(output_path, 'w') as output_file:
-        code_writer = CodeWriter(output_file)
-        for input_path in files_to_translate:
-            filename, extension = os.path.splitext(input_path)
-            if extension.lower() != ".vm":
-                continue
-            with open(input_path, 'r') as input_file:
-                translate_file(input_file, output_file, bootstrap)
-            bootstrap = False
+        code_writer = CodeWriter(output_file, namespace_counters=args.jobs is not None, **writer_options)
+        program = None
+        if args.jobs is None or args.remove_unreachable or args.inline is not None:
+            program = []  # the whole program is read first, to inline and remove unreachable functions
+            for input_path in input_paths:
+                with open(input_path, 'r') as input_file:
+                    program.append((os.path.splitext(os.path.basename(input_path))[0],
+                                    VMOptimizer.read_commands(input_file)))
+            if args.inline is not None:
+                program, inlined = Inliner.inline_functions(program, args.inline, code_writer.count_cycles)
+                for function, sites, cycles in inlined:
+                    print("inlined function: %s at %d call site%s, saving about %d cycles per call" % (
+                        function, sites, "s" if sites != 1 else "", cycles))
+            if args.remove_unreachable:
+                program, removed = CallGraph.remove_unreachable(program)
+                for function in removed:
+                    print("removed unreachable function:", function)
+        if args.jobs is None:
+            for filename, commands in program:
+                translate_commands(filename, commands, bootstrap, args.optimize)
+                bootstrap = False
+        else:
+            # the bootstrap comes first, then the files in order, each of
+            # them read (unless it was already) and translated by a worker
+            code_writer._write_init()
+            code_writer.flush()
+            tasks = [(input_path, None if program is None else program[index][1], writer_options, args.optimize)
+                     for index, input_path in enumerate(input_paths)]
+            with multiprocessing.Pool(args.jobs or None) as pool:
+                for fragment, used_comparisons, messages in pool.starmap(translate_fragment, tasks):
+                    sys.stdout.write(messages)
+                    code_writer._write_fragment(fragment, used_comparisons)
+        code_writer._write_comparison_routines()  # nothing, unless --shared-comparisons
+        code_writer.flush()
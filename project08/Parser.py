@@ -5,8 +5,26 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import sys
 import typing
 
+# opcodes, the first field of every instruction, and the command types they
+# stand for (see Parser.command_type). C_MOVE is never parsed, VMOptimizer
+# writes it for a push that is followed by a pop.
+COMMAND_TYPES = ("C_ARITHMETIC", "C_PUSH", "C_POP", "C_LABEL", "C_GOTO", "C_IF",
+                 "C_FUNCTION", "C_RETURN", "C_CALL", "C_MOVE")
+C_ARITHMETIC, C_PUSH, C_POP, C_LABEL, C_GOTO, C_IF, C_FUNCTION, C_RETURN, C_CALL, C_MOVE = \
+    range(len(COMMAND_TYPES))
+_ARITHMETIC_COMMANDS = ("add", "sub", "neg", "eq", "gt", "lt", "and", "or", "not", "shiftleft", "shiftright")
+_OPCODES = {"push": C_PUSH, "pop": C_POP, "label": C_LABEL, "goto": C_GOTO, "if-goto": C_IF,
+            "function": C_FUNCTION, "return": C_RETURN, "call": C_CALL}
+_OPCODES.update((command, C_ARITHMETIC) for command in _ARITHMETIC_COMMANDS)
+
+# An instruction is an (opcode, arg1, arg2) tuple: arg1 is the arithmetic
+# command, segment, label or function name, interned, and arg2 is the index
+# or count as an int, or None. Identical lines share a single instruction.
+Instruction = typing.Tuple[int, typing.Any, typing.Any]
+
 
 class Parser:
     """
@@ -47,15 +65,47 @@ class Parser:
     """
 
     def __init__(self, input_file: typing.TextIO) -> None:
-        """Gets ready to parse the input file.
+        """Parses the input file into instructions, once.
 
         Args:
             input_file (typing.TextIO): input file.
         """
-        self.lines = input_file.read().splitlines()  # saves every line as an element in a list
-        self.num_lines = len(self.lines)
-        self.cur_line_num = -1
-        self.cur_line = ""
+        self.instructions = []  # the instructions of the file, in order
+        parsed = {}  # line -> instruction
+        for line in input_file.read().splitlines():
+            line = line.split("//", 1)[0].strip()  # removes comments and leading and trailing whitespaces
+            if line == "":
+                continue
+            instruction = parsed.get(line)
+            if instruction is None:
+                instruction = parsed[line] = self._parse(line)
+            if instruction is not None:  # not an unknown command
+                self.instructions.append(instruction)
+        self.cur_instruction_num = -1
+        self.cur_instruction = None
+
+    @staticmethod
+    def _parse(line: str) -> typing.Optional[Instruction]:  # function added by me
+        """
+        Args:
+            line (str): a VM command, without comments and surrounding
+                whitespaces.
+
+        Returns:
+            typing.Optional[Instruction]: its instruction, or None if it is
+            not a command.
+        """
+        parts = line.split()
+        opcode = _OPCODES.get(parts[0])
+        if opcode is None:
+            return None
+        if opcode == C_ARITHMETIC:
+            return opcode, sys.intern(parts[0]), None
+        if opcode == C_RETURN:
+            return opcode, None, None
+        if opcode in (C_PUSH, C_POP, C_FUNCTION, C_CALL):
+            return opcode, sys.intern(parts[1]), int(parts[2])
+        return opcode, sys.intern(parts[1]), None
 
     def has_more_commands(self) -> bool:
         """Are there more commands in the input?
@@ -63,24 +113,15 @@ class Parser:
         Returns:
             bool: True if there are more commands, False otherwise.
         """
-        return self.cur_line_num < self.num_lines - 1  # True if the next potential line is within the list limits
+        return self.cur_instruction_num < len(self.instructions) - 1
 
     def advance(self) -> None:
         """Reads the next command from the input and makes it the current
         command. Should be called only if has_more_commands() is true. Initially
         there is no current command.
         """
-        while self.has_more_commands():
-            self.cur_line_num += 1
-            self.cur_line = self.lines[self.cur_line_num]
-
-            self.cur_line = self.cur_line.replace('\t', '').replace('\n', '')  # removes all tabs and newlines
-            self.cur_line = self.cur_line.split("//", 1)[0]  # removes everything from "//" onwards (comments)
-            self.cur_line = self.cur_line.strip()  # removes all leading and trailing whitespaces
-
-            if self.cur_line == "":
-                continue
-            break  # exits function if found a valid line
+        self.cur_instruction_num += 1
+        self.cur_instruction = self.instructions[self.cur_instruction_num]
 
     def command_type(self) -> str:
         """
@@ -91,24 +132,7 @@ class Parser:
             "C_PUSH", "C_POP", "C_LABEL", "C_GOTO", "C_IF", "C_FUNCTION",
             "C_RETURN", "C_CALL".
         """
-        if self.cur_line in ["add", "sub", "neg", "eq", "gt", "lt", "and", "or", "not", "shiftleft", "shiftright"]:
-            return "C_ARITHMETIC"
-        elif self.cur_line.startswith("push"):
-            return "C_PUSH"
-        elif self.cur_line.startswith("pop"):
-            return "C_POP"
-        elif self.cur_line.startswith("label"):
-            return "C_LABEL"
-        elif self.cur_line.startswith("goto"):
-            return "C_GOTO"
-        elif self.cur_line.startswith("if-goto"):
-            return "C_IF"
-        elif self.cur_line.startswith("function"):
-            return "C_FUNCTION"
-        elif self.cur_line.startswith("return"):
-            return "C_RETURN"
-        elif self.cur_line.startswith("call"):
-            return "C_CALL"
+        return COMMAND_TYPES[self.cur_instruction[0]]
 
     def arg1(self) -> str:
         """
@@ -117,30 +141,7 @@ class Parser:
             "C_ARITHMETIC", the command itself (add, sub, etc.) is returned.
             Should not be called if the current command is "C_RETURN".
         """
-        if self.cur_line in ["add", "sub", "neg", "eq", "gt", "lt", "and", "or", "not", "shiftleft", "shiftright"]:
-            return self.cur_line
-
-        # two arguments commands:
-        # first split returns a list of the form: ["command", " arg1 arg2"]
-        # second split returns a list of the form: [" ", "arg1", "arg2"]
-        elif self.cur_line.startswith("push"):
-            return self.cur_line.split("push", 1)[1].split(" ", 2)[1]
-        elif self.cur_line.startswith("pop"):
-            return self.cur_line.split("pop", 1)[1].split(" ", 2)[1]
-        elif self.cur_line.startswith("function"):
-            return self.cur_line.split("function", 1)[1].split(" ", 2)[1]
-        elif self.cur_line.startswith("call"):
-            return self.cur_line.split("call", 1)[1].split(" ", 2)[1]
-
-        # one argument commands:
-        # first split returns a list of the form: ["command", " arg1"]
-        # second split returns a list of the form: [" ", "arg1"]
-        elif self.cur_line.startswith("label"):
-            return self.cur_line.split("label", 1)[1].split(" ", 1)[1]
-        elif self.cur_line.startswith("goto"):
-            return self.cur_line.split("goto", 1)[1].split(" ", 1)[1]
-        elif self.cur_line.startswith("if-goto"):
-            return self.cur_line.split("if-goto", 1)[1].split(" ", 1)[1]
+        return self.cur_instruction[1]
 
     def arg2(self) -> int:
         """
@@ -149,14 +150,4 @@ class Parser:
             called only if the current command is "C_PUSH", "C_POP",
             "C_FUNCTION" or "C_CALL".
         """
-        # first split returns a list of the form: ["command", " arg1 arg2"]
-        # second split returns a list of the form: [" ", "arg1", "arg2"]
-
-        if self.cur_line.startswith("push"):
-            return int(self.cur_line.split("push", 1)[1].split(" ", 2)[2])
-        elif self.cur_line.startswith("pop"):
-            return int(self.cur_line.split("pop", 1)[1].split(" ", 2)[2])
-        elif self.cur_line.startswith("function"):
-            return int(self.cur_line.split("function", 1)[1].split(" ", 2)[2])
-        elif self.cur_line.startswith("call"):
-            return int(self.cur_line.split("call", 1)[1].split(" ", 2)[2])
+        return self.cur_instruction[2]
@@ -0,0 +1,173 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import collections
+import typing
+from Parser import Parser, Instruction, C_ARITHMETIC, C_PUSH, C_POP, C_LABEL, C_GOTO, C_IF, \
+    C_FUNCTION, C_RETURN, C_CALL, C_MOVE
+
+# VM to VM optimization of a single file, applied before the code writer.
+# Commands are the instructions of the Parser. Every rewrite looks at the
+# last commands written in the current block: a block ends at every label,
+# goto, if-goto, function, call and return, so the stack at the start of a
+# block is never known, and no rewrite moves code into or out of a block.
+# The catalogue:
+#
+# | Rule     | Before                        | After                     |
+# |----------|-------------------------------|---------------------------|
+# | fold     | constants, unary or binary op | the constant result       |
+# | fuse     | push X, pop Y                 | move X to Y (C_MOVE)      |
+# | no-op    | push X, pop X                 |                           |
+# | no-op    | push constant 0, add/sub/or   |                           |
+# | no-op    | push constant -1, and         |                           |
+# | no-op    | neg, neg / not, not           |                           |
+#
+# A constant is "push constant c", optionally followed by neg or not, so
+# every 16-bit value is a constant, and folding repeats as far as it can.
+# Folding never makes a block longer: it is applied only when the constant
+# result takes fewer commands than the ones it replaces. Arithmetic is the
+# one of the Hack computer: 16-bit two's complement, comparisons are signed
+# and true is -1. C_MOVE leaves the stack unchanged, and does not write the
+# popped value above the top of the stack, which is free memory anyway.
+
+Command = Instruction
+
+_BLOCK_ENDS = (C_LABEL, C_GOTO, C_IF, C_FUNCTION, C_CALL, C_RETURN)
+
+
+def _signed(value: int) -> int:
+    return value - 0x10000 if value & 0x8000 else value
+
+
+_UNARY = {
+    "neg": lambda x: -x & 0xFFFF,
+    "not": lambda x: ~x & 0xFFFF,
+    "shiftleft": lambda x: (x << 1) & 0xFFFF,
+    "shiftright": lambda x: (x >> 1) | (x & 0x8000),
+}
+_BINARY = {
+    "add": lambda x, y: (x + y) & 0xFFFF,
+    "sub": lambda x, y: (x - y) & 0xFFFF,
+    "and": lambda x, y: x & y,
+    "or": lambda x, y: x | y,
+    "eq": lambda x, y: 0xFFFF if x == y else 0,
+    "gt": lambda x, y: 0xFFFF if _signed(x) > _signed(y) else 0,
+    "lt": lambda x, y: 0xFFFF if _signed(x) < _signed(y) else 0,
+}
+_IDENTITIES = {"add": 0, "sub": 0, "or": 0, "and": 0xFFFF}  # x op identity == x
+_INVOLUTIONS = ("neg", "not")  # op op == nothing
+
+
+def read_commands(input_file: typing.TextIO) -> typing.List[Command]:
+    """Reads the commands of a .vm file.
+
+    Args:
+        input_file (typing.TextIO): the file.
+
+    Returns:
+        typing.List[Command]: the commands, as instructions of the Parser.
+    """
+    return Parser(input_file).instructions
+
+
+def _constant(value: int) -> typing.List[Command]:
+    """
+    Args:
+        value (int): a 16-bit value.
+
+    Returns:
+        typing.List[Command]: the shortest commands that push it.
+    """
+    if value <= 0x7FFF:
+        return [(C_PUSH, "constant", value)]
+    return [(C_PUSH, "constant", ~value & 0x7FFF), (C_ARITHMETIC, "not", None)]
+
+
+def _constant_before(output: typing.List[Command], end: int, block_start: int) -> typing.Tuple[int, int]:
+    """
+    Args:
+        output (typing.List[Command]): the commands written so far.
+        end (int): the index after the last command to look at.
+        block_start (int): the index of the first command of the block.
+
+    Returns:
+        typing.Tuple[int, int]: the constant pushed by the commands right
+        before end and the index of the first of them, or (None, end).
+    """
+    if end <= block_start:
+        return None, end
+    opcode, arg1, arg2 = output[end - 1]
+    if opcode == C_PUSH and arg1 == "constant":
+        return arg2 & 0xFFFF, end - 1
+    if opcode == C_ARITHMETIC and arg1 in _INVOLUTIONS and end - 2 >= block_start:
+        previous, segment, value = output[end - 2]
+        if previous == C_PUSH and segment == "constant":
+            return _UNARY[arg1](value & 0xFFFF), end - 2
+    return None, end
+
+
+def _write_arithmetic(output: typing.List[Command], block_start: int, operation: str,
+                      changes: typing.Counter[str]) -> None:
+    """Writes an arithmetic command, folding or dropping it if it can."""
+    end = len(output)
+    if operation in _UNARY:
+        value, start = _constant_before(output, end, block_start)
+        if value is not None:
+            folded = _constant(_UNARY[operation](value))
+            if len(folded) < end - start + 1:
+                output[start:] = folded
+                changes["fold"] += 1
+                return
+        if operation in _INVOLUTIONS and end > block_start and output[-1] == (C_ARITHMETIC, operation, None):
+            output.pop()
+            changes["no-op"] += 1
+            return
+    elif operation in _BINARY:
+        y, middle = _constant_before(output, end, block_start)
+        if y is not None:
+            x, start = _constant_before(output, middle, block_start)
+            if x is not None:
+                output[start:] = _constant(_BINARY[operation](x, y))
+                changes["fold"] += 1
+                return
+            if _IDENTITIES.get(operation) == y:
+                del output[middle:]
+                changes["no-op"] += 1
+                return
+    output.append((C_ARITHMETIC, operation, None))
+
+
+def optimize(commands: typing.List[Command]) -> typing.Tuple[typing.List[Command], typing.Counter[str]]:
+    """Applies the rules of the catalogue until none of them matches.
+
+    Args:
+        commands (typing.List[Command]): the commands of a file, as returned
+            by read_commands.
+
+    Returns:
+        typing.Tuple[typing.List[Command], typing.Counter[str]]: the
+        optimized commands, and the number of times every rule was applied.
+    """
+    changes = collections.Counter()
+    output = []
+    block_start = 0
+    for command in commands:
+        opcode, arg1, arg2 = command
+        if opcode == C_ARITHMETIC:
+            _write_arithmetic(output, block_start, arg1, changes)
+        elif opcode == C_POP and len(output) > block_start and output[-1][0] == C_PUSH:
+            source = output.pop()[1:]
+            if source != (arg1, arg2):  # otherwise the pair does nothing
+                output.append((C_MOVE, source, (arg1, arg2)))
+                changes["fuse"] += 1
+            else:
+                changes["no-op"] += 1
+        else:
+            output.append(command)
+            if opcode in _BLOCK_ENDS:
+                block_start = len(output)
+    return output, changes
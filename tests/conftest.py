@@ -0,0 +1,12 @@
+"""
+Makes the benchmark package, and through it the modules of the assembler of
+project 6, importable from the tests. The VM translator of project 8 has
+modules with the same names, so it is only run in processes of its own (see
+benchmark/TranslatorBenchmark.py).
+"""
+import os
+import sys
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPOSITORY_DIRECTORY not in sys.path:
+    sys.path.insert(0, REPOSITORY_DIRECTORY)
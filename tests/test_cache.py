@@ -0,0 +1,33 @@
+"""
+The output cache of the assembler of project 6 must not change what the
+command line reports.
+"""
+import json
+import os
+import subprocess
+import sys
+import benchmark
+
+ASSEMBLER = os.path.join(benchmark.ASSEMBLER_DIRECTORY, "Main.py")
+PROGRAM = "@2\nD=A\n@3\nD=D+A\n@0\nM=D\n(END)\n@END\n0;JMP\n"
+
+
+def _stats(path: str, cache_directory: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, ASSEMBLER, path, "--stats", "--stats-format", "json",
+         "--cache-dir", cache_directory],
+        check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output)[os.path.basename(path)]
+
+
+def test_stats_are_the_same_with_a_warm_cache(tmp_path):
+    path = str(tmp_path / "Add.asm")
+    with open(path, 'w') as program_file:
+        program_file.write(PROGRAM)
+    cache_directory = str(tmp_path / "cache")
+    subprocess.run([sys.executable, ASSEMBLER, path, "--cache-dir", cache_directory],
+                   check=True)  # fills the cache
+    stats = _stats(path, cache_directory)
+    assert not stats["cached"]
+    assert (stats["a_instructions"], stats["c_instructions"], stats["labels"]) == (4, 4, 1)
+    assert _stats(path, cache_directory)["rom_size"] == 8
@@ -0,0 +1,17 @@
+"""
+The encodings of C-instructions of the assembler of project 6, as words and
+as text, come from the single cache of HackISA.
+"""
+import benchmark  # makes the assembler modules importable
+import HackISA
+from Code import Code
+
+
+def test_text_and_word_encodings_agree():
+    for comp in list(HackISA.COMP) + list(HackISA.SHIFT_COMP):
+        prefix = "101" if HackISA.is_shift(comp) else "111"
+        for dest, jump in (("", ""), ("AM", ""), ("D", "JNE"), ("", "JMP")):
+            instruction = (dest + "=" if dest else "") + comp + (";" + jump if jump else "")
+            text = prefix + Code.comp(comp) + Code.dest(dest) + Code.jump(jump)
+            assert Code.c_instruction(instruction) == text
+            assert HackISA.encode_c_instruction(instruction) == int(text, 2)
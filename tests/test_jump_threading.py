@@ -0,0 +1,21 @@
+"""
+Rewrites of the jump threading pass of the assembler of project 6.
+"""
+import pytest
+import benchmark  # makes the assembler modules importable
+import JumpThreading
+
+
+def _program(jump: str) -> list:
+    return ["@L1", jump, "(L2)", "@5", "0;JMP", "(L1)", "@L2", "0;JMP"]
+
+
+@pytest.mark.parametrize("lines, optimized", [
+    # the jump goes to L2 at once, and then to the next instruction
+    (_program("0;JMP"), ["(L2)", "@5", "0;JMP", "(L1)"]),
+    # M is RAM[A], so the jump must keep loading L1 for its store
+    (_program("M=D;JMP"), _program("M=D;JMP")),
+    (_program("AM=D;JMP"), _program("AM=D;JMP")),
+])
+def test_thread_jumps(lines, optimized):
+    assert JumpThreading.optimize(lines)[0] == optimized
@@ -0,0 +1,18 @@
+"""
+Rewrites of the peephole optimizer of project 6.
+"""
+import pytest
+import benchmark  # makes the assembler modules importable
+import Peephole
+
+
+@pytest.mark.parametrize("lines, optimized", [
+    (["@0", "D=A", "@7", "M=D"], ["D=0", "@7", "M=D"]),
+    (["@1", "D=-A", "@7", "M=D"], ["D=-1", "@7", "M=D"]),
+    # M is RAM[A], so the @0 and @1 are needed when the value is stored
+    (["@5", "D=A", "@0", "M=A", "@7", "D=A"], ["@5", "D=A", "@0", "M=A", "@7", "D=A"]),
+    (["@5", "D=A", "@1", "MD=-A", "@7", "D=A"], ["@5", "D=A", "@1", "MD=-A", "@7", "D=A"]),
+    (["@0", "AD=A", "@7", "D=A"], ["@0", "AD=A", "@7", "D=A"]),
+])
+def test_constant(lines, optimized):
+    assert Peephole.optimize(lines)[0] == optimized
@@ -0,0 +1,67 @@
+"""
+The streaming mode of the assembler of project 6 keeps only the symbol table
+between its passes, so its peak memory must not grow with the size of the
+input.
+"""
+import os
+import tracemalloc
+import pytest
+import benchmark  # makes the assembler modules importable
+from benchmark.ProgramGenerator import ProgramGenerator
+import Main
+
+SIZES = [5000, 20000, 80000]  # instructions
+PEAK_BOUND = 1024 * 1024  # bytes, far below the size of the largest input
+
+
+def _streaming_peak(path: str) -> int:
+    """
+    Args:
+        path (str): an .asm file.
+
+    Returns:
+        int: the peak of the memory allocated while assembling it in
+        streaming mode, in bytes.
+    """
+    with open(path, 'r') as input_file, open(os.devnull, 'w') as output_file:
+        tracemalloc.start()
+        try:
+            Main.assemble_file(input_file, output_file, streaming=True)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+@pytest.fixture(scope="module")
+def programs(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("streaming")
+    paths = []
+    for size in SIZES:
+        # without labels the symbol table, the only thing kept, stays small
+        path = str(directory / ("Program%d.asm" % size))
+        with open(path, 'w') as program_file:
+            program_file.write(ProgramGenerator(size, label_density=0.0, seed=size).generate())
+        paths.append(path)
+    return paths
+
+
+def test_streaming_peak_is_bounded(programs):
+    for path in programs:
+        assert _streaming_peak(path) < PEAK_BOUND, path
+
+
+def test_streaming_peak_does_not_grow(programs):
+    peaks = [_streaming_peak(path) for path in programs]
+    # 16 times the input, at most a fraction of the peak of the smallest one more
+    assert peaks[-1] < peaks[0] * 1.25, peaks
+
+
+def test_bound_catches_reading_the_whole_input(programs):
+    with open(programs[-1], 'r') as input_file, open(os.devnull, 'w') as output_file:
+        tracemalloc.start()
+        try:
+            Main.assemble_file(input_file, output_file, streaming=False)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    assert peak > PEAK_BOUND
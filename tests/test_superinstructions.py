@@ -0,0 +1,80 @@
+"""
+Every superinstruction of the VM translator of project 8 must behave like
+the commands it replaces, translated one after the other (see
+benchmark/SuperinstructionCheck.py). Every entry of the catalogue is run on
+edge cases of its template and on random programs, with and without
+--cache-top, which holds the top of the stack in D until a template runs.
+"""
+import random
+import pytest
+from benchmark import SuperinstructionCheck
+
+CATALOGUE = SuperinstructionCheck.superinstructions()
+OPTIONS = [[], ["--cache-top"]]
+
+# the commands run in a function with 11 local variables and 4 arguments,
+# with THIS at 3000 and THAT at 3100, and every segment entry is compared at
+# the end (see SuperinstructionCheck.wrap_program). The last commands of
+# every entry run under a value on the stack, which --cache-top holds in D.
+EDGE_CASES = {
+    "increment": "".join(
+        "push %s %d\npush constant %d\n%s\npop %s %d\n" % (segment, index, constant, operation, segment, index)
+        for segment, index, constant, operation in [
+            ("local", 0, 1, "add"), ("local", 10, 7, "sub"), ("argument", 0, 1, "sub"),
+            ("argument", 3, 32767, "add"), ("static", 0, 1, "sub"), ("static", 3, 2, "add"),
+            ("this", 0, 0, "add"), ("that", 10, 100, "add"), ("temp", 0, 1, "add"), ("temp", 7, 2, "sub"),
+            ("pointer", 0, 1, "add"), ("pointer", 1, 1, "sub")])
+    + "push constant 9\npush temp 7\npush constant 1\nadd\npop temp 7\npop static 2\n",
+    "array-write": "".join(
+        address + "push %s\npop temp 0\npop pointer 1\npush temp 0\npop that 0\n" % value
+        for address, value in [
+            ("push constant 3100\npush constant 0\nadd\n", "temp 7"),
+            ("push constant 3100\npush constant 19\nadd\n", "pointer 0"),
+            ("push pointer 0\npush constant 10\nadd\n", "constant 0"),
+            ("push constant 3150\n", "local 10"),
+            ("push constant 3101\n", "temp 0")])
+    + "push constant 9\npush constant 3102\npush argument 3\n"
+      "pop temp 0\npop pointer 1\npush temp 0\npop that 0\npop static 2\n",
+    "array-read": "".join(
+        address + "pop pointer 1\npush that 0\npop %s\n" % destination
+        for address, destination in [
+            ("push constant 3000\n", "local 0"),
+            ("push constant 3000\npush constant 19\nadd\n", "temp 7"),
+            ("push pointer 0\n", "static 0"),
+            ("push constant 3105\n", "that 0")])
+    + "push constant 9\npush constant 3001\npop pointer 1\npush that 0\nadd\npop static 2\n",
+    "not-if": "".join(
+        value + "not\nif-goto TAKEN%d\npush constant 1\npop static %d\nlabel TAKEN%d\n" % (number, number % 4, number)
+        for number, value in enumerate([
+            "push constant 0\n", "push constant 0\nnot\n", "push constant 1\n",
+            "push constant 32767\nnot\n", "push local 0\npush local 0\neq\n",
+            "push local 0\npush local 1\ngt\n", "push argument 3\n"]))
+    + "push constant 9\npush temp 0\nnot\nif-goto UNDER\npush constant 1\npop temp 1\n"
+      "label UNDER\npop static 2\n",
+    "move": "".join(
+        "push %s\npop %s\n" % move for move in [
+            ("constant 0", "local 0"), ("constant 32767", "temp 7"), ("local 10", "argument 3"),
+            ("argument 0", "static 3"), ("temp 0", "temp 7"), ("pointer 0", "temp 0"),
+            ("pointer 1", "pointer 0"), ("constant 3050", "temp 7"), ("temp 7", "pointer 1"),
+            ("this 0", "that 10"), ("that 10", "this 0"), ("static 0", "static 0"), ("local 0", "local 0")])
+    + "push constant 9\npush local 1\npop local 2\npop static 2\n",
+}
+
+
+def test_every_superinstruction_is_checked():
+    assert set(CATALOGUE) == set(EDGE_CASES)
+    assert set(CATALOGUE) <= set(SuperinstructionCheck.GENERATORS)
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+@pytest.mark.parametrize("name", CATALOGUE)
+def test_edge_cases(name, options):
+    naive, result = SuperinstructionCheck.compare(
+        SuperinstructionCheck.wrap_program(EDGE_CASES[name], random.Random(0)), name, options)
+    assert result["source"] != naive["source"]  # the template was used
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+@pytest.mark.parametrize("name", CATALOGUE)
+def test_random_programs(name, options):
+    SuperinstructionCheck.check(name, 3, 0, options)
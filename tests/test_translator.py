@@ -0,0 +1,58 @@
+"""
+Options of the VM translator of project 8, checked by running the programs
+they translate on the CPU emulator (see benchmark/TranslatorBenchmark.py).
+"""
+import os
+from benchmark import TranslatorBenchmark
+
+
+def _write_program(directory: str, files: dict) -> str:
+    """
+    Args:
+        directory (str): where to create the program.
+        files (dict): the VM code of every file, by filename.
+
+    Returns:
+        str: the directory of the program.
+    """
+    program_directory = os.path.join(directory, "Program")
+    os.makedirs(program_directory)
+    for filename, code in files.items():
+        with open(os.path.join(program_directory, filename), 'w') as vm_file:
+            vm_file.write(code)
+    return program_directory
+
+
+def _run(directory: str, options: list) -> dict:
+    result = TranslatorBenchmark.run_program(TranslatorBenchmark.translate(directory, options), 10 ** 5)
+    assert result["halted"]
+    return result["ram"][0]
+
+
+def test_jobs_store_the_cached_top_between_files(tmp_path):
+    # with --jobs the files are translated in order of their names, so A.f
+    # falls through from the end of A.vm to the start of B.vm, with its sum
+    # on top of the stack
+    directory = _write_program(str(tmp_path), {
+        "A.vm": "function A.f 0\npush constant 5\npush constant 6\nadd\n",
+        "B.vm": "pop static 0\npush constant 0\nreturn\n",
+        "Sys.vm": "function Sys.init 0\ncall A.f 0\npop static 0\nlabel END\ngoto END\n",
+    })
+    for options in (["--jobs", "1"], ["--cache-top", "--jobs", "1"], ["--cache-top", "--jobs", "2"]):
+        assert _run(directory, options)["B.0"] == 11, options
+
+
+def test_locals_loop_label_is_not_a_vm_label(tmp_path):
+    # 9 local variables are zeroed by a loop, which has a label of its own
+    loop = ("push local 8\npush constant 1\nsub\npop local 8\npush static 0\npush constant 1\nadd\n"
+            "pop static 0\npush local 8\nif-goto {label}\n")
+    directory = _write_program(str(tmp_path), {"Sys.vm": (
+        "function Sys.init 9\npush constant 3\npop local 8\nlabel locals\n" + loop.format(label="locals")
+        + "push constant 2\npop local 8\nlabel $locals\n" + loop.format(label="$locals")
+        + "call Sys.f 0\nlabel END\ngoto END\n"
+        "function Sys.f 10\npush constant 0\nreturn\n")})
+    for options in ([], ["--jobs", "1"]):
+        labels = [line for line in TranslatorBenchmark.translate(directory, options).splitlines()
+                  if line.startswith("(")]
+        assert len(labels) == len(set(labels)), options
+        assert _run(directory, options)["Sys.0"] == 5, options
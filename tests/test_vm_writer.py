@@ -0,0 +1,32 @@
+"""
+The code writer of the VM translator of project 7 writes its output in
+chunks, so its memory does not grow with the size of the file. It is loaded
+from its path, since its modules have the same names as the ones of the
+assembler.
+"""
+import importlib.util
+import io
+import os
+from conftest import REPOSITORY_DIRECTORY
+
+_spec = importlib.util.spec_from_file_location(
+    "project07_CodeWriter", os.path.join(REPOSITORY_DIRECTORY, "project07", "CodeWriter.py"))
+CodeWriter = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(CodeWriter)
+
+
+def test_output_is_written_in_chunks():
+    output = io.StringIO()
+    writer = CodeWriter.CodeWriter(output)
+    writer.set_file_name("Big")
+    expected = []
+    for index in range(20000):
+        writer.write_push("constant", index)
+        writer.write_pop("static", index % 8)
+        writer.write_arithmetic("add")
+        assert len(writer.buffer) <= CodeWriter._FLUSH_CHUNKS
+        expected += [writer.push_code["constant", index], writer.pop_code["static", index % 8],
+                     CodeWriter._ARITHMETIC["add"]]
+    assert output.tell() > 0  # written before the end
+    writer.flush()
+    assert output.getvalue() == "".join(expected)